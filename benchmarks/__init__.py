@@ -0,0 +1 @@
+# Benchmarks directory
\ No newline at end of file
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟GLM服务器 - 在本地模拟 /files、/files/{id}/content 和 /chat/completions 接口，用于压测而不消耗API额度
+
+支持配置各接口的延迟、随机错误率、429限流比例和响应大小，并通过 GET /_stats 返回服务端统计。
+"""
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+@dataclass
+class FakeServerConfig:
+    """模拟服务器配置"""
+    upload_latency_ms: float = 50.0  # 上传文件接口延迟
+    content_latency_ms: float = 50.0  # 文件内容接口延迟
+    chat_latency_ms: float = 300.0  # 聊天完成接口延迟（流式时为总生成时间）
+    jitter: float = 0.2  # 延迟的随机波动比例
+    error_rate: float = 0.0  # 返回500的比例
+    rate_limit_rate: float = 0.0  # 返回429的比例
+    retry_after: float = 1.0  # 429响应的Retry-After（秒）
+    content_chars: int = 20000  # 文件内容接口返回的文本长度
+    response_chars: int = 4000  # 聊天完成接口返回的文本长度
+    stream_chunk_chars: int = 40  # 流式响应每个事件的文本长度
+    seed: Optional[int] = None
+
+
+def _filler_text(chars: int, title: str) -> str:
+    """生成指定长度、带标题和段落结构的Markdown文本"""
+    paragraph = "这是用于压测的示例段落，内容包含中文与English mixed text，用于模拟真实文档的解析结果。"
+    parts = [f"# {title}\n"]
+    length = len(parts[0])
+    section = 1
+    while length < chars:
+        block = f"\n## 第{section}节\n\n" + paragraph * 3 + "\n"
+        parts.append(block)
+        length += len(block)
+        section += 1
+    return "".join(parts)[:chars]
+
+
+class FakeGLMState:
+    """模拟服务器的共享状态：已上传文件和请求统计"""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, List[Dict[str, Any]]] = {}
+
+    def record(self, endpoint: str, status: int, duration: float, bytes_in: int, bytes_out: int) -> None:
+        with self.lock:
+            self.stats.setdefault(endpoint, []).append({
+                "status": status, "duration": duration, "bytes_in": bytes_in, "bytes_out": bytes_out,
+            })
+
+    def roll_failure(self) -> Optional[int]:
+        """按配置的比例随机返回429或500"""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.config.rate_limit_rate:
+            return 429
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 500
+        return None
+
+    def latency(self, base_ms: float) -> float:
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.config.jitter, self.config.jitter)
+        return max(0.0, base_ms * factor / 1000)
+
+
+class FakeGLMHandler(BaseHTTPRequestHandler):
+    """模拟GLM接口的请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeGLM/1.0"
+    state: FakeGLMState  # 由 make_server 注入
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass  # 压测时不打印访问日志
+
+    # ---- 响应工具 ----
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None) -> int:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def _send_failure(self, status: int) -> int:
+        if status == 429:
+            return self._send_json(429, {"error": {"code": "1302", "message": "请求频率过高"}},
+                                   {"Retry-After": f"{self.state.config.retry_after:g}"})
+        return self._send_json(500, {"error": {"code": "500", "message": "模拟服务器错误"}})
+
+    def _handle(self, endpoint: str, latency_ms: float, handler) -> None:
+        start = time.monotonic()
+        body = self._read_body()
+        time.sleep(self.state.latency(latency_ms))
+        failure = self.state.roll_failure()
+        if failure:
+            status, bytes_out = failure, self._send_failure(failure)
+        else:
+            status, bytes_out = handler(body)
+        self.state.record(endpoint, status, time.monotonic() - start, len(body), bytes_out)
+
+    # ---- 路由 ----
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/_stats"):
+            self._send_json(200, {"config": asdict(self.state.config), "endpoints": self.state.stats})
+        elif path.endswith("/content") and "/files/" in path:
+            file_id = path.split("/files/", 1)[1].rsplit("/content", 1)[0]
+            self._handle("file_content", self.state.config.content_latency_ms, lambda body: self._file_content(file_id))
+        elif "/files/" in path:
+            file_id = path.split("/files/", 1)[1]
+            self._handle("file_info", 0, lambda body: self._file_info(file_id))
+        elif path.endswith("/files"):
+            self._handle("file_list", 0, lambda body: self._file_list(parse_qs(urlsplit(self.path).query)))
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/files"):
+            self._handle("upload", self.state.config.upload_latency_ms, self._upload)
+        elif path.endswith("/chat/completions"):
+            self._chat()
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_DELETE(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        file_id = path.split("/files/", 1)[-1]
+
+        def delete(body: bytes):
+            with self.state.lock:
+                existed = self.state.files.pop(file_id, None) is not None
+            if not existed:
+                return 404, self._send_json(404, {"error": {"message": "文件不存在"}})
+            return 200, self._send_json(200, {"id": file_id, "object": "file", "deleted": True})
+
+        self._handle("delete", 0, delete)
+
+    # ---- 接口实现 ----
+
+    def _upload(self, body: bytes):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        filename = "upload"
+        marker = b'filename="'
+        if marker in body:
+            start = body.index(marker) + len(marker)
+            filename = body[start:body.index(b'"', start)].decode("utf-8", "replace")
+        info = {
+            "id": file_id, "object": "file", "bytes": len(body), "filename": filename,
+            "purpose": "file-extract", "created_at": int(time.time()),
+        }
+        with self.state.lock:
+            self.state.files[file_id] = info
+        return 200, self._send_json(200, info)
+
+    def _file_list(self, query: Dict[str, List[str]]):
+        """按上传顺序分页返回文件列表，支持 purpose、limit 和 after 游标"""
+        limit = int(query.get("limit", ["20"])[0])
+        purpose = query.get("purpose", [None])[0]
+        after = query.get("after", [None])[0]
+        with self.state.lock:
+            files = [info for info in self.state.files.values() if purpose is None or info["purpose"] == purpose]
+        if after:
+            ids = [info["id"] for info in files]
+            files = files[ids.index(after) + 1:] if after in ids else []
+        page = files[:limit]
+        return 200, self._send_json(200, {"object": "list", "data": page, "has_more": len(files) > limit})
+
+    def _file_info(self, file_id: str):
+        info = self.state.files.get(file_id)
+        if info is None:
+            return 404, self._send_json(404, {"error": {"message": "文件不存在"}})
+        return 200, self._send_json(200, info)
+
+    def _file_content(self, file_id: str):
+        info = self.state.files.get(file_id)
+        if info is None:
+            return 404, self._send_json(404, {"error": {"message": "文件不存在"}})
+        content = _filler_text(self.state.config.content_chars, info["filename"])
+        return 200, self._send_json(200, {"content": content, "file_type": "pdf", "filename": info["filename"]})
+
+    def _chat(self) -> None:
+        start = time.monotonic()
+        body = self._read_body()
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        config = self.state.config
+        latency = self.state.latency(config.chat_latency_ms)
+        failure = self.state.roll_failure()
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        response_chars = config.response_chars
+        max_tokens = payload.get("max_tokens")
+        finish_reason = "stop"
+        if max_tokens and response_chars // 2 > max_tokens:
+            response_chars, finish_reason = max_tokens * 2, "length"
+        usage = {"prompt_tokens": prompt_chars // 2, "completion_tokens": response_chars // 2,
+                 "total_tokens": prompt_chars // 2 + response_chars // 2}
+        text = _filler_text(response_chars, "提取结果")
+
+        if failure:
+            time.sleep(latency)
+            status, bytes_out = failure, self._send_failure(failure)
+        elif payload.get("stream"):
+            status, bytes_out = 200, self._stream(text, latency, finish_reason, usage)
+        else:
+            time.sleep(latency)
+            status = 200
+            bytes_out = self._send_json(200, {
+                "id": f"chat-{uuid.uuid4().hex[:12]}", "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+        self.state.record("chat", status, time.monotonic() - start, len(body), bytes_out)
+
+    def _stream(self, text: str, latency: float, finish_reason: str, usage: Dict[str, int]) -> int:
+        """以SSE分块返回，首个事件在总延迟的30%处发出，其余事件均匀分布"""
+        size = max(1, self.state.config.stream_chunk_chars)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+
+        def write_event(data: str) -> None:
+            nonlocal sent
+            chunk = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+            sent += len(chunk)
+
+        time.sleep(latency * 0.3)
+        interval = latency * 0.7 / len(pieces)
+        for index, piece in enumerate(pieces):
+            event: Dict[str, Any] = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+            if index == len(pieces) - 1:
+                event["choices"][0]["finish_reason"] = finish_reason
+                event["usage"] = usage
+            write_event(json.dumps(event, ensure_ascii=False))
+            time.sleep(interval)
+        write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        return sent
+
+
+def make_server(config: FakeServerConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """创建模拟服务器（port为0时自动选择空闲端口）"""
+    handler = type("BoundFakeGLMHandler", (FakeGLMHandler,), {"state": FakeGLMState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    defaults = FakeServerConfig()
+    parser = argparse.ArgumentParser(description="本地模拟GLM服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="监听端口，0表示自动选择")
+    for name, value in asdict(defaults).items():
+        arg_type = int if isinstance(value, int) or name == "seed" else float
+        parser.add_argument(f"--{name.replace('_', '-')}", type=arg_type, default=value)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    config = FakeServerConfig(**{name: getattr(args, name) for name in asdict(FakeServerConfig())})
+    server = make_server(config, args.host, args.port)
+    # 第一行输出实际监听地址，供压测脚本读取
+    print(f"LISTENING http://{server.server_address[0]}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测脚本 - 启动本地模拟GLM服务器，生成测试文档，走真实的 process_documents 流程，
+报告吞吐量（文档/秒）、各阶段 p50/p95/p99 延迟和峰值内存
+
+示例:
+    python benchmarks/run_benchmark.py --docs 50 --concurrency 8 --chat-latency-ms 800 --rate-limit-rate 0.05
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import subprocess
+import tempfile
+import zipfile
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 添加项目根目录到Python路径，以便导入模块
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+
+from benchmarks.fake_glm_server import FakeServerConfig
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不报告峰值内存
+    resource = None
+
+# 压测运行时设置的环境变量（与 utils.glm_client / utils.extraction_cache 中的定义一致）
+API_BASE_ENV = "GLM_API_BASE"
+CACHE_DIR_ENV = "DOC_EXTRACTION_CACHE_DIR"
+NO_CACHE_ENV = "DOC_EXTRACTION_NO_CACHE"
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))  # 向上取整
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """计算延迟分布摘要（秒）"""
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ---- 测试文档生成 ----
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40) -> None:
+    """写出带文本层的最小PDF（不依赖第三方库），文本包含文件名，保证每个文件内容不同"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    font_id = 3
+    objects: Dict[int, bytes] = {font_id: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    next_id = 4
+    for page in range(pages):
+        page_id, content_id = next_id, next_id + 1
+        next_id += 2
+        lines = " ".join(f"({name} page {page + 1} line {line + 1}: lorem ipsum dolor sit amet) '"
+                         for line in range(lines_per_page))
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {lines} ET".encode("ascii")
+        objects[content_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        objects[page_id] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>").encode()
+        kids.append(f"{page_id} 0 R")
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for object_id in sorted(objects):
+        output += b"%010d 00000 n \n" % offsets[object_id]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+def write_docx(path: str, sections: int) -> None:
+    """写出只含标题和段落的最小 .docx"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    body = []
+    for section in range(sections):
+        body.append(f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>第{section + 1}章</w:t></w:r></w:p>')
+        body.extend(f"<w:p><w:r><w:t>{name} 压测段落 {section + 1}.{i + 1}：示例文本内容。</w:t></w:r></w:p>" for i in range(20))
+    document = ('<?xml version="1.0" encoding="UTF-8"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f"<w:body>{''.join(body)}</w:body></w:document>")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document)
+
+
+def generate_corpus(input_dir: str, docs: int, pages: int, docx_ratio: float = 0.0) -> None:
+    """在输入目录生成压测文档，docx_ratio为 .docx 所占比例"""
+    os.makedirs(input_dir, exist_ok=True)
+    docx_count = int(round(docs * docx_ratio))
+    for index in range(docs):
+        if index < docx_count:
+            write_docx(os.path.join(input_dir, f"bench_{index:04d}.docx"), sections=pages)
+        else:
+            write_pdf(os.path.join(input_dir, f"bench_{index:04d}.pdf"), pages=pages)
+
+
+# ---- 模拟服务器 ----
+
+def start_fake_server(config: FakeServerConfig) -> Tuple[subprocess.Popen, str]:
+    """在子进程中启动模拟服务器（不计入压测进程的内存），返回进程和API地址"""
+    command = [sys.executable, "-m", "benchmarks.fake_glm_server"]
+    for name, value in asdict(config).items():
+        if value is not None:
+            command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().strip()
+    if not line.startswith("LISTENING "):
+        process.kill()
+        raise RuntimeError(f"模拟服务器启动失败: {line}")
+    return process, line.split(" ", 1)[1] + "/api/paas/v4"
+
+
+def stage_report(server_stats: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """汇总模拟服务器记录的各阶段延迟和状态码"""
+    stages = {}
+    for endpoint, records in sorted(server_stats.items()):
+        summary = summarize([record["duration"] for record in records if record["status"] == 200])
+        summary["status_429"] = sum(1 for record in records if record["status"] == 429)
+        summary["status_5xx"] = sum(1 for record in records if record["status"] >= 500)
+        summary["bytes_in"] = sum(record["bytes_in"] for record in records)
+        summary["bytes_out"] = sum(record["bytes_out"] for record in records)
+        stages[endpoint] = summary
+    return stages
+
+
+# ---- 压测 ----
+
+def run_benchmark(config: FakeServerConfig, docs: int = 20, pages: int = 10, docx_ratio: float = 0.0,
+                  concurrency: int = 3, stream: bool = False, use_cache: bool = False,
+                  verbose: bool = False) -> Dict[str, Any]:
+    """
+    运行一次压测
+
+    Args:
+        config: 模拟服务器配置
+        docs: 文档数量
+        pages: 每个PDF的页数（docx为章节数）
+        docx_ratio: .docx 文档所占比例
+        concurrency: process_documents 的并发数
+        stream: 是否使用流式输出
+        use_cache: 是否启用抽取结果缓存（默认关闭，每次都走完整流程）
+        verbose: 是否显示处理过程的日志（否则只显示错误）
+
+    Returns:
+        压测报告
+    """
+    process, api_base = start_fake_server(config)
+    saved_env = {name: os.environ.get(name) for name in (API_BASE_ENV, CACHE_DIR_ENV, NO_CACHE_ENV)}
+    try:
+        with tempfile.TemporaryDirectory(prefix="glm_bench_") as tmp_dir:
+            input_dir = os.path.join(tmp_dir, "input")
+            output_dir = os.path.join(tmp_dir, "output")
+            generate_corpus(input_dir, docs, pages, docx_ratio)
+
+            # 设置环境变量，使请求发往模拟服务器、缓存写入临时目录（项目模块在每次使用时读取这些变量）
+            os.environ[API_BASE_ENV] = api_base
+            os.environ[CACHE_DIR_ENV] = os.path.join(tmp_dir, "cache")
+            if use_cache:
+                os.environ.pop(NO_CACHE_ENV, None)
+            else:
+                os.environ[NO_CACHE_ENV] = "1"
+            from process_documents import process_documents_async
+            from utils.metrics import get_metrics
+            from utils.rate_limiter import reset_rate_limiters
+            from utils.resilience import reset_circuit_breakers
+            from utils.hedging import reset_hedgers
+            get_metrics().reset()
+            reset_rate_limiters()
+            reset_circuit_breakers()
+            reset_hedgers()
+
+            start_time = time.monotonic()
+            if not verbose:
+                # 只保留错误日志，避免重试等警告淹没压测输出
+                logging.disable(logging.WARNING)
+            try:
+                results = asyncio.run(process_documents_async(input_dir, output_dir, concurrency=concurrency,
+                                                              use_cache=use_cache, stream=stream, mode="force"))
+            finally:
+                logging.disable(logging.NOTSET)
+            wall_time = time.monotonic() - start_time
+
+        server_stats = httpx.get(f"{api_base}/_stats", timeout=10).json()["endpoints"]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    stages = {"document": summarize([r["elapsed"] for r in results])}
+    stages.update(stage_report(server_stats))
+    return {
+        "params": {"docs": docs, "pages": pages, "docx_ratio": docx_ratio, "concurrency": concurrency,
+                   "stream": stream, "use_cache": use_cache, "server": asdict(config)},
+        "documents": {"total": len(results), "succeeded": succeeded, "failed": len(results) - succeeded},
+        "wall_time": round(wall_time, 3),
+        "docs_per_sec": round(len(results) / wall_time, 3) if wall_time else 0.0,
+        "stages": stages,
+        # 客户端记录的指标（含重试次数和token用量），与服务端统计互相印证
+        "client_metrics": get_metrics().snapshot(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """打印压测报告"""
+    documents = report["documents"]
+    print("\n📊 压测结果:")
+    print(f"   文档: {documents['total']} (成功 {documents['succeeded']}, 失败 {documents['failed']})")
+    print(f"   总耗时: {report['wall_time']:.2f}s, 吞吐量: {report['docs_per_sec']:.2f} 文档/秒")
+    if report["peak_rss_mb"] is not None:
+        print(f"   峰值内存: {report['peak_rss_mb']:.1f} MB")
+    retries = sum(r["value"] for r in report["client_metrics"] if r["name"] == "http_retries_total")
+    print(f"   客户端重试次数: {retries:g}")
+    print(f"\n   {'阶段':<14}{'次数':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'429':>6}{'5xx':>6}")
+    for stage, summary in report["stages"].items():
+        print(f"   {stage:<14}{summary['count']:>6}{summary['p50']:>9.3f}{summary['p95']:>9.3f}"
+              f"{summary['p99']:>9.3f}{summary['max']:>9.3f}{summary.get('status_429', ''):>6}"
+              f"{summary.get('status_5xx', ''):>6}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="使用本地模拟GLM服务器压测文档处理流程")
+    parser.add_argument("--docs", type=int, default=20, help="文档数量 (默认: 20)")
+    parser.add_argument("--pages", type=int, default=10, help="每个PDF的页数 (默认: 10)")
+    parser.add_argument("--docx-ratio", type=float, default=0.0, help=".docx文档所占比例 (默认: 0)")
+    parser.add_argument("--concurrency", type=int, default=3, help="同时处理的文档数量 (默认: 3)")
+    parser.add_argument("--stream", action="store_true", help="使用流式输出")
+    parser.add_argument("--use-cache", action="store_true", help="启用抽取结果缓存")
+    parser.add_argument("--verbose", action="store_true", help="显示处理过程的日志")
+    parser.add_argument("--json", help="将压测报告写入JSON文件")
+    server = parser.add_argument_group("模拟服务器")
+    for name, value in asdict(FakeServerConfig()).items():
+        arg_type = int if isinstance(value, int) or name == "seed" else float
+        server.add_argument(f"--{name.replace('_', '-')}", type=arg_type, default=value)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    from utils.log_config import configure_logging
+    configure_logging()
+    server_config = FakeServerConfig(**{name: getattr(args, name) for name in asdict(FakeServerConfig())})
+    report = run_benchmark(server_config, docs=args.docs, pages=args.pages, docx_ratio=args.docx_ratio,
+                           concurrency=args.concurrency, stream=args.stream, use_cache=args.use_cache,
+                           verbose=args.verbose)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 压测报告已保存: {args.json}")
@@ -4,9 +4,12 @@
 处理文件夹中的所有 PDF 和 Word 文档
 """
 import os
+import logging
 import sys
+import time
+import argparse
 import asyncio
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Any, Optional
 
 # 添加当前目录到Python路径，以便导入模块
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,73 +17,284 @@ if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
 from src.unified_content_extraction_workflow import UnifiedContentExtractionWorkflow
+from utils.document_extractor import ExtractionStatus
+from utils.http_client import close_async_client
+from utils.deadline import deadline_scope
+from utils.config_registry import get_registry
+from utils.run_manifest import RunManifest, MANIFEST_FILENAME, MODE_INCREMENTAL, MODE_FORCE, MODE_ONLY_FAILED
+from utils.log_config import LOG_FORMATS, configure_logging
 
-def process_documents(input_dir, output_dir, batch_size: int = 3):
+logger = logging.getLogger(__name__)
+
+# 支持的文件扩展名及其对应的处理类型
+SUPPORTED_EXTENSIONS = {
+    ".pdf": "pdf",
+    ".doc": "docx",
+    ".docx": "docx",
+}
+
+DEFAULT_CONCURRENCY = 3
+
+
+def collect_documents(input_dir: str) -> List[Tuple[str, str]]:
     """
-    处理文件夹中的所有 PDF 和 Word 文档，支持批量处理
-    
+    扫描输入目录，收集所有待处理的文档
+
+    Args:
+        input_dir: 输入目录
+
+    Returns:
+        (文件路径, 文件类型) 列表，PDF与Word文件按文件名排序放在同一队列中
+    """
+    documents = []
+    for filename in sorted(os.listdir(input_dir)):
+        file_path = os.path.join(input_dir, filename)
+        if not os.path.isfile(file_path):
+            continue
+        file_type = SUPPORTED_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+        if file_type:
+            documents.append((file_path, file_type))
+    return documents
+
+
+async def _process_one(workflow: UnifiedContentExtractionWorkflow, file_path: str, file_type: str) -> Dict[str, Any]:
+    """处理单个文档并返回结果摘要"""
+    result = {
+        "file": file_path,
+        "file_type": file_type,
+        "status": "failed",
+        "output_path": None,
+        "elapsed": 0.0,
+        "error": None,
+    }
+    start_time = time.monotonic()
+    try:
+        logger.info("📄 处理: %s", os.path.basename(file_path))
+        status = ExtractionStatus()
+        markdown_content = await workflow.run_from_file(file_path, file_type, status=status)
+        if markdown_content and status.degraded:
+            # 已保存不完整的内容，运行清单不记为成功，下次运行重新处理
+            result["status"] = "partial"
+            result["output_path"] = workflow.get_output_path(file_path)
+            result["error"] = '；'.join(status.reasons)
+        elif markdown_content:
+            result["status"] = "success"
+            result["output_path"] = workflow.get_output_path(file_path)
+        else:
+            result["error"] = "未提取到内容或保存失败"
+    except Exception as e:
+        logger.error("❌ 处理文件失败 %s: %s", os.path.basename(file_path), e)
+        result["error"] = str(e)
+    result["elapsed"] = round(time.monotonic() - start_time, 3)
+    return result
+
+
+def _skipped_result(manifest: RunManifest, file_path: str, file_type: str) -> Dict[str, Any]:
+    """本次无需处理的文档的结果摘要（输出路径取自清单）"""
+    entry = manifest.get(file_path) or {}
+    return {
+        "file": file_path,
+        "file_type": file_type,
+        "status": "skipped",
+        "output_path": entry.get("output_path"),
+        "elapsed": 0.0,
+        "error": None,
+    }
+
+
+async def process_documents_async(input_dir: str, output_dir: str, concurrency: int = DEFAULT_CONCURRENCY,
+                                  use_cache: bool = True, stream: bool = False,
+                                  mode: str = MODE_INCREMENTAL, metrics_jsonl: Optional[str] = None,
+                                  metrics_prom: Optional[str] = None,
+                                  delete_uploads: Optional[bool] = None, document_timeout: Optional[float] = None,
+                                  batch_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    在同一个事件循环中并发处理文件夹中的所有 PDF 和 Word 文档
+
     Args:
         input_dir: 输入目录
         output_dir: 输出目录
-        batch_size: 批量处理大小，默认为3
+        concurrency: 同时处理的文档数量上限
+        use_cache: 是否使用抽取结果缓存
+        stream: 是否流式输出，模型输出边生成边写入输出文件
+        mode: 文档选择模式，incremental 只处理新增、修改过或上次失败的文档，
+              force 处理全部文档，only_failed 只处理上次失败的文档
+        metrics_jsonl: 处理结束后以JSON Lines格式追加写出运行指标的文件路径
+        metrics_prom: 处理结束后以Prometheus文本格式写出运行指标的文件路径
+        delete_uploads: 抽取成功后是否删除上传到服务器的文件，None时读取配置 cleanup.delete_after_extraction
+        document_timeout: 单个文档的时间预算（秒），None时读取配置 deadlines.document_seconds
+        batch_timeout: 整批处理的时间预算（秒），None时读取配置 deadlines.batch_seconds；用完时正在处理的文档被放弃，
+            尚未开始的文档直接记为失败，下次运行时重新处理
+
+    Returns:
+        每个文件的处理结果摘要列表，顺序与扫描顺序一致，本次跳过的文档状态为 skipped，
+        保存了不完整内容（模型未能完整处理）的文档状态为 partial，下次运行重新处理
     """
+    # 启动时一次性加载并校验配置和提示词，配置有误时立即失败
+    get_registry().load()
+    deadlines = get_registry().get_section("deadlines")
+    if document_timeout is None:
+        document_timeout = deadlines.get("document_seconds")
+    if batch_timeout is None:
+        batch_timeout = deadlines.get("batch_seconds")
+
     # 初始化工作流
-    workflow = UnifiedContentExtractionWorkflow(base_dir=input_dir, output_dir=output_dir)
-    
-    # 收集所有文件
-    pdf_files = []
-    doc_files = []
-    
-    print(f"🔍 扫描输入目录: {input_dir}")
-    for filename in os.listdir(input_dir):
-        file_path = os.path.join(input_dir, filename)
-        if filename.lower().endswith('.pdf'):
-            pdf_files.append(file_path)
-        elif filename.lower().endswith(('.doc', '.docx')):
-            doc_files.append(file_path)
-    
-    print(f"📁 找到 {len(pdf_files)} 个PDF文件")
-    print(f"📄 找到 {len(doc_files)} 个Word文件")
-    
-    # 批量处理PDF文件
-    if pdf_files:
-        print(f"\n🚀 开始批量处理PDF文件 (批次大小: {batch_size})")
-        for i in range(0, len(pdf_files), batch_size):
-            batch = pdf_files[i:i + batch_size]
-            print(f"\n📦 处理PDF批次 {i//batch_size + 1}/{(len(pdf_files) + batch_size - 1)//batch_size}")
-            print(f"📋 批次文件: {[os.path.basename(f) for f in batch]}")
-            
-            for file_path in batch:
-                try:
-                    print(f"📄 处理: {os.path.basename(file_path)}")
-                    asyncio.run(workflow.run_from_file(file_path, "pdf"))
-                except Exception as e:
-                    print(f"❌ 处理文件失败 {os.path.basename(file_path)}: {e}")
-    
-    # 批量处理Word文件
-    if doc_files:
-        print(f"\n🚀 开始批量处理Word文件 (批次大小: {batch_size})")
-        for i in range(0, len(doc_files), batch_size):
-            batch = doc_files[i:i + batch_size]
-            print(f"\n📦 处理Word批次 {i//batch_size + 1}/{(len(doc_files) + batch_size - 1)//batch_size}")
-            print(f"📋 批次文件: {[os.path.basename(f) for f in batch]}")
-            
-            for file_path in batch:
-                try:
-                    print(f"📄 处理: {os.path.basename(file_path)}")
-                    asyncio.run(workflow.run_from_file(file_path, "docx"))
-                except Exception as e:
-                    print(f"❌ 处理文件失败 {os.path.basename(file_path)}: {e}")
-    
+    workflow = UnifiedContentExtractionWorkflow(base_dir=input_dir, output_dir=output_dir, use_cache=use_cache,
+                                                stream=stream, delete_uploads=delete_uploads,
+                                                document_timeout=document_timeout)
+
+    logger.debug("🔍 扫描输入目录: %s", input_dir)
+    documents = collect_documents(input_dir)
+    pdf_count = sum(1 for _, file_type in documents if file_type == "pdf")
+    logger.info("📁 找到 %s 个PDF文件", pdf_count)
+    logger.info("📄 找到 %s 个Word文件", len(documents) - pdf_count)
+
+    if not documents:
+        return []
+
+    # 运行清单保存在输出目录下，按清单筛选本次需要处理的文档
+    manifest = RunManifest(os.path.join(output_dir, MANIFEST_FILENAME))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(documents)
+
+    # PDF和Word文件共用一个任务队列
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, (file_path, file_type) in enumerate(documents):
+        if await asyncio.to_thread(manifest.needs_processing, file_path, mode):
+            queue.put_nowait((index, file_path, file_type))
+        else:
+            results[index] = _skipped_result(manifest, file_path, file_type)
+
+    pending_count = queue.qsize()
+    logger.info("📋 本次需要处理 %s 个文档，跳过 %s 个 (模式: %s)", pending_count, len(documents) - pending_count, mode)
+    if not pending_count:
+        return results
+
+    concurrency = max(1, min(concurrency, pending_count))
+    logger.info("🚀 开始并发处理文档 (并发数: %s)", concurrency)
+
+    async def worker() -> None:
+        while True:
+            try:
+                index, file_path, file_type = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = await _process_one(workflow, file_path, file_type)
+            results[index] = result
+            try:
+                await asyncio.to_thread(manifest.record, file_path, result)
+            except OSError as e:
+                logger.warning("⚠️ 更新运行清单失败 %s: %s", os.path.basename(file_path), e)
+            queue.task_done()
+
+    try:
+        # 批次截止时间由各worker任务继承，每个文档的截止时间取文档预算和批次剩余时间中较早者
+        with deadline_scope(batch_timeout):
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        # 所有文档共用一个连接池，处理结束后统一关闭
+        await close_async_client()
+        workflow.export_metrics(metrics_jsonl, metrics_prom)
+    return results
+
+
+def print_summary(results: List[Dict[str, Any]]) -> None:
+    """打印批量处理结果摘要"""
+    success = [r for r in results if r["status"] == "success"]
+    partial = [r for r in results if r["status"] == "partial"]
+    skipped = [r for r in results if r["status"] == "skipped"]
+    failed = [r for r in results if r["status"] == "failed"]
+
+    print(f"\n📊 处理结果统计:")
+    print(f"   总文件数: {len(results)}")
+    print(f"   处理成功: {len(success)}")
+    print(f"   部分成功: {len(partial)}")
+    print(f"   跳过: {len(skipped)}")
+    print(f"   处理失败: {len(failed)}")
+    for r in results:
+        if r["status"] == "skipped":
+            continue
+        status_icon = {"success": "✅", "partial": "⚠️"}.get(r["status"], "❌")
+        detail = r["output_path"] if r["status"] == "success" else r["error"]
+        print(f"   {status_icon} {os.path.basename(r['file'])} ({r['elapsed']:.1f}s): {detail}")
+
+
+def process_documents(input_dir, output_dir, batch_size: int = DEFAULT_CONCURRENCY, concurrency: Optional[int] = None,
+                      use_cache: bool = True, stream: bool = False, mode: str = MODE_INCREMENTAL,
+                      metrics_jsonl: Optional[str] = None, metrics_prom: Optional[str] = None,
+                      delete_uploads: Optional[bool] = None, document_timeout: Optional[float] = None,
+                      batch_timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    处理文件夹中的所有 PDF 和 Word 文档，支持并发处理
+
+    Args:
+        input_dir: 输入目录
+        output_dir: 输出目录
+        batch_size: 兼容旧接口，未指定concurrency时作为并发数使用
+        concurrency: 同时处理的文档数量上限
+        use_cache: 是否使用抽取结果缓存
+        stream: 是否流式输出，模型输出边生成边写入输出文件
+        mode: 文档选择模式（incremental / force / only_failed）
+        metrics_jsonl: 以JSON Lines格式追加写出运行指标的文件路径
+        metrics_prom: 以Prometheus文本格式写出运行指标的文件路径
+        delete_uploads: 抽取成功后是否删除上传到服务器的文件，None时读取配置
+        document_timeout: 单个文档的时间预算（秒），None时读取配置
+        batch_timeout: 整批处理的时间预算（秒），None时读取配置
+
+    Returns:
+        每个文件的处理结果摘要列表
+    """
+    results = asyncio.run(process_documents_async(input_dir, output_dir, concurrency or batch_size, use_cache, stream,
+                                                  mode, metrics_jsonl, metrics_prom, delete_uploads,
+                                                  document_timeout, batch_timeout))
+    print_summary(results)
     print(f"\n✅ 所有文件处理完成！")
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="批量将PDF和Word文档转换为Markdown")
+    parser.add_argument("--input", default="input", help="输入目录 (默认: input)")
+    parser.add_argument("--output", default="output", help="输出目录 (默认: output)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"同时处理的文档数量 (默认: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--no-cache", action="store_true", help="跳过抽取结果缓存，强制重新抽取")
+    parser.add_argument("--stream", action="store_true", help="流式输出，模型输出边生成边写入输出文件")
+    parser.add_argument("--delete-uploads", action="store_true", default=None,
+                        help="每个文档抽取成功后删除上传到服务器的文件 (默认读取配置 cleanup.delete_after_extraction)")
+    parser.add_argument("--document-timeout", type=float, metavar="SECONDS",
+                        help="单个文档的时间预算，所有请求共用，用完时放弃该文档 (默认读取配置 deadlines.document_seconds)")
+    parser.add_argument("--batch-timeout", type=float, metavar="SECONDS",
+                        help="整批处理的时间预算，用完时放弃未完成的文档 (默认读取配置 deadlines.batch_seconds)")
+    parser.add_argument("--metrics-jsonl", metavar="PATH",
+                        help="处理结束后以JSON Lines格式追加写出各阶段耗时、重试、字节数和token用量指标")
+    parser.add_argument("--metrics-prom", metavar="PATH", help="处理结束后以Prometheus文本格式写出运行指标")
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), type=str.upper,
+                        help="日志级别，DEBUG时输出完整的API响应内容 (默认: 环境变量 DOC_EXTRACTION_LOG_LEVEL 或 INFO)")
+    parser.add_argument("--log-format", choices=LOG_FORMATS,
+                        help="日志格式，json 每行输出一条JSON日志 (默认: 环境变量 DOC_EXTRACTION_LOG_FORMAT 或 text)")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--force", action="store_true", help="忽略运行清单，重新处理所有文档")
+    selection.add_argument("--only-failed", action="store_true", help="只重新处理运行清单中上次失败的文档")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    # 示例用法
-    input_directory = r"input"  # 输入目录
-    output_directory = r"output"  # 输出目录
-    
+    args = parse_args()
+    configure_logging(args.log_level, args.log_format)
+
     # 确保目录存在
-    os.makedirs(input_directory, exist_ok=True)
-    os.makedirs(output_directory, exist_ok=True)
-    
-    process_documents(input_directory, output_directory)
\ No newline at end of file
+    os.makedirs(args.input, exist_ok=True)
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.force:
+        mode = MODE_FORCE
+    elif args.only_failed:
+        mode = MODE_ONLY_FAILED
+    else:
+        mode = MODE_INCREMENTAL
+    results = process_documents(args.input, args.output, concurrency=args.concurrency, use_cache=not args.no_cache,
+                                 stream=args.stream, mode=mode, metrics_jsonl=args.metrics_jsonl,
+                                 metrics_prom=args.metrics_prom, delete_uploads=args.delete_uploads,
+                                 document_timeout=args.document_timeout, batch_timeout=args.batch_timeout)
+    sys.exit(1 if any(r["status"] in ("failed", "partial") for r in results) else 0)
@@ -4,9 +4,17 @@
 基础工作流类
 """
 import os
+import logging
 from abc import ABC, abstractmethod
 from typing import Optional
 
+try:
+    from ..utils.metrics import get_metrics, STAGE_FILE_SAVE
+except ImportError:
+    from utils.metrics import get_metrics, STAGE_FILE_SAVE
+
+logger = logging.getLogger(__name__)
+
 class BaseWorkflow(ABC):
     """
     基础工作流抽象类
@@ -28,9 +36,9 @@ class BaseWorkflow(ABC):
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
         
-        print(f"🏗️ 基础工作流已初始化")
-        print(f"📁 基础目录: {self.base_dir}")
-        print(f"📤 输出目录: {self.output_dir}")
+        logger.debug("🏗️ 基础工作流已初始化")
+        logger.debug("📁 基础目录: %s", self.base_dir)
+        logger.debug("📤 输出目录: %s", self.output_dir)
     
     @abstractmethod
     async def run(self, **kwargs) -> Optional[str]:
@@ -45,16 +53,24 @@ class BaseWorkflow(ABC):
         """
         pass
     
-    def _save_markdown(self, markdown_content: str, source_path: str, file_type: str) -> None:
-        """保存Markdown内容到文件"""
+    def get_output_path(self, source_path: str) -> str:
+        """根据源文件路径计算Markdown输出路径"""
+        base_filename = os.path.splitext(os.path.basename(source_path))[0]
+        output_filename = f"{base_filename}_extracted_content.md"
+        return os.path.join(self.output_dir, output_filename)
+    
+    def _save_markdown(self, markdown_content: str, source_path: str, file_type: str) -> Optional[str]:
+        """保存Markdown内容到文件，成功返回输出路径"""
         try:
-            base_filename = os.path.splitext(os.path.basename(source_path))[0]
-            output_filename = f"{base_filename}_extracted_content.md"
-            output_path = os.path.join(self.output_dir, output_filename)
+            output_path = self.get_output_path(source_path)
             
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_content)
+            with get_metrics().timed(STAGE_FILE_SAVE, file_type=file_type):
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(markdown_content)
+            get_metrics().inc("output_bytes_total", len(markdown_content.encode('utf-8')), file_type=file_type)
             
-            print(f"Markdown内容已保存至: {output_path}")
+            logger.info("Markdown内容已保存至: %s", output_path)
+            return output_path
         except Exception as e:
-            print(f"❌ 保存Markdown内容失败: {e}")
\ No newline at end of file
+            logger.error("❌ 保存Markdown内容失败: %s", e)
+            return None
\ No newline at end of file
@@ -4,6 +4,8 @@
 统一内容抽取工作流 - 支持从PDF和Word文件抽取内容
 """
 import os
+import logging
+import time
 from typing import Optional, List, Dict
 from datetime import datetime
 import asyncio
@@ -11,11 +13,21 @@ import asyncio
 # 尝试相对导入
 try:
     from .base_workflow import BaseWorkflow
-    from ..utils.document_extractor import extract_content_from_pdf, extract_content_from_docx
+    from ..utils.document_extractor import (
+        ExtractionStatus, extract_content_from_pdf_async, extract_content_from_docx_async,
+    )
+    from ..utils.metrics import MetricsRegistry, get_metrics, STAGE_DOCUMENT
+    from ..utils.deadline import DeadlineExceeded, run_with_deadline
 except ImportError:
     # 如果相对导入失败，尝试绝对导入
     from src.base_workflow import BaseWorkflow
-    from utils.document_extractor import extract_content_from_pdf, extract_content_from_docx
+    from utils.document_extractor import (
+        ExtractionStatus, extract_content_from_pdf_async, extract_content_from_docx_async,
+    )
+    from utils.metrics import MetricsRegistry, get_metrics, STAGE_DOCUMENT
+    from utils.deadline import DeadlineExceeded, run_with_deadline
+
+logger = logging.getLogger(__name__)
 
 class UnifiedContentExtractionWorkflow(BaseWorkflow):
     """
@@ -27,10 +39,28 @@ class UnifiedContentExtractionWorkflow(BaseWorkflow):
     3. 传递内容给后续处理步骤
     """
     
-    def __init__(self, base_dir: str, output_dir: str):
+    def __init__(self, base_dir: str, output_dir: str, use_cache: bool = True, stream: bool = False,
+                 delete_uploads: Optional[bool] = None, document_timeout: Optional[float] = None):
+        """
+        初始化统一内容抽取工作流
+        
+        Args:
+            base_dir: 基础目录，用于存放输入文件
+            output_dir: 输出目录，用于存放处理结果
+            use_cache: 是否使用抽取结果缓存
+            stream: 是否流式输出，开启后模型输出边生成边写入目标Markdown文件
+            delete_uploads: 抽取成功后是否删除上传到服务器的文件，None时读取配置 cleanup.delete_after_extraction
+            document_timeout: 单个文档的时间预算（秒），上传、获取内容、聊天和图片分析等所有请求共用，
+                用完时放弃该文档；None表示不限制（仍受调用方设置的批次截止时间约束）
+        """
         super().__init__(base_dir, output_dir)
-        self.loop = asyncio.get_event_loop()
-        print("🚀 Unified Content Extraction Workflow 已初始化")
+        self.use_cache = use_cache
+        self.stream = stream
+        self.delete_uploads = delete_uploads
+        self.document_timeout = document_timeout
+        # 进程内共享的指标注册表，记录各阶段耗时、重试次数、收发字节数和token用量
+        self.metrics: MetricsRegistry = get_metrics()
+        logger.debug("🚀 Unified Content Extraction Workflow 已初始化")
     
     async def run(self, **kwargs) -> Optional[str]:
         """
@@ -45,55 +75,100 @@ class UnifiedContentExtractionWorkflow(BaseWorkflow):
         else:
             raise ValueError("必须提供 pdf_path 或 docx_path 参数")
     
-    async def run_from_file(self, file_path: str, file_type: str) -> Optional[str]:
+    async def run_from_file(self, file_path: str, file_type: str,
+                            status: Optional[ExtractionStatus] = None) -> Optional[str]:
         """
         从文件运行内容抽取工作流（支持PDF和Word文档）
         
         Args:
             file_path: 输入文件路径
             file_type: 文件类型（"pdf" 或 "docx"）
+            status: 结果状态，提供时记录结果是否降级（模型未能完整处理，仍会保存已得到的内容）
             
         Returns:
-            Markdown格式的内容，失败返回None
+            Markdown格式的内容，失败或保存输出文件失败时返回None
+
+        Raises:
+            DeadlineExceeded: 超过单个文档的时间预算或批次截止时间，未完成的请求已全部取消
         """
+        start_time = time.monotonic()
+        outcome = "error"
         try:
             file_type_name = "PDF" if file_type == "pdf" else "Word"
-            print(f"\n🚀 === {file_type_name}内容抽取 ===")
-            print(f"📁 输入文件: {os.path.basename(file_path)}")
-            print()
+            logger.info("🚀 === %s内容抽取 ===", file_type_name)
+            logger.info("📁 输入文件: %s", os.path.basename(file_path))
             
             # 步骤1: 内容抽取
-            print(f"📋 [步骤1/2] {file_type_name}内容抽取")
+            logger.info("📋 [步骤1/2] %s内容抽取", file_type_name)
             if file_type == "pdf":
-                extraction_result = await self._extract_content_from_pdf(file_path)
+                extraction = self._extract_content_from_pdf(file_path, status)
             else:
-                extraction_result = await self._extract_content_from_docx(file_path)
+                extraction = self._extract_content_from_docx(file_path, status)
+            # 截止时间通过上下文传给其中的每一个请求，每次请求的超时不超过剩余时间
+            extraction_result = await run_with_deadline(extraction, self.document_timeout,
+                                                        os.path.basename(file_path))
             
             if not extraction_result:
                 return None
             
             # 步骤2: 内容转换为Markdown格式
-            print("\n📝 [步骤2/2] 内容转换为Markdown格式")
+            logger.info("📝 [步骤2/2] 内容转换为Markdown格式")
             markdown_content = extraction_result
             
-            if markdown_content:
-                self._save_markdown(markdown_content, file_path, file_type)
-                print(f"✅ {file_type_name}内容抽取与转换完成")
-            else:
+            if not markdown_content:
+                return None
+            if self._save_markdown(markdown_content, file_path, file_type) is None:
                 return None
+            if status is not None and status.degraded:
+                outcome = "degraded"
+                logger.warning("⚠️ %s内容抽取不完整，已保存现有内容: %s", file_type_name, '；'.join(status.reasons))
+            else:
+                outcome = "ok"
+                logger.info("✅ %s内容抽取与转换完成", file_type_name)
             return markdown_content
                 
+        except DeadlineExceeded as e:
+            outcome = "deadline"
+            self.metrics.inc("deadline_exceeded_total", file_type=file_type)
+            logger.error("⏰ 放弃处理 %s: %s", os.path.basename(file_path), e)
+            raise
         except Exception as e:
             file_type_name = "PDF" if file_type == "pdf" else "Word"
-            print(f"❌ {file_type_name}内容抽取与转换失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ %s内容抽取与转换失败: %s", file_type_name, e)
             return None
+        finally:
+            self.metrics.observe("stage_duration_seconds", time.monotonic() - start_time,
+                                 stage=STAGE_DOCUMENT, outcome=outcome, file_type=file_type)
     
-    async def _extract_content_from_pdf(self, pdf_path: str) -> Optional[str]:
+    async def _extract_content_from_pdf(self, pdf_path: str,
+                                        status: Optional[ExtractionStatus] = None) -> Optional[str]:
         """PDF内容抽取步骤"""
-        return extract_content_from_pdf(pdf_path)
+        return await extract_content_from_pdf_async(pdf_path, use_cache=self.use_cache,
+                                                    stream_path=self._stream_path(pdf_path),
+                                                    delete_upload=self.delete_uploads, status=status)
     
-    async def _extract_content_from_docx(self, docx_path: str) -> Optional[str]:
+    async def _extract_content_from_docx(self, docx_path: str,
+                                         status: Optional[ExtractionStatus] = None) -> Optional[str]:
         """Word内容抽取步骤"""
-        return extract_content_from_docx(docx_path)
\ No newline at end of file
+        return await extract_content_from_docx_async(docx_path, use_cache=self.use_cache,
+                                                     stream_path=self._stream_path(docx_path),
+                                                     delete_upload=self.delete_uploads, status=status)
+
+    def _stream_path(self, file_path: str) -> Optional[str]:
+        """流式输出的目标文件路径（与最终输出文件相同；写入过程中使用 `.partial` 临时文件，完成后由完整内容覆盖）"""
+        return self.get_output_path(file_path) if self.stream else None
+
+    def export_metrics(self, jsonl_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> None:
+        """
+        导出运行指标
+
+        Args:
+            jsonl_path: JSON Lines文件路径，追加写入，每个指标一行
+            prometheus_path: Prometheus文本格式文件路径，整体覆盖写入
+        """
+        if jsonl_path:
+            self.metrics.write_jsonl(jsonl_path)
+            logger.info("📈 指标已追加至: %s", jsonl_path)
+        if prometheus_path:
+            self.metrics.write_prometheus(prometheus_path)
+            logger.info("📈 指标已写入: %s", prometheus_path)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测脚本测试
+"""
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.fake_glm_server import FakeServerConfig
+from benchmarks.run_benchmark import percentile, run_benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    """压测脚本测试类"""
+
+    def test_percentile(self):
+        """测试最近秩法百分位数"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_run_against_fake_server(self):
+        """测试完整流程走模拟服务器，报告吞吐量和各阶段延迟"""
+        config = FakeServerConfig(upload_latency_ms=0, content_latency_ms=0, chat_latency_ms=10,
+                                  content_chars=2000, response_chars=500, seed=1)
+        api_base_before = os.environ.get("GLM_API_BASE")
+        report = run_benchmark(config, docs=3, pages=2, docx_ratio=0.34, concurrency=2)
+
+        self.assertEqual(report["documents"], {"total": 3, "succeeded": 3, "failed": 0})
+        self.assertGreater(report["docs_per_sec"], 0)
+        # docx走本地解析，只有2个PDF访问了模拟服务器
+        self.assertEqual(report["stages"]["upload"]["count"], 2)
+        self.assertEqual(report["stages"]["chat"]["count"], 2)
+        self.assertEqual(report["stages"]["document"]["count"], 3)
+        self.assertEqual(os.environ.get("GLM_API_BASE"), api_base_before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块处理日志测试
+"""
+import unittest
+from unittest.mock import patch, AsyncMock
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.chunk_journal import ChunkJournal
+from utils.document_extractor import ExtractionStatus, extract_content_from_file_async, process_content_in_chunks_async
+from utils.extraction_cache import CACHE_DIR_ENV
+from utils.extraction_planner import STRATEGY_LARGE_CHUNKED, ExtractionPlan
+from utils.http_client import run_sync
+
+
+class TestChunkJournal(unittest.TestCase):
+    """分块处理日志测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def test_persists_across_instances(self):
+        """测试文件ID和已完成的块在重新打开后仍然可用"""
+        journal = ChunkJournal("doc", self.tmp_dir.name)
+        journal.set_file_id("file-1")
+        self.assertEqual(journal.begin("fp", 3), 0)
+        journal.complete(0, "第一块")
+
+        reopened = ChunkJournal("doc", self.tmp_dir.name)
+        self.assertEqual(reopened.file_id, "file-1")
+        self.assertEqual(reopened.begin("fp", 3), 1)
+        self.assertEqual(reopened.get(0), "第一块")
+        self.assertIsNone(reopened.get(1))
+
+        # 分块指纹变化后旧块作废
+        self.assertEqual(reopened.begin("other", 3), 0)
+        self.assertIsNone(reopened.get(0))
+
+        reopened.finish()
+        self.assertFalse(os.path.exists(reopened.journal_path))
+
+    def test_complete_appends_one_record(self):
+        """测试每完成一块只追加一行，中断时写了一半的末行在重新打开时被忽略"""
+        journal = ChunkJournal("doc", self.tmp_dir.name)
+        journal.begin("fp", 3)
+        journal.complete(0, "第一块")
+        with open(journal.journal_path, encoding="utf-8") as f:
+            lines = f.readlines()
+        journal.complete(1, "第二块")
+        with open(journal.journal_path, encoding="utf-8") as f:
+            self.assertEqual(f.readlines()[:len(lines)], lines)
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"type": "chunk", "index": 2, "te')
+
+        reopened = ChunkJournal("doc", self.tmp_dir.name)
+        self.assertEqual(reopened.begin("fp", 3), 2)
+        self.assertEqual(reopened.get(1), "第二块")
+        self.assertIsNone(reopened.get(2))
+        reopened.complete(2, "第三块")
+        self.assertEqual(ChunkJournal("doc", self.tmp_dir.name).get(2), "第三块")
+
+    @patch('utils.document_extractor.process_single_chunk_async')
+    def test_resume_only_processes_incomplete_chunks(self, mock_chunk):
+        """测试中断后重新运行只处理未完成的块"""
+        calls = []
+        state = {"fail_b": True}
+
+        async def fake_chunk(chunk_content, file_type_name, api_key, context="", **kwargs):
+            calls.append(chunk_content[0])
+            if chunk_content[0] == "b" and state["fail_b"]:
+                return chunk_content  # 处理失败时原样返回块内容
+            return chunk_content[0].upper()
+
+        mock_chunk.side_effect = fake_chunk
+        content = "\n\n".join(["a" * 400, "b" * 400, "c" * 400])
+        journal = ChunkJournal("doc", self.tmp_dir.name)
+
+        first = run_sync(process_content_in_chunks_async(content, "PDF", "key", chunk_tokens=100, journal=journal))
+        self.assertIn("b" * 400, first)
+        self.assertTrue(os.path.exists(journal.journal_path))
+
+        calls.clear()
+        state["fail_b"] = False
+        second = run_sync(process_content_in_chunks_async(content, "PDF", "key", chunk_tokens=100,
+                                                          journal=ChunkJournal("doc", self.tmp_dir.name)))
+        self.assertEqual(calls, ["b"])
+        self.assertEqual(second.split("\n\n---\n\n")[1], "B")
+        self.assertFalse(os.path.exists(journal.journal_path))
+
+    def test_failed_chunk_resumed_by_next_run(self):
+        """测试有块失败的结果既不缓存也不算完成，下次完整运行经分块日志只重试失败的块"""
+        pdf_path = os.path.join(self.tmp_dir.name, "big.pdf")
+        with open(pdf_path, "w") as f:
+            f.write("大文件")
+        calls = []
+        state = {"fail_b": True}
+
+        async def fake_chunk(chunk_content, file_type_name, api_key, context="", **kwargs):
+            calls.append(chunk_content[0])
+            if chunk_content[0] == "b" and state["fail_b"]:
+                return chunk_content
+            return chunk_content[0].upper()
+
+        raw_content = "\n\n".join(["a" * 400, "b" * 400, "c" * 400])
+        plan = ExtractionPlan(STRATEGY_LARGE_CHUNKED, 16000, chunk_tokens=100)
+
+        def run():
+            status = ExtractionStatus()
+            content = run_sync(extract_content_from_file_async(pdf_path, "pdf", status=status))
+            return content, status
+
+        with patch.dict(os.environ, {CACHE_DIR_ENV: self.tmp_dir.name}), \
+                patch('utils.document_extractor.get_registry') as mock_registry, \
+                patch('utils.document_extractor.plan_from_signals', return_value=plan), \
+                patch('utils.document_extractor.upload_file_async', new_callable=AsyncMock) as mock_upload, \
+                patch('utils.document_extractor.get_file_content_async', new_callable=AsyncMock) as mock_content, \
+                patch('utils.document_extractor.process_single_chunk_async', side_effect=fake_chunk), \
+                patch('utils.document_extractor._process_images_in_content_async',
+                      new=AsyncMock(side_effect=lambda content, *args, **kwargs: content)):
+            mock_registry.return_value.get_api_key.return_value = "key"
+            mock_registry.return_value.get_config.return_value = {}
+            mock_registry.return_value.get_prompt.return_value = "{file_content}"
+            mock_registry.return_value.get_section.return_value = {}
+            mock_upload.return_value = "file-1"
+            mock_content.return_value = {"content": raw_content}
+
+            first, status = run()
+            self.assertIn("b" * 400, first)
+            self.assertTrue(status.degraded)
+            self.assertEqual(sorted(calls), ["a", "b", "c"])
+
+            calls.clear()
+            state["fail_b"] = False
+            second, status = run()
+            self.assertFalse(status.degraded)
+            self.assertEqual(calls, ["b"])
+            self.assertEqual(second.split("\n\n---\n\n")[1], "B")
+            mock_upload.assert_called_once()
+
+            # 全部完成后结果写入缓存，再次运行不再处理任何块
+            calls.clear()
+            self.assertEqual(run()[0], second)
+            self.assertEqual(calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分块器测试
+"""
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.chunker import estimate_tokens, split_blocks, split_into_chunks
+
+
+class TestChunker(unittest.TestCase):
+    """文本分块器测试类"""
+
+    def test_estimate_tokens(self):
+        """测试中英文token估算"""
+        self.assertEqual(estimate_tokens("你好世界啊哈"), 4)
+        self.assertEqual(estimate_tokens("abcdefgh"), 2)
+
+    def test_split_blocks_recognizes_structure(self):
+        """测试识别标题、段落和表格"""
+        text = "# 第一章 概述\n正文第一行\n正文第二行\n\n| 列1 | 列2 |\n|---|---|\n| 1 | 2 |\n2.1 小节标题\n结尾。"
+        kinds = [block.kind for block in split_blocks(text)]
+        self.assertEqual(kinds, ["heading", "paragraph", "table", "heading", "paragraph"])
+
+    def test_chunks_respect_budget_and_sentences(self):
+        """测试块不超过预算且不会在句子中间切断"""
+        text = "第一章 总则\n\n" + "这是一个完整的句子。" * 200
+        chunks = split_into_chunks(text, max_tokens=300)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(chunk.tokens, 300)
+            self.assertTrue(chunk.text.endswith("。"))
+        self.assertTrue(chunks[0].text.startswith("第一章 总则"))
+
+    def test_oversized_table_repeats_header(self):
+        """测试超大表格按行切分并在每块重复表头"""
+        table = "| 名称 | 数值 |\n|---|---|\n" + "".join(f"| 项目{i} | {i} |\n" for i in range(200))
+        chunks = split_into_chunks(table, max_tokens=200)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.text.startswith("| 名称 | 数值 |\n|---|---|"))
+
+    def test_heading_is_not_left_at_chunk_end(self):
+        """测试标题不会落在块末尾而与正文分离"""
+        text = "第一段内容。" * 40 + "\n\n## 新章节\n\n" + "新章节正文。" * 40
+        chunks = split_into_chunks(text, max_tokens=200)
+        for chunk in chunks:
+            self.assertFalse(chunk.text.rstrip().endswith("## 新章节"))
+
+    def test_overlap_context(self):
+        """测试可选的相邻块重叠上下文"""
+        text = "\n\n".join(f"第{i}段。" * 30 for i in range(6))
+        chunks = split_into_chunks(text, max_tokens=150, overlap_tokens=60)
+        self.assertEqual(chunks[0].context, "")
+        self.assertTrue(chunks[1].context)
+        self.assertTrue(chunks[0].text.endswith(chunks[1].context))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置注册表测试
+"""
+import unittest
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.config_registry import ConfigRegistry, ConfigError, PROJECT_ROOT, resolve_path
+
+CONFIG_TEMPLATE = """
+models:
+  glm-4.5v:
+    provider: zhipu
+    model_name: glm-4.5v
+    api_key: "{api_key}"
+    api_base: https://open.bigmodel.cn/api/paas/v4
+"""
+
+PROMPTS_TEMPLATE = """
+document_extraction_prompt: |
+  请提取: {file_content}
+"""
+
+
+class TestConfigRegistry(unittest.TestCase):
+    """配置注册表测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, "model_config.yaml")
+        self.prompts_path = os.path.join(self.tmp_dir.name, "prompts.yaml")
+        self._write_config("key-1")
+        with open(self.prompts_path, 'w', encoding='utf-8') as f:
+            f.write(PROMPTS_TEMPLATE)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def _write_config(self, api_key, mtime=None):
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            f.write(CONFIG_TEMPLATE.format(api_key=api_key))
+        if mtime is not None:
+            os.utime(self.config_path, (mtime, mtime))
+
+    def test_relative_paths_resolve_to_project_root(self):
+        """测试相对路径以项目根目录为基准"""
+        self.assertEqual(resolve_path("config/model_config.yaml"),
+                         os.path.join(PROJECT_ROOT, "config", "model_config.yaml"))
+
+    def test_reload_only_on_mtime_change(self):
+        """测试仅在文件修改时间变化后重新加载"""
+        registry = ConfigRegistry(self.config_path, self.prompts_path).load()
+        self.assertEqual(registry.get_api_key(), "key-1")
+        first = registry.get_config()
+        self.assertIs(registry.get_config(), first)
+
+        self._write_config("key-2", mtime=os.path.getmtime(self.config_path) + 10)
+        self.assertEqual(registry.get_api_key(), "key-2")
+
+    def test_invalid_config_fails_eagerly(self):
+        """测试无效配置在加载时立即报错"""
+        with open(self.prompts_path, 'w', encoding='utf-8') as f:
+            f.write("document_extraction_prompt: 缺少占位符\n")
+        with self.assertRaises(ConfigError):
+            ConfigRegistry(self.config_path, self.prompts_path).load()
+
+
+if __name__ == '__main__':
+    unittest.main()
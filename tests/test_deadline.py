@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间传递测试
+"""
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.deadline import DeadlineExceeded, deadline_scope, remaining_time, run_with_deadline
+from utils.glm_client import request_with_retries
+
+
+class TestDeadline(unittest.TestCase):
+    """截止时间传递测试类"""
+
+    def test_nested_scopes_keep_earliest_deadline(self):
+        """测试嵌套的截止时间取较早者，退出后恢复外层设置"""
+        self.assertIsNone(remaining_time())
+        with deadline_scope(10):
+            with deadline_scope(60):
+                self.assertLessEqual(remaining_time(), 10)
+            with deadline_scope(1):
+                self.assertLessEqual(remaining_time(), 1)
+            self.assertGreater(remaining_time(), 1)
+        self.assertIsNone(remaining_time())
+
+    def test_run_with_deadline_cancels_unfinished_work(self):
+        """测试超时后取消未完成的工作，截止时间已过时不再开始"""
+        cancelled = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            start = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                await run_with_deadline(slow(), 0.1, "测试")
+            self.assertLess(time.monotonic() - start, 1)
+            with deadline_scope(0):
+                with self.assertRaises(DeadlineExceeded):
+                    await run_with_deadline(slow(), 60, "测试")
+
+        asyncio.run(main())
+        self.assertEqual(cancelled, [True])
+
+    def test_request_gives_up_when_retry_would_outlive_deadline(self):
+        """测试剩余时间不够等待Retry-After时放弃，不再重试"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(429, headers={"Retry-After": "30"})
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    with deadline_scope(5):
+                        await request_with_retries("GET", "http://glm.test/files", label="测试", max_retries=3)
+
+        with self.assertRaises(DeadlineExceeded):
+            asyncio.run(main())
+        self.assertEqual(len(requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
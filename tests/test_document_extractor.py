@@ -4,9 +4,11 @@
 文档抽取器测试 - 独立版本
 """
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
 import os
 import sys
+import tempfile
 
 # 添加项目根目录到Python路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,8 +21,15 @@ from utils.document_extractor import (
     extract_content_from_docx,
     upload_file,
     read_api_key,
-    read_extraction_prompts
+    read_extraction_prompts,
+    extract_content_normal_file,
+    process_content_in_chunks,
+    process_single_chunk,
+    extract_content_from_file_async,
+    ExtractionStatus,
 )
+from utils.http_client import run_sync
+from utils.extraction_cache import CACHE_DIR_ENV
 
 class TestDocumentExtractor(unittest.TestCase):
     """文档抽取器测试类"""
@@ -31,6 +40,11 @@ class TestDocumentExtractor(unittest.TestCase):
         self.test_docx_path = "test.docx"
         self.config_path = "config/model_config.yaml"
         self.prompts_path = "prompts/document_extraction_prompts.yaml"
+
+        # 上传登记表等本地缓存写入临时目录，不影响项目的 .cache
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_env = patch.dict(os.environ, {CACHE_DIR_ENV: self.cache_dir.name})
+        self.cache_env.start()
         
         # 创建测试文件
         with open(self.test_pdf_path, 'w') as f:
@@ -40,6 +54,8 @@ class TestDocumentExtractor(unittest.TestCase):
     
     def tearDown(self):
         """测试后清理"""
+        self.cache_env.stop()
+        self.cache_dir.cleanup()
         # 删除测试文件
         if os.path.exists(self.test_pdf_path):
             os.remove(self.test_pdf_path)
@@ -64,7 +80,7 @@ class TestDocumentExtractor(unittest.TestCase):
         self.assertEqual(result, "测试Word提取结果")
         mock_extract.assert_called_once_with(self.test_docx_path, "docx")
     
-    @patch('utils.document_extractor.requests.post')
+    @patch('utils.glm_client.httpx.AsyncClient.request', new_callable=AsyncMock)
     def test_upload_file_success(self, mock_post):
         """测试文件上传成功"""
         # 模拟成功的API响应
@@ -104,5 +120,116 @@ class TestDocumentExtractor(unittest.TestCase):
         result = read_extraction_prompts(self.prompts_path)
         self.assertEqual(result, {"document_extraction_prompt": "test_prompt"})
 
+    @patch('utils.document_extractor.process_single_chunk_async')
+    def test_process_content_in_chunks_parallel_order(self, mock_chunk):
+        """测试分块并发处理保持原始顺序，失败块回退为原始内容"""
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_chunk(chunk_content, file_type_name, api_key, context="", **kwargs):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            # 前面的块耗时更长，验证结果仍按原始顺序拼接
+            await asyncio.sleep(0.01 * (ord(chunk_content[0]) - ord("a")))
+            state["in_flight"] -= 1
+            if chunk_content[0] == "b":
+                raise RuntimeError("模拟块处理失败")
+            return chunk_content[0].upper()
+
+        mock_chunk.side_effect = fake_chunk
+        # 每个段落约100 tokens，按100 tokens的预算恰好一段一块
+        content = "\n\n".join(["c" * 400, "b" * 400, "a" * 400])
+
+        result = process_content_in_chunks(content, "PDF", "test_api_key", max_concurrency=2, chunk_tokens=100)
+        parts = result.split("\n\n---\n\n")
+        self.assertTrue(parts[0].endswith("C"))
+        self.assertEqual(parts[1], "b" * 400)
+        self.assertEqual(parts[2], "A")
+        self.assertEqual(state["peak"], 2)
+
+    @patch('utils.document_extractor.get_registry')
+    @patch('utils.document_extractor.process_single_chunk_async')
+    def test_chunk_concurrency_from_config(self, mock_chunk, mock_registry):
+        """测试未指定并发数时读取配置 chunking.concurrency"""
+        mock_registry.return_value.get_section.return_value = {"chunk_tokens": 100, "concurrency": 1}
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_chunk(chunk_content, file_type_name, api_key, context="", **kwargs):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.01)
+            state["in_flight"] -= 1
+            return chunk_content[0].upper()
+
+        mock_chunk.side_effect = fake_chunk
+        content = "\n\n".join(["a" * 400, "b" * 400, "c" * 400])
+
+        self.assertEqual(process_content_in_chunks(content, "PDF", "test_api_key").count("---"), 4)
+        self.assertEqual(state["peak"], 1)
+
+    @patch('utils.document_extractor.chat_completion_async', new_callable=AsyncMock)
+    def test_truncated_chunk_output_is_continued(self, mock_chat):
+        """测试块输出因max_tokens被截断时发起续写请求，并从已输出内容之后拼接"""
+        mock_chat.side_effect = [
+            {"choices": [{"message": {"content": "第一段"}, "finish_reason": "length"}]},
+            {"choices": [{"message": {"content": "第二段"}, "finish_reason": "stop"}]},
+        ]
+
+        result = process_single_chunk("正文内容" * 100, "PDF", "test_api_key")
+        self.assertEqual(result, "第一段第二段")
+        first_payload, second_payload = (call.args[0] for call in mock_chat.call_args_list)
+        self.assertEqual(first_payload["max_tokens"], 4000)
+        self.assertEqual(second_payload["messages"][:1], first_payload["messages"])
+        self.assertEqual(second_payload["messages"][1], {"role": "assistant", "content": "第一段"})
+        self.assertEqual(second_payload["messages"][2]["role"], "user")
+
+    @patch('utils.document_extractor._delete_upload_after_extraction_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.chat_completion_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.get_file_content_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.upload_file_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.get_registry')
+    def test_given_max_tokens_is_lower_bound(self, mock_registry, mock_upload, mock_content, mock_chat, _):
+        """测试传入的max_tokens（规划器估算）不会被按短文本估算的较小预算覆盖"""
+        mock_registry.return_value.get_api_key.return_value = "test_api_key"
+        mock_registry.return_value.get_prompts.return_value = {"document_extraction_prompt": "{file_content}"}
+        mock_upload.return_value = "test_file_id"
+        mock_content.return_value = {"content": "短文本"}
+        mock_chat.return_value = {"choices": [{"message": {"content": "结果"}, "finish_reason": "stop"}]}
+
+        self.assertEqual(extract_content_normal_file(self.test_pdf_path, "pdf", max_tokens=12000), "结果")
+        self.assertEqual(mock_chat.call_args.args[0]["max_tokens"], 12000)
+        self.assertEqual(extract_content_normal_file(self.test_pdf_path, "pdf"), "结果")
+        self.assertEqual(mock_chat.call_args.args[0]["max_tokens"], 4000)
+
+    @patch('utils.document_extractor._delete_upload_after_extraction_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.chat_completion_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.get_file_content_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.upload_file_async', new_callable=AsyncMock)
+    @patch('utils.document_extractor.get_registry')
+    def test_raw_text_fallback_is_not_cached(self, mock_registry, mock_upload, mock_content, mock_chat, _):
+        """测试聊天API失败、回退为文件原始文本的结果标记为降级且不写入缓存，下次运行重新请求模型"""
+        mock_registry.return_value.get_api_key.return_value = "test_api_key"
+        mock_registry.return_value.get_config.return_value = {}
+        mock_registry.return_value.get_prompt.return_value = "{file_content}"
+        mock_registry.return_value.get_prompts.return_value = {"document_extraction_prompt": "{file_content}"}
+        mock_upload.return_value = "test_file_id"
+        mock_content.return_value = {"content": "原始文本"}
+        mock_chat.return_value = None
+
+        status = ExtractionStatus()
+        self.assertEqual(run_sync(extract_content_from_file_async(self.test_pdf_path, "pdf", status=status)), "原始文本")
+        self.assertTrue(status.degraded)
+
+        mock_chat.reset_mock()
+        mock_chat.return_value = {"choices": [{"message": {"content": "整理结果"}, "finish_reason": "stop"}]}
+        status = ExtractionStatus()
+        self.assertEqual(run_sync(extract_content_from_file_async(self.test_pdf_path, "pdf", status=status)), "整理结果")
+        self.assertFalse(status.degraded)
+        mock_chat.assert_called_once()
+
+        # 完整的结果写入缓存，再次运行不再请求模型
+        mock_chat.reset_mock()
+        self.assertEqual(run_sync(extract_content_from_file_async(self.test_pdf_path, "pdf")), "整理结果")
+        mock_chat.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
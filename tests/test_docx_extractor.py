@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word本地解析器测试
+"""
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import zipfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.docx_extractor import COMPLEX_MERGED_CELLS, extract_docx, is_docx
+from utils.document_extractor import extract_content_docx_local
+from utils.extraction_cache import ExtractionCache
+
+STYLES_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:style w:type="paragraph" w:styleId="1"><w:name w:val="heading 1"/></w:style>
+  <w:style w:type="paragraph" w:styleId="MyHeading"><w:name w:val="My Heading"/><w:basedOn w:val="1"/></w:style>
+</w:styles>"""
+
+
+def _paragraph(text, style=None, bold=False, numbered=False):
+    ppr = ""
+    if style or numbered:
+        ppr = "<w:pPr>"
+        if style:
+            ppr += f'<w:pStyle w:val="{style}"/>'
+        if numbered:
+            ppr += '<w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr>'
+        ppr += "</w:pPr>"
+    rpr = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f"<w:p>{ppr}<w:r>{rpr}<w:t>{text}</w:t></w:r></w:p>"
+
+
+def _table(rows, merged=False):
+    xml = "<w:tbl>"
+    for row in rows:
+        xml += "<w:tr>"
+        for index, cell in enumerate(row):
+            tc_pr = '<w:tcPr><w:gridSpan w:val="2"/></w:tcPr>' if merged and index == 0 else ""
+            xml += f"<w:tc>{tc_pr}{_paragraph(cell)}</w:tc>"
+        xml += "</w:tr>"
+    return xml + "</w:tbl>"
+
+
+class TestDocxExtractor(unittest.TestCase):
+    """Word本地解析器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def _write_docx(self, body, media=None):
+        path = os.path.join(self.tmp_dir.name, "test.docx")
+        document = ('<?xml version="1.0" encoding="UTF-8"?>'
+                    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+                    ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f"<w:body>{body}</w:body></w:document>")
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("word/document.xml", document)
+            archive.writestr("word/styles.xml", STYLES_XML)
+            if media:
+                relationships = "".join(f'<Relationship Id="{rel_id}" Target="media/{name}"/>'
+                                        for rel_id, (name, _) in media.items())
+                archive.writestr("word/_rels/document.xml.rels",
+                                 '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                                 f"{relationships}</Relationships>")
+                for name, data in media.values():
+                    archive.writestr(f"word/media/{name}", data)
+        return path
+
+    def test_headings_lists_and_tables(self):
+        """测试标题层级、加粗、列表和表格转换为Markdown"""
+        path = self._write_docx(
+            _paragraph("概述", style="1")
+            + _paragraph("重要", bold=True)
+            + _paragraph("第一项", numbered=True)
+            + _paragraph("细节", style="Heading2")
+            + _table([["名称", "数值"], ["a|b", "1"]])
+            + _paragraph("附录", style="MyHeading")
+        )
+        self.assertTrue(is_docx(path))
+        document = extract_docx(path)
+        self.assertEqual(document.markdown, "\n\n".join([
+            "# 概述", "**重要**", "- 第一项",
+            "## 细节", "| 名称 | 数值 |\n| --- | --- |\n| a\\|b | 1 |",
+            "# 附录",
+        ]))
+        self.assertEqual(len(document.sections), 3)
+        self.assertEqual(document.complex_reasons, [])
+
+    def test_only_complex_sections_sent_to_model(self):
+        """测试complex模式只把含复杂内容的段落交给模型整理"""
+        path = self._write_docx(
+            _paragraph("简单", style="1") + _paragraph("正文")
+            + _paragraph("复杂", style="1") + _table([["合并", "x"], ["1", "2"]], merged=True)
+        )
+        self.assertEqual(extract_docx(path).complex_reasons, [COMPLEX_MERGED_CELLS])
+
+        async def fake_chunk(chunk_content, file_type_name, api_key, context="", **kwargs):
+            return "# 复杂\n\n整理后的表格"
+
+        with patch("utils.document_extractor.process_single_chunk_async", side_effect=fake_chunk) as mock_chunk, \
+                patch("utils.document_extractor.get_registry") as mock_registry:
+            mock_registry.return_value.get_api_key.return_value = "key"
+            mock_registry.return_value.get_section.return_value = {"concurrency": 2}
+            self.assertEqual(extract_content_docx_local(path, "never"), extract_docx(path).markdown)
+            mock_chunk.assert_not_called()
+            result = extract_content_docx_local(path, "complex")
+
+        self.assertEqual(mock_chunk.call_count, 1)
+        self.assertEqual(result, "# 简单\n\n正文\n\n# 复杂\n\n整理后的表格")
+
+    def test_embedded_images_described_without_model_formatting(self):
+        """测试never模式下仍分析 word/media 中的图片，正文中的图片链接替换为描述编号"""
+        path = self._write_docx(
+            _paragraph("图表", style="1")
+            + '<w:p><w:r><w:drawing><a:blip xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+              ' r:embed="rId5"/></w:drawing></w:r></w:p>',
+            media={"rId5": ("image1.png", b"\x89PNG" + b"P" * 8000)},
+        )
+
+        async def fake_chat(payload, *args, **kwargs):
+            return {"choices": [{"message": {"content": "2023年销量柱状图"}}]}
+
+        with patch("utils.image_analyzer.chat_completion_async", side_effect=fake_chat) as mock_chat, \
+                patch("utils.image_analyzer.image_cache", ExtractionCache(os.path.join(self.tmp_dir.name, "images"))), \
+                patch("utils.document_extractor.get_registry") as mock_registry:
+            mock_registry.return_value.get_api_key.return_value = "key"
+            result = extract_content_docx_local(path, "never")
+
+        self.assertEqual(mock_chat.call_count, 1)
+        self.assertNotIn("](word/media/", result)
+        self.assertTrue(result.startswith("# 图表\n\n[图片1]"))
+        self.assertIn("### 图片1（word/media/image1.png）\n\n2023年销量柱状图", result)
+
+    def test_not_docx(self):
+        """测试非zip文件（如旧版.doc）不走本地解析"""
+        path = os.path.join(self.tmp_dir.name, "old.doc")
+        with open(path, "wb") as f:
+            f.write(b"\xd0\xcf\x11\xe0")
+        self.assertFalse(is_docx(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
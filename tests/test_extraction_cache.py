@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取结果缓存测试
+"""
+import unittest
+import os
+import sys
+import time
+import tempfile
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.extraction_cache import CACHE_DIR_ENV, ExtractionCache
+from utils.upload_registry import UploadRegistry
+
+
+class TestExtractionCache(unittest.TestCase):
+    """抽取结果缓存测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def test_cache_root_env_read_at_use_time(self):
+        """测试导入模块后再设置缓存根目录环境变量同样生效"""
+        cache = ExtractionCache()
+        with patch.dict(os.environ, {CACHE_DIR_ENV: self.tmp_dir.name}):
+            self.assertEqual(cache.cache_dir, os.path.join(self.tmp_dir.name, "extractions"))
+            self.assertEqual(UploadRegistry().registry_path, os.path.join(self.tmp_dir.name, "uploads.json"))
+
+    def test_key_depends_on_all_parts(self):
+        """测试缓存键由内容哈希、提示词哈希、模型和max_tokens共同决定"""
+        key = ExtractionCache.make_key("file", "prompt", "glm-4.5v", 8000)
+        self.assertEqual(key, ExtractionCache.make_key("file", "prompt", "glm-4.5v", 8000))
+        self.assertNotEqual(key, ExtractionCache.make_key("file", "prompt2", "glm-4.5v", 8000))
+        self.assertNotEqual(key, ExtractionCache.make_key("file", "prompt", "glm-4.5-air", 8000))
+        self.assertNotEqual(key, ExtractionCache.make_key("file", "prompt", "glm-4.5v", 12000))
+
+    def test_put_and_get(self):
+        """测试写入与读取"""
+        cache = ExtractionCache(self.tmp_dir.name)
+        self.assertIsNone(cache.get("missing"))
+        cache.put("key", "# 标题")
+        self.assertEqual(cache.get("key"), "# 标题")
+
+    def test_age_eviction(self):
+        """测试过期条目失效"""
+        cache = ExtractionCache(self.tmp_dir.name, max_age_seconds=60)
+        cache.put("old", "旧内容")
+        old_time = time.time() - 120
+        os.utime(os.path.join(self.tmp_dir.name, "old.md"), (old_time, old_time))
+        self.assertIsNone(cache.get("old"))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "old.md")))
+
+    def test_size_eviction_keeps_recent(self):
+        """测试超出大小上限时淘汰最久未访问的条目"""
+        cache = ExtractionCache(self.tmp_dir.name, max_bytes=25)
+        cache.put("a", "a" * 10)
+        cache.put("b", "b" * 10)
+        past = time.time() - 10
+        os.utime(os.path.join(self.tmp_dir.name, "b.md"), (past, past))
+        cache.get("a")
+        cache.put("c", "c" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "a" * 10)
+        self.assertEqual(cache.get("c"), "c" * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取策略规划器测试
+"""
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.pdf_splitter import HAS_PYPDF
+from utils.extraction_planner import (
+    DocumentSignals, STRATEGY_LARGE_CHUNKED, STRATEGY_LOCAL_DOCX, STRATEGY_NORMAL, STRATEGY_SPLIT_PDF,
+    plan_extraction, plan_from_signals,
+)
+
+MB = 1024 * 1024
+
+
+class TestExtractionPlanner(unittest.TestCase):
+    """抽取策略规划器测试类"""
+
+    def _pdf_signals(self, file_size, page_count, text_tokens_per_page, images_per_page=0, scanned=False):
+        sampled = min(5, page_count)
+        return DocumentSignals(
+            file_path="x.pdf", file_type="pdf", file_size=file_size, page_count=page_count,
+            sampled_pages=sampled, sampled_text_tokens=text_tokens_per_page * sampled,
+            sampled_images=0 if scanned else images_per_page * sampled, scanned_pages=sampled if scanned else 0,
+        )
+
+    def test_image_heavy_small_pdf_gets_larger_budget(self):
+        """测试图片多的小PDF获得比按大小分档更高的max_tokens"""
+        plan = plan_from_signals(self._pdf_signals(1 * MB, 10, 300, images_per_page=3))
+        self.assertEqual(plan.strategy, STRATEGY_NORMAL)
+        self.assertGreater(plan.max_tokens, 8000)
+
+    def test_text_heavy_small_pdf_is_split(self):
+        """测试预计输出超过单次调用上限的小PDF按页码范围切分"""
+        plan = plan_from_signals(self._pdf_signals(2 * MB, 200, 600))
+        self.assertEqual(plan.strategy, STRATEGY_SPLIT_PDF)
+        self.assertLessEqual(plan.pages_per_range * 600 * 1.3, 16000)
+
+    def test_large_pdf_split_by_size(self):
+        """测试超过10MB的PDF切分，且每个范围接近目标大小"""
+        plan = plan_from_signals(self._pdf_signals(40 * MB, 400, 10), {"pdf_split": {"target_range_mb": 5}})
+        self.assertEqual(plan.strategy, STRATEGY_SPLIT_PDF)
+        self.assertEqual(plan.pages_per_range, 50)
+
+        disabled = plan_from_signals(self._pdf_signals(40 * MB, 400, 10), {"pdf_split": {"enabled": False}})
+        self.assertEqual(disabled.strategy, STRATEGY_LARGE_CHUNKED)
+
+    def test_docx_and_missing_signals(self):
+        """测试docx走本地解析，无法读取信号时按文件大小规划"""
+        docx = DocumentSignals(file_path="x.docx", file_type="docx", file_size=MB, is_docx=True)
+        self.assertEqual(plan_from_signals(docx).strategy, STRATEGY_LOCAL_DOCX)
+
+        legacy_doc = DocumentSignals(file_path="x.doc", file_type="docx", file_size=3 * MB)
+        plan = plan_from_signals(legacy_doc)
+        self.assertEqual((plan.strategy, plan.max_tokens), (STRATEGY_NORMAL, 12000))
+        legacy_doc.file_size = 11 * MB
+        self.assertEqual(plan_from_signals(legacy_doc).strategy, STRATEGY_LARGE_CHUNKED)
+
+    @unittest.skipUnless(HAS_PYPDF, "未安装pypdf")
+    def test_plan_extraction_logs_decision(self):
+        """测试规划结果连同信号写入规划日志"""
+        from pypdf import PdfWriter
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "small.pdf")
+            writer = PdfWriter()
+            for _ in range(3):
+                writer.add_blank_page(width=200, height=200)
+            with open(pdf_path, "wb") as f:
+                writer.write(f)
+            log_path = os.path.join(tmp_dir, "decisions.jsonl")
+
+            plan = plan_extraction(pdf_path, "pdf", log_path=log_path)
+            with open(log_path, encoding="utf-8") as f:
+                record = json.loads(f.readline())
+
+        self.assertEqual(plan.strategy, STRATEGY_NORMAL)
+        self.assertEqual(record["signals"]["page_count"], 3)
+        self.assertEqual(record["plan"]["strategy"], STRATEGY_NORMAL)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLM API客户端测试
+"""
+import unittest
+from unittest.mock import patch
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.glm_client import chat_completion_async, stream_chat_completion_async
+from utils.metrics import MetricsRegistry
+
+
+def _sse_body(events):
+    lines = [f"data: {json.dumps(event, ensure_ascii=False)}" for event in events]
+    return ("\n\n".join(lines + ["data: [DONE]"]) + "\n\n").encode("utf-8")
+
+
+class TestStreamChatCompletion(unittest.TestCase):
+    """流式聊天完成API测试类"""
+
+    def test_stream_deltas_are_forwarded_and_joined(self):
+        """测试增量内容逐段回调，并拼接为与非流式接口相同的结构"""
+        events = [
+            {"choices": [{"delta": {"content": "# 标题"}}]},
+            {"choices": [{"delta": {"content": "\n正文"}}]},
+            {"choices": [{"delta": {}, "finish_reason": "stop"}], "usage": {"total_tokens": 12}},
+        ]
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=_sse_body(events),
+                                  headers={"content-type": "text/event-stream"})
+
+        received = []
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    return await stream_chat_completion_async({"model": "glm-4.5v"}, "key",
+                                                              on_delta=received.append)
+
+        result = asyncio.run(main())
+        self.assertTrue(requests[0]["stream"])
+        self.assertEqual(received, ["# 标题", "\n正文"])
+        self.assertEqual(result["choices"][0]["message"]["content"], "# 标题\n正文")
+        self.assertEqual(result["choices"][0]["finish_reason"], "stop")
+        self.assertEqual(result["usage"], {"total_tokens": 12})
+        self.assertIsNotNone(result["ttfb"])
+
+
+class TestChatCompletionMetrics(unittest.TestCase):
+    """聊天完成API指标测试类"""
+
+    def test_retries_bytes_and_usage_are_recorded(self):
+        """测试429后重试成功时记录重试次数、状态码、收发字节数和token用量"""
+        responses = [
+            httpx.Response(429, json={"error": {"message": "请求频率过高"}}),
+            httpx.Response(200, json={"choices": [{"message": {"content": "结果"}}],
+                                      "usage": {"prompt_tokens": 30, "completion_tokens": 5}}),
+        ]
+        metrics = MetricsRegistry()
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: responses.pop(0))) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client), \
+                        patch('utils.glm_client.get_metrics', return_value=metrics):
+                    return await chat_completion_async({"model": "glm-4.5v"}, "key", retry_delay=0)
+
+        self.assertIsNotNone(asyncio.run(main()))
+        stage = "chat_completion"
+        self.assertEqual(metrics.counter_value("http_retries_total", stage=stage), 1)
+        self.assertEqual(metrics.counter_value("http_requests_total", stage=stage, status=429), 1)
+        self.assertEqual(metrics.counter_value("http_requests_total", stage=stage, status=200), 1)
+        self.assertGreater(metrics.counter_value("http_bytes_sent_total", stage=stage), 0)
+        self.assertGreater(metrics.counter_value("http_bytes_received_total", stage=stage), 0)
+        self.assertEqual(metrics.counter_value("tokens_total", stage=stage, model="glm-4.5v", type="prompt"), 30)
+        self.assertEqual(metrics.counter_value("tokens_total", stage=stage, model="glm-4.5v", type="completion"), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
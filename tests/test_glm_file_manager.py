@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLM文件管理器测试
+"""
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.glm_file_manager import GLMFileManager
+from utils.upload_registry import UploadRegistry
+
+
+def _response(status_code, data=None):
+    """构造模拟的httpx响应"""
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = data or {}
+    response.text = str(data)
+    return response
+
+
+class TestGLMFileManager(unittest.TestCase):
+    """GLM文件管理器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "test.pdf")
+        with open(self.file_path, 'w') as f:
+            f.write("测试PDF内容")
+        self.file_size = os.path.getsize(self.file_path)
+        self.registry = UploadRegistry(os.path.join(self.tmp_dir.name, "uploads.json"))
+        self.manager = GLMFileManager("test_api_key", registry=self.registry)
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    @patch('utils.glm_client.httpx.AsyncClient.request', new_callable=AsyncMock)
+    def test_upload_reuses_registered_file(self, mock_request):
+        """测试相同内容的文件第二次上传时直接复用文件ID"""
+        mock_request.return_value = _response(200, {"id": "file-1", "bytes": self.file_size})
+
+        self.assertEqual(self.manager.upload_file(self.file_path), "file-1")
+        self.assertEqual(self.manager.upload_file(self.file_path), "file-1")
+
+        methods = [call.args[0] for call in mock_request.call_args_list]
+        self.assertEqual(methods, ["POST", "GET"])
+
+    @patch('utils.glm_client.httpx.AsyncClient.request', new_callable=AsyncMock)
+    def test_stale_entry_is_purged(self, mock_request):
+        """测试服务器上已不存在的文件记录被清除并重新上传"""
+        mock_request.side_effect = [
+            _response(200, {"id": "file-1"}),
+            _response(404, {"error": "not found"}),
+            _response(200, {"id": "file-2"}),
+        ]
+
+        self.assertEqual(self.manager.upload_file(self.file_path), "file-1")
+        self.assertEqual(self.manager.upload_file(self.file_path), "file-2")
+
+        entries = list(UploadRegistry(self.registry.registry_path)._load().values())
+        self.assertEqual([entry["file_id"] for entry in entries], ["file-2"])
+
+
+    def test_transient_info_failure_keeps_entry(self):
+        """测试确认文件信息时遇到临时失败（请求失败或5xx）不清除登记记录，继续复用原文件ID"""
+        self.registry.record("hash-1", "file-1", "test.pdf", self.file_size, "file-extract")
+
+        for response in (None, _response(503, {"error": "unavailable"})):
+            with patch('utils.glm_file_manager.get_file_info_response_async',
+                       new=AsyncMock(return_value=response)):
+                file_id = asyncio.run(self.manager.find_reusable_upload_async("hash-1", self.file_size))
+            self.assertEqual(file_id, "file-1")
+            self.assertIsNotNone(UploadRegistry(self.registry.registry_path).lookup("hash-1", "file-extract"))
+
+        with patch('utils.glm_file_manager.get_file_info_response_async',
+                   new=AsyncMock(return_value=_response(200, {"id": "file-1", "bytes": self.file_size + 1}))):
+            self.assertIsNone(asyncio.run(self.manager.find_reusable_upload_async("hash-1", self.file_size)))
+        self.assertIsNone(UploadRegistry(self.registry.registry_path).lookup("hash-1", "file-extract"))
+
+    def test_cleanup_paginates_filters_and_honours_rate_limit(self):
+        """测试清理按游标分页获取文件、按时间和文件名筛选，遇到429后按Retry-After重试并清除登记记录"""
+        old = int(time.time()) - 7200
+        files = [
+            {"id": "file-1", "filename": "a.pdf", "created_at": old},
+            {"id": "file-2", "filename": "b.docx", "created_at": old},
+            {"id": "file-3", "filename": "c.pdf", "created_at": old},
+            {"id": "file-4", "filename": "d.pdf", "created_at": int(time.time())},
+            {"id": "file-5", "filename": "e.pdf", "created_at": old},
+        ]
+        self.registry.record("hash-1", "file-1", "a.pdf", 10)
+        list_params = []
+        deletes = []
+
+        def handler(request):
+            if request.method == "GET":
+                params = dict(request.url.params)
+                list_params.append(params)
+                ids = [f["id"] for f in files]
+                start = ids.index(params["after"]) + 1 if "after" in params else 0
+                page = files[start:start + int(params["limit"])]
+                return httpx.Response(200, json={"data": page, "has_more": start + len(page) < len(files)})
+            file_id = request.url.path.rsplit("/", 1)[-1]
+            deletes.append(file_id)
+            if file_id == "file-3" and deletes.count(file_id) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"}, json={"error": "rate limited"})
+            if file_id == "file-5":
+                return httpx.Response(404, json={"error": "not found"})
+            return httpx.Response(200, json={"id": file_id, "deleted": True})
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    return await self.manager.cleanup_files_async(older_than=3600, filename_pattern="*.pdf",
+                                                                  concurrency=2, page_size=2)
+
+        result = asyncio.run(main())
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(result["success"], 3)
+        self.assertEqual(result["failed"], 0)
+        self.assertEqual([p.get("after") for p in list_params], [None, "file-2", "file-4"])
+        self.assertEqual(sorted(deletes), ["file-1", "file-3", "file-3", "file-5"])
+        self.assertIsNone(UploadRegistry(self.registry.registry_path).lookup("hash-1"))
+
+
+    def test_cleanup_deletes_page_by_page(self):
+        """测试清理逐页删除：取到下一页后删除上一页的文件，不等全部列完"""
+        files = [{"id": f"file-{i}", "filename": f"{i}.pdf", "created_at": 0} for i in range(6)]
+        events = []
+
+        def handler(request):
+            if request.method == "GET":
+                after = request.url.params.get("after")
+                events.append(("list", after))
+                ids = [f["id"] for f in files]
+                start = ids.index(after) + 1 if after else 0
+                page = files[start:start + 2]
+                return httpx.Response(200, json={"data": page, "has_more": start + len(page) < len(files)})
+            events.append(("delete", request.url.path.rsplit("/", 1)[-1]))
+            return httpx.Response(200, json={"deleted": True})
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    return await self.manager.cleanup_files_async(concurrency=1, page_size=2)
+
+        result = asyncio.run(main())
+        self.assertEqual(result["success"], 6)
+        self.assertEqual(events[:4], [("list", None), ("list", "file-1"), ("delete", "file-0"), ("delete", "file-1")])
+        self.assertLess(events.index(("delete", "file-1")), events.index(("list", "file-3")))
+
+    def test_shared_registry_sees_deletion(self):
+        """测试默认登记表在进程内共享，删除文件后其他管理器不会再复用该文件ID"""
+        from utils.extraction_cache import CACHE_DIR_ENV
+        from utils.upload_registry import get_upload_registry
+
+        with patch.dict(os.environ, {CACHE_DIR_ENV: self.tmp_dir.name}):
+            uploader = GLMFileManager("test_api_key")
+            self.assertIs(uploader.registry, get_upload_registry())
+            uploader.registry.record("hash-1", "file-1", "a.pdf", 10)
+            with patch('utils.glm_file_manager.delete_file_async', new_callable=AsyncMock) as mock_delete:
+                mock_delete.return_value = _response(404)
+                self.assertTrue(GLMFileManager("test_api_key").delete_file("file-1"))
+            self.assertIsNone(uploader.registry.lookup("hash-1"))
+
+    def test_iter_files_stops_fetching_when_caller_stops(self):
+        """测试文件迭代器按需翻页：调用方提前停止时不再请求后续页面，并传递服务端筛选参数"""
+        files = [{"id": f"file-{i}", "filename": f"{i}.pdf"} for i in range(10)]
+        list_params = []
+
+        def handler(request):
+            params = dict(request.url.params)
+            list_params.append(params)
+            ids = [f["id"] for f in files]
+            start = ids.index(params["after"]) + 1 if "after" in params else 0
+            page = files[start:start + int(params["limit"])]
+            return httpx.Response(200, json={"data": page, "has_more": start + len(page) < len(files)})
+
+        async def main():
+            seen = []
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    async for file_info in self.manager.iter_files_async(page_size=3, order="asc"):
+                        seen.append(file_info["id"])
+                        if len(seen) == 4:
+                            break
+            return seen
+
+        seen = asyncio.run(main())
+        self.assertEqual(seen, ["file-0", "file-1", "file-2", "file-3"])
+        self.assertEqual(len(list_params), 2)
+        self.assertEqual(list_params[1], {"limit": "3", "purpose": "file-extract", "order": "asc", "after": "file-2"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求测试
+"""
+import unittest
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.hedging import Hedger
+
+
+class TestHedging(unittest.TestCase):
+    """对冲请求测试类"""
+
+    def _warm_hedger(self, **kwargs) -> Hedger:
+        """创建已积累耗时样本（约10毫秒）的对冲器"""
+        hedger = Hedger("test", min_samples=5, **kwargs)
+        for _ in range(5):
+            hedger.record_latency(0.01)
+        return hedger
+
+    def test_straggler_is_hedged_and_cancelled(self):
+        """测试首个请求超过P95仍未完成时发出对冲请求，取先完成的结果并取消慢的请求"""
+        hedger = self._warm_hedger(max_extra_ratio=1.0)
+        calls = []
+        cancelled = []
+
+        async def call():
+            attempt = len(calls)
+            calls.append(attempt)
+            try:
+                await asyncio.sleep(5 if attempt == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return f"结果{attempt}"
+
+        async def main():
+            result = await asyncio.wait_for(hedger.run(call, "测试"), 1)
+            await asyncio.sleep(0)
+            return result
+
+        self.assertEqual(asyncio.run(main()), "结果1")
+        self.assertEqual(calls, [0, 1])
+        self.assertEqual(cancelled, [0])
+
+    def test_no_hedge_without_samples_or_budget(self):
+        """测试样本不足或对冲额度用完时只发一个请求"""
+        calls = []
+
+        async def call():
+            calls.append(True)
+            await asyncio.sleep(0.05)
+            return "结果"
+
+        async def main(hedger, times):
+            for _ in range(times):
+                await hedger.run(call, "测试")
+
+        asyncio.run(main(Hedger("test", min_samples=5, max_extra_ratio=1.0), 1))
+        self.assertEqual(len(calls), 1)
+
+        # 每次调用积累0.25个额度，8次慢调用最多对冲2次（固定对冲延迟，不受新样本影响）
+        calls.clear()
+        hedger = self._warm_hedger(max_extra_ratio=0.25)
+        hedger.hedge_delay = lambda: 0.01
+        asyncio.run(main(hedger, 8))
+        self.assertEqual(len(calls), 8 + 2)
+
+    def test_failed_first_result_waits_for_other(self):
+        """测试先完成的请求失败（返回None）时等待另一个请求的结果"""
+        hedger = self._warm_hedger(max_extra_ratio=1.0)
+        calls = []
+
+        async def call():
+            attempt = len(calls)
+            calls.append(attempt)
+            if attempt == 0:
+                await asyncio.sleep(0.2)
+                return "结果0"
+            return None
+
+        self.assertEqual(asyncio.run(hedger.run(call, "测试")), "结果0")
+        self.assertEqual(calls, [0, 1])
+
+    def test_error_raised_only_after_both_calls_fail(self):
+        """测试发出对冲请求后，一个调用抛出异常时仍等待另一个调用；两个都失败时才抛出"""
+        hedger = self._warm_hedger(max_extra_ratio=1.0)
+        calls = []
+
+        async def call(fail_both):
+            attempt = len(calls)
+            calls.append(attempt)
+            if attempt == 0:
+                await asyncio.sleep(0.05)
+                raise TimeoutError("首个请求超时")
+            if fail_both:
+                raise TimeoutError("对冲请求超时")
+            await asyncio.sleep(0.2)
+            return "结果1"
+
+        self.assertEqual(asyncio.run(hedger.run(lambda: call(False), "测试")), "结果1")
+        calls.clear()
+        hedger = self._warm_hedger(max_extra_ratio=1.0)
+        with self.assertRaises(TimeoutError):
+            asyncio.run(hedger.run(lambda: call(True), "测试"))
+        self.assertEqual(calls, [0, 1])
+
+    def test_hedge_win_records_caller_latency(self):
+        """测试对冲请求胜出时只按调用方的等待时间记录一个样本，返回前被取消的首个请求已结束"""
+        hedger = self._warm_hedger(max_extra_ratio=1.0)
+        hedger.hedge_delay = lambda: 0.05
+        calls = []
+        cancelled = []
+
+        async def call():
+            attempt = len(calls)
+            calls.append(attempt)
+            try:
+                await asyncio.sleep(5 if attempt == 0 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(attempt)
+                raise
+            return f"结果{attempt}"
+
+        async def run_and_check():
+            result = await hedger.run(call, "测试")
+            self.assertEqual(cancelled, [0])
+            return result
+
+        self.assertEqual(asyncio.run(run_and_check()), "结果1")
+        recorded = list(hedger._samples)[5:]
+        self.assertEqual(len(recorded), 1)
+        self.assertGreaterEqual(recorded[0], 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端测试
+"""
+import unittest
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils import http_client
+from utils.http_client import get_async_client, host_semaphore, run_sync
+
+
+class TestHttpClient(unittest.TestCase):
+    """共享HTTP客户端测试类"""
+
+    def test_sync_calls_share_one_client(self):
+        """测试多次同步调用复用同一个连接池客户端"""
+        async def current_client():
+            return get_async_client()
+
+        self.assertIs(run_sync(current_client()), run_sync(current_client()))
+
+    def test_per_host_limit(self):
+        """测试单个主机的并发请求数量受限"""
+        original = http_client.get_pool_config()
+        http_client.configure_pool(max_connections_per_host=2)
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_request(url):
+            async with host_semaphore(url):
+                state["in_flight"] += 1
+                state["peak"] = max(state["peak"], state["in_flight"])
+                await asyncio.sleep(0.01)
+                state["in_flight"] -= 1
+
+        async def main():
+            await asyncio.gather(*(fake_request("https://example.com/files") for _ in range(6)),
+                                 fake_request("https://other.example.com/files"))
+
+        try:
+            asyncio.run(main())
+        finally:
+            http_client.configure_pool(**original.__dict__)
+        self.assertEqual(state["peak"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内嵌图片分析测试
+"""
+import unittest
+from unittest.mock import patch, AsyncMock
+import asyncio
+import os
+import sys
+import tempfile
+import zipfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.extraction_cache import ExtractionCache
+from utils.image_analyzer import EmbeddedImage, analyze_document_images_async, collect_images, link_image_descriptions
+
+
+class TestImageAnalyzer(unittest.TestCase):
+    """内嵌图片分析测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.docx_path = os.path.join(self.tmp_dir.name, "test.docx")
+        logo = b"\x89PNG" + b"L" * 8000
+        with zipfile.ZipFile(self.docx_path, "w") as archive:
+            archive.writestr("word/document.xml", "<w:document/>")
+            archive.writestr("word/media/image1.png", logo)
+            archive.writestr("word/media/image2.png", logo)  # 同一张图片重复出现
+            archive.writestr("word/media/image3.jpeg", b"\xff\xd8" + b"J" * 6000)
+            archive.writestr("word/media/bullet.png", b"\x89PNG" + b"b" * 100)
+            archive.writestr("word/media/diagram.emf", b"E" * 9000)
+        self.cache_patch = patch("utils.image_analyzer.image_cache",
+                                 ExtractionCache(os.path.join(self.tmp_dir.name, "images")))
+        self.cache_patch.start()
+
+    def tearDown(self):
+        """测试后清理"""
+        self.cache_patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_collect_images_dedupes_and_skips_icons(self):
+        """测试只返回可分析的图片：按内容去重，跳过小图标和矢量图"""
+        images = collect_images(self.docx_path, "docx")
+        self.assertEqual([image.name for image in images], ["word/media/image1.png", "word/media/image3.jpeg"])
+        self.assertEqual(images[1].mime_type, "image/jpeg")
+        self.assertEqual(images[0].aliases, ["word/media/image2.png"])
+
+    @patch('utils.image_analyzer.chat_completion_async', new_callable=AsyncMock)
+    def test_images_described_once_then_cached(self, mock_chat):
+        """测试每张图片单独发送给视觉模型，再次分析时全部命中缓存"""
+        mock_chat.side_effect = lambda payload, *args, **kwargs: {
+            "choices": [{"message": {"content": payload["messages"][0]["content"][0]["image_url"]["url"][:15]}}]
+        }
+
+        section = asyncio.run(analyze_document_images_async(self.docx_path, "docx", "test_api_key"))
+        self.assertEqual(mock_chat.call_count, 2)
+        self.assertIn("### 图片1（word/media/image1.png）\n\ndata:image/png", section)
+        self.assertIn("### 图片2（word/media/image3.jpeg）\n\ndata:image/jpeg", section)
+
+        self.assertEqual(asyncio.run(analyze_document_images_async(self.docx_path, "docx", "test_api_key")), section)
+        self.assertEqual(mock_chat.call_count, 2)
+
+    @patch('utils.image_analyzer.chat_completion_async', new_callable=AsyncMock)
+    def test_no_cache_describes_again(self, mock_chat):
+        """测试关闭缓存时不读取已缓存的图片描述"""
+        mock_chat.return_value = {"choices": [{"message": {"content": "描述"}}]}
+        asyncio.run(analyze_document_images_async(self.docx_path, "docx", "test_api_key"))
+        asyncio.run(analyze_document_images_async(self.docx_path, "docx", "test_api_key", use_cache=False))
+        self.assertEqual(mock_chat.call_count, 4)
+
+    def test_link_image_descriptions(self):
+        """测试本地解析生成的图片链接替换为描述编号，未描述的压缩包内图片不保留失效链接"""
+        chart = EmbeddedImage("word/media/image3.jpeg", b"J", "image/jpeg")
+        logo = EmbeddedImage("word/media/image1.png", b"L", "image/png")
+        markdown = "正文 ![图片](word/media/image3.jpeg)\n\n![图片](word/media/diagram.emf) ![外链](https://a.test/x.png)"
+
+        result = link_image_descriptions(markdown, [(logo, "标志"), (chart, "柱状图")])
+        self.assertTrue(result.startswith("正文 [图片1]\n\n[图片] ![外链](https://a.test/x.png)"))
+        self.assertIn("### 图片1（word/media/image3.jpeg）\n\n柱状图", result)
+        self.assertIn("### 图片2（word/media/image1.png）\n\n标志", result)
+
+    def test_duplicate_images_share_description(self):
+        """测试内容相同、名称不同的图片链接都替换为同一条描述的编号"""
+        described = [(image, "标志") for image in collect_images(self.docx_path, "docx")[:1]]
+        markdown = "![图片](word/media/image1.png) 和 ![图片](word/media/image2.png)"
+
+        result = link_image_descriptions(markdown, described)
+        self.assertTrue(result.startswith("[图片1] 和 [图片1]"))
+        self.assertEqual(result.count("### 图片"), 1)
+
+    @patch('utils.image_analyzer.chat_completion_async', new_callable=AsyncMock)
+    def test_document_without_images_makes_no_request(self, mock_chat):
+        """测试没有嵌入图片的文档不调用视觉模型"""
+        text_only = os.path.join(self.tmp_dir.name, "text.docx")
+        with zipfile.ZipFile(text_only, "w") as archive:
+            archive.writestr("word/document.xml", "<w:document>图片</w:document>")
+
+        self.assertEqual(asyncio.run(analyze_document_images_async(text_only, "docx", "test_api_key")), "")
+        mock_chat.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
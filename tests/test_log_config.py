@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置测试
+"""
+import unittest
+import io
+import json
+import logging
+import os
+import sys
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.log_config import LoggingConfigError, configure_logging
+
+
+class TestConfigureLogging(unittest.TestCase):
+    """日志配置测试类"""
+
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (list(root.handlers), root.level)
+
+    def tearDown(self):
+        root = logging.getLogger()
+        root.handlers[:] = self.saved[0]
+        root.setLevel(self.saved[1])
+
+    def test_json_format_with_lazy_payload_at_debug(self):
+        """测试JSON格式每行一条日志、包含extra字段，且INFO级别下不格式化DEBUG日志的参数"""
+        stream = io.StringIO()
+        configure_logging("INFO", "json", stream=stream)
+        logger = logging.getLogger("utils.test")
+
+        class Payload:
+            formatted = False
+
+            def __str__(self):
+                Payload.formatted = True
+                return "完整响应"
+
+        logger.debug("响应数据: %s", Payload())
+        logger.info("✅ 上传成功: %s", "file-1", extra={"stage": "upload"})
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        entry = json.loads(lines[0])
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "utils.test")
+        self.assertEqual(entry["message"], "✅ 上传成功: file-1")
+        self.assertEqual(entry["stage"], "upload")
+        self.assertFalse(Payload.formatted)
+
+    def test_reconfigure_replaces_handler_and_rejects_unknown_values(self):
+        """测试重复配置只保留一个处理器，未知的级别或格式报错"""
+        configure_logging("DEBUG", "text", stream=io.StringIO())
+        configure_logging("WARNING", "text", stream=io.StringIO())
+        installed = [h for h in logging.getLogger().handlers if getattr(h, "_doc_extraction", False)]
+        self.assertEqual(len(installed), 1)
+        self.assertEqual(logging.getLogger().level, logging.WARNING)
+        with self.assertRaises(LoggingConfigError):
+            configure_logging("VERBOSE")
+        with self.assertRaises(LoggingConfigError):
+            configure_logging("INFO", "xml")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标测试
+"""
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """指标注册表测试类"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.metrics.observe("stage_duration_seconds", 0.2, stage="upload", outcome="ok")
+        self.metrics.observe("stage_duration_seconds", 3.0, stage="upload", outcome="ok")
+        self.metrics.inc("http_retries_total", stage="upload")
+        self.metrics.record_usage({"prompt_tokens": 100, "completion_tokens": 40}, "chat_completion", "glm-4.5v")
+
+    def test_prometheus_text_has_cumulative_buckets(self):
+        """测试Prometheus文本格式中直方图为累计计数，并包含 +Inf、sum 和 count"""
+        text = self.metrics.render_prometheus()
+        labels = 'outcome="ok",stage="upload"'
+        self.assertIn("# TYPE doc_extraction_stage_duration_seconds histogram", text)
+        self.assertIn(f'doc_extraction_stage_duration_seconds_bucket{{{labels},le="0.1"}} 0', text)
+        self.assertIn(f'doc_extraction_stage_duration_seconds_bucket{{{labels},le="0.25"}} 1', text)
+        self.assertIn(f'doc_extraction_stage_duration_seconds_bucket{{{labels},le="5"}} 2', text)
+        self.assertIn(f'doc_extraction_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f"doc_extraction_stage_duration_seconds_sum{{{labels}}} 3.2", text)
+        self.assertIn('doc_extraction_http_retries_total{stage="upload"} 1', text)
+        self.assertIn('doc_extraction_tokens_total{model="glm-4.5v",stage="chat_completion",type="prompt"} 100',
+                      text)
+
+    def test_jsonl_export_appends_one_record_per_metric(self):
+        """测试JSON Lines导出每个指标一行，多次导出追加写入"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "metrics.jsonl")
+            self.metrics.write_jsonl(path)
+            self.metrics.write_jsonl(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 8)
+        histogram = next(r for r in records if r["type"] == "histogram")
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(histogram["labels"], {"outcome": "ok", "stage": "upload"})
+
+    def test_timed_marks_errors(self):
+        """测试代码块抛出异常时耗时记录带上 outcome=error"""
+        metrics = MetricsRegistry()
+        with self.assertRaises(RuntimeError):
+            with metrics.timed("file_save"):
+                raise RuntimeError("磁盘已满")
+        self.assertEqual(metrics.snapshot()[0]["labels"], {"outcome": "error", "stage": "file_save"})
+
+
+if __name__ == '__main__':
+    unittest.main()
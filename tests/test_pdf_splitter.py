@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF页码切分测试
+"""
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.pdf_splitter import HAS_PYPDF, plan_page_ranges
+from utils.extraction_cache import ExtractionCache
+from utils.document_extractor import ExtractionStatus, extract_pdf_by_page_ranges_async
+from utils.http_client import run_sync
+
+
+class TestPdfSplitter(unittest.TestCase):
+    """PDF页码切分测试类"""
+
+    def test_plan_page_ranges(self):
+        """测试按平均页大小规划页码范围，且各范围页数均衡"""
+        ranges = plan_page_ranges(page_count=10, file_size=10 * 1024 * 1024, target_range_bytes=4 * 1024 * 1024)
+        self.assertEqual([(r.start_page, r.end_page) for r in ranges], [(1, 4), (5, 8), (9, 10)])
+        ranges = plan_page_ranges(page_count=100, file_size=1000, max_pages_per_range=30)
+        self.assertEqual([(r.start_page, r.end_page) for r in ranges], [(1, 25), (26, 50), (51, 75), (76, 100)])
+        self.assertEqual(plan_page_ranges(0, 0), [])
+
+    @unittest.skipUnless(HAS_PYPDF, "未安装pypdf")
+    def test_ranges_extracted_in_parallel_and_cached(self):
+        """测试各页码范围按页码顺序合并，失败的范围在重新运行时单独重试"""
+        from pypdf import PdfReader, PdfWriter
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "big.pdf")
+            writer = PdfWriter()
+            for _ in range(6):
+                writer.add_blank_page(width=200, height=200)
+            with open(pdf_path, "wb") as f:
+                writer.write(f)
+            bytes_per_page = os.path.getsize(pdf_path) // 6
+            split_config = {"target_range_mb": 2 * bytes_per_page / (1024 * 1024), "concurrency": 2}
+
+            calls = []
+            state = {"fail": "p3-4"}
+
+            async def fake_normal(range_path, file_type, stream_path=None, **kwargs):
+                label = os.path.splitext(range_path)[0].rsplit("_", 1)[1]
+                calls.append(label)
+                if label == state["fail"]:
+                    return ""
+                return f"{label}:{len(PdfReader(range_path).pages)}页"
+
+            with patch("utils.document_extractor.extract_content_normal_file_async", side_effect=fake_normal), \
+                    patch("utils.document_extractor.extraction_cache", ExtractionCache(os.path.join(tmp_dir, "cache"))), \
+                    patch("utils.document_extractor.get_registry") as mock_registry:
+                mock_registry.return_value.get_section.return_value = split_config
+                mock_registry.return_value.get_prompt.return_value = "{file_content}"
+
+                self.assertEqual(run_sync(extract_pdf_by_page_ranges_async(pdf_path)), "")
+                self.assertEqual(sorted(calls), ["p1-2", "p3-4", "p5-6"])
+
+                calls.clear()
+                state["fail"] = None
+                content = run_sync(extract_pdf_by_page_ranges_async(pdf_path))
+
+        self.assertEqual(calls, ["p3-4"])
+        self.assertLess(content.index("p1-2:2页"), content.index("p3-4:2页"))
+        self.assertLess(content.index("p3-4:2页"), content.index("p5-6:2页"))
+        self.assertIn("<!-- 第 3-4 页 -->", content)
+
+    @unittest.skipUnless(HAS_PYPDF, "未安装pypdf")
+    def test_degraded_range_not_cached(self):
+        """测试模型未返回内容而降级为原始文本的范围不缓存，结果标记为降级，重新运行时重试"""
+        from pypdf import PdfWriter
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "big.pdf")
+            writer = PdfWriter()
+            for _ in range(4):
+                writer.add_blank_page(width=200, height=200)
+            with open(pdf_path, "wb") as f:
+                writer.write(f)
+            bytes_per_page = os.path.getsize(pdf_path) // 4
+            split_config = {"target_range_mb": 2 * bytes_per_page / (1024 * 1024), "concurrency": 2}
+
+            calls = []
+            state = {"degraded": "p3-4"}
+
+            async def fake_normal(range_path, file_type, status=None, **kwargs):
+                label = os.path.splitext(range_path)[0].rsplit("_", 1)[1]
+                calls.append(label)
+                if label == state["degraded"]:
+                    status.mark_degraded("聊天API失败，使用文件原始文本")
+                    return f"{label}:原始文本"
+                return f"{label}:整理后"
+
+            with patch("utils.document_extractor.extract_content_normal_file_async", side_effect=fake_normal), \
+                    patch("utils.document_extractor.extraction_cache", ExtractionCache(os.path.join(tmp_dir, "cache"))), \
+                    patch("utils.document_extractor.get_registry") as mock_registry:
+                mock_registry.return_value.get_section.return_value = split_config
+                mock_registry.return_value.get_prompt.return_value = "{file_content}"
+
+                status = ExtractionStatus()
+                content = run_sync(extract_pdf_by_page_ranges_async(pdf_path, status=status))
+                self.assertIn("p3-4:原始文本", content)
+                self.assertTrue(status.degraded)
+                self.assertIn("第 3-4 页", status.reasons[0])
+
+                calls.clear()
+                state["degraded"] = None
+                status = ExtractionStatus()
+                content = run_sync(extract_pdf_by_page_ranges_async(pdf_path, status=status))
+
+        self.assertEqual(calls, ["p3-4"])
+        self.assertFalse(status.degraded)
+        self.assertIn("p3-4:整理后", content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理入口测试
+"""
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from process_documents import collect_documents, process_documents_async
+
+
+class TestProcessDocuments(unittest.TestCase):
+    """批量处理测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp_dir.name, "input")
+        self.output_dir = os.path.join(self.tmp_dir.name, "output")
+        os.makedirs(self.input_dir)
+        for name in ["a.pdf", "b.docx", "c.doc", "d.PDF", "notes.txt"]:
+            with open(os.path.join(self.input_dir, name), "w") as f:
+                f.write("测试内容")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def test_collect_documents_single_queue(self):
+        """测试PDF与Word文件收集到同一队列"""
+        documents = collect_documents(self.input_dir)
+        names = [(os.path.basename(path), file_type) for path, file_type in documents]
+        self.assertEqual(names, [("a.pdf", "pdf"), ("b.docx", "docx"), ("c.doc", "docx"), ("d.PDF", "pdf")])
+
+    def test_process_documents_concurrent_summary(self):
+        """测试并发处理与结果摘要"""
+        state = {"in_flight": 0, "peak": 0}
+
+        async def fake_run_from_file(self_, file_path, file_type, status=None):
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+            await asyncio.sleep(0.05)
+            state["in_flight"] -= 1
+            if file_path.endswith("c.doc"):
+                return None
+            return f"# {os.path.basename(file_path)}"
+
+        with patch("process_documents.UnifiedContentExtractionWorkflow.run_from_file", fake_run_from_file):
+            results = asyncio.run(process_documents_async(self.input_dir, self.output_dir, concurrency=2))
+
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual([r["status"] for r in results], ["success", "success", "failed", "success"])
+        self.assertEqual(results[0]["output_path"], os.path.join(self.output_dir, "a_extracted_content.md"))
+        self.assertIsNone(results[2]["output_path"])
+
+    def test_incremental_runs_use_manifest(self):
+        """测试再次运行只处理新增、修改过或失败的文档，并支持force与only_failed"""
+        processed = []
+
+        async def fake_run_from_file(self_, file_path, file_type, status=None):
+            processed.append(os.path.basename(file_path))
+            if file_path.endswith("c.doc"):
+                return None
+            with open(self_.get_output_path(file_path), "w", encoding="utf-8") as f:
+                f.write("# 内容")
+            return "# 内容"
+
+        def run(mode="incremental"):
+            processed.clear()
+            with patch("process_documents.UnifiedContentExtractionWorkflow.run_from_file", fake_run_from_file):
+                return asyncio.run(process_documents_async(self.input_dir, self.output_dir, mode=mode))
+
+        run()
+        self.assertEqual(len(processed), 4)
+
+        # 未修改的成功文档被跳过，失败的文档重试
+        results = run()
+        self.assertEqual(processed, ["c.doc"])
+        self.assertEqual(results[0]["status"], "skipped")
+        self.assertEqual(results[0]["output_path"], os.path.join(self.output_dir, "a_extracted_content.md"))
+
+        # 内容修改过的文档重新处理
+        with open(os.path.join(self.input_dir, "b.docx"), "w") as f:
+            f.write("修改后的内容")
+        run()
+        self.assertEqual(processed, ["b.docx", "c.doc"])
+
+        run("only_failed")
+        self.assertEqual(processed, ["c.doc"])
+        run("force")
+        self.assertEqual(len(processed), 4)
+
+    def test_partial_results_are_retried(self):
+        """测试模型未能完整处理的文档记为部分成功，增量运行时重新处理"""
+        processed = []
+        state = {"degraded": True}
+
+        async def fake_run_from_file(self_, file_path, file_type, status=None):
+            processed.append(os.path.basename(file_path))
+            if file_path.endswith("a.pdf") and state["degraded"]:
+                status.mark_degraded("1/3 块处理失败，使用原始内容")
+            with open(self_.get_output_path(file_path), "w", encoding="utf-8") as f:
+                f.write("# 内容")
+            return "# 内容"
+
+        with patch("process_documents.UnifiedContentExtractionWorkflow.run_from_file", fake_run_from_file):
+            results = asyncio.run(process_documents_async(self.input_dir, self.output_dir))
+            self.assertEqual(results[0]["status"], "partial")
+            self.assertEqual(results[0]["error"], "1/3 块处理失败，使用原始内容")
+
+            processed.clear()
+            state["degraded"] = False
+            results = asyncio.run(process_documents_async(self.input_dir, self.output_dir))
+        self.assertEqual(processed, ["a.pdf"])
+        self.assertEqual(results[0]["status"], "success")
+
+    def test_failed_save_is_not_success(self):
+        """测试输出文件保存失败时不记为成功"""
+        async def fake_extract(self_, file_path, status=None):
+            return "# 内容"
+
+        with patch("src.unified_content_extraction_workflow.UnifiedContentExtractionWorkflow._extract_content_from_pdf",
+                   fake_extract), \
+                patch("src.unified_content_extraction_workflow.UnifiedContentExtractionWorkflow._extract_content_from_docx",
+                      fake_extract), \
+                patch("src.base_workflow.open", side_effect=OSError("磁盘已满")):
+            results = asyncio.run(process_documents_async(self.input_dir, self.output_dir))
+        self.assertEqual({r["status"] for r in results}, {"failed"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+速率限制器测试
+"""
+import unittest
+import asyncio
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.rate_limiter import ModelRateLimiter, estimate_request_tokens
+
+
+class TestRateLimiter(unittest.TestCase):
+    """速率限制器测试类"""
+
+    def test_concurrency_limit_blocks_until_release(self):
+        """测试并发名额用完后新的请求等待，直到有请求结束"""
+        limiter = ModelRateLimiter("test-model", max_concurrency=2)
+
+        async def main():
+            first = await limiter.acquire()
+            await limiter.acquire()
+            third = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0.05)
+            self.assertFalse(third.done())
+            first.record(200)
+            limiter.release(first)
+            await asyncio.wait_for(third, 1)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.in_flight, 2)
+
+    def test_requests_per_minute_budget(self):
+        """测试每分钟请求数用完后需要等待补充"""
+        limiter = ModelRateLimiter("test-model", rpm=2)
+
+        async def main():
+            await limiter.acquire()
+            await limiter.acquire()
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(limiter.acquire(), 0.1)
+
+        asyncio.run(main())
+
+    def test_throttle_halves_concurrency_and_honours_retry_after(self):
+        """测试429让并发减半并按Retry-After暂停，成功的请求让并发逐步恢复"""
+        limiter = ModelRateLimiter("test-model", max_concurrency=8)
+
+        async def main():
+            lease = await limiter.acquire()
+            lease.record(429, retry_after=0.2)
+            limiter.release(lease)
+            self.assertEqual(limiter.concurrency_limit, 4)
+
+            start = time.monotonic()
+            lease = await limiter.acquire()
+            self.assertGreaterEqual(time.monotonic() - start, 0.15)
+            for _ in range(30):
+                lease.record(200)
+                limiter.release(lease)
+                lease = await limiter.acquire()
+            limiter.release(lease)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.concurrency_limit, 8)
+
+    def test_estimate_request_tokens(self):
+        """测试预估token数包含文本、图片和max_tokens"""
+        payload = {
+            "messages": [{"role": "user", "content": [
+                {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+                {"type": "text", "text": "abcdefgh"},
+            ]}],
+            "max_tokens": 100,
+        }
+        self.assertEqual(estimate_request_tokens(payload), 1000 + 2 + 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
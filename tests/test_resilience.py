@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求弹性策略测试
+"""
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import sys
+
+import httpx
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.glm_client import request_with_retries
+from utils.resilience import CALL_CHAT, CircuitBreaker, backoff_delay, get_profile, reset_circuit_breakers
+
+
+class TestResilience(unittest.TestCase):
+    """请求弹性策略测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        reset_circuit_breakers()
+
+    def tearDown(self):
+        """测试后清理"""
+        reset_circuit_breakers()
+
+    def _run(self, statuses, **kwargs):
+        """按顺序返回给定状态码，返回 (最终响应, 请求次数)"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(statuses[min(len(requests), len(statuses)) - 1])
+
+        async def main():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                with patch('utils.glm_client.get_async_client', return_value=client):
+                    return await request_with_retries("GET", "http://glm.test/files", label="测试", retry_delay=0,
+                                                      **kwargs)
+
+        return asyncio.run(main()), len(requests)
+
+    def test_retryable_status_is_retried_and_fatal_status_is_not(self):
+        """测试503按退避重试直到成功，400立即返回"""
+        response, attempts = self._run([503, 503, 200], max_retries=3)
+        self.assertEqual((response.status_code, attempts), (200, 3))
+
+        response, attempts = self._run([400, 200], max_retries=3)
+        self.assertEqual((response.status_code, attempts), (400, 1))
+
+    def test_open_circuit_fails_fast(self):
+        """测试同一主机连续失败达到阈值后熔断，之后的调用不再发出请求"""
+        transport = {"circuit_failure_threshold": 3, "circuit_reset_seconds": 60}
+        with patch('utils.resilience.get_registry') as registry:
+            registry.return_value.get_section.return_value = transport
+            response, attempts = self._run([503], max_retries=5)
+        self.assertEqual((response.status_code, attempts), (503, 3))
+
+        response, attempts = self._run([200], max_retries=5)
+        self.assertEqual((response, attempts), (None, 0))
+
+    def test_half_open_probe(self):
+        """测试熔断恢复时间过后只放行一个探测请求，探测成功后恢复"""
+        breaker = CircuitBreaker("glm.test", failure_threshold=2, reset_seconds=0)
+        breaker.record(False)
+        breaker.record(False)
+        self.assertTrue(breaker.is_open)
+        self.assertTrue(breaker.allow())
+        breaker.reset_seconds = 60
+        self.assertFalse(breaker.allow())
+        breaker.record(True)
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+    def test_backoff_is_jittered_and_honours_retry_after(self):
+        """测试退避时间不超过指数上限，且不少于Retry-After"""
+        profile = get_profile(CALL_CHAT, base_delay=1.0, max_delay=4.0)
+        for attempt in range(6):
+            self.assertLessEqual(backoff_delay(profile, attempt), min(4.0, 2 ** attempt))
+        self.assertGreaterEqual(backoff_delay(profile, 0, retry_after=3.0), 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量Markdown写入器测试
+"""
+import unittest
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.stream_writer import IncrementalMarkdownWriter, OrderedChunkWriter
+
+
+class TestStreamWriter(unittest.TestCase):
+    """增量Markdown写入器测试类"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "out.md")
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write("上次的结果")
+
+    def tearDown(self):
+        """测试后清理"""
+        self.tmp_dir.cleanup()
+
+    def _read(self) -> str:
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_failed_run_keeps_previous_output(self):
+        """测试失败时删除临时文件，已有的输出文件保持不变"""
+        with self.assertRaises(RuntimeError):
+            with IncrementalMarkdownWriter(self.path) as writer:
+                writer.append("部分内容")
+                self.assertEqual(self._read(), "上次的结果")
+                raise RuntimeError("中断")
+        self.assertEqual(self._read(), "上次的结果")
+        self.assertFalse(os.path.exists(writer.partial_path))
+
+    def test_commit_replaces_output_in_order(self):
+        """测试成功时用按顺序写出的内容替换输出文件"""
+        writer = IncrementalMarkdownWriter(self.path)
+        ordered = OrderedChunkWriter(writer, "|")
+        ordered.complete(1, "B")
+        ordered.complete(0, "A")
+        writer.close(commit=True)
+        writer.close()
+        self.assertEqual(self._read(), "A|B")
+        self.assertFalse(os.path.exists(writer.partial_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块处理日志 - 持久化大文件的远程文件ID和已完成块的输出，中断后重新运行时从未完成的块继续
+"""
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    from .extraction_cache import cache_path
+except ImportError:
+    from utils.extraction_cache import cache_path
+
+# 默认日志目录位于缓存根目录下的 journals
+DEFAULT_JOURNAL_SUBDIR = "journals"
+
+
+class ChunkJournal:
+    """
+    单个文档的分块处理日志，以JSON Lines文件持久化
+
+    每完成一块只追加一行记录（写入量与块大小成正比，不随已完成块数增长）；加载时按顺序重放，
+    中断时写了一半的末行被忽略。
+    """
+
+    def __init__(self, document_hash: str, journal_dir: Optional[str] = None):
+        """
+        初始化分块处理日志（存在旧日志时自动加载）
+
+        Args:
+            document_hash: 文档内容SHA-256，用作日志文件名
+            journal_dir: 日志目录，None时使用缓存根目录下的 journals
+        """
+        self.journal_path = os.path.join(journal_dir or cache_path(DEFAULT_JOURNAL_SUBDIR), f"{document_hash}.jsonl")
+        self._lock = threading.Lock()
+        self.finished = False  # finish() 之后为True，表示所有块都已成功完成
+        self._file_id = ""
+        self._fingerprint = ""
+        self._chunks: Dict[int, str] = {}
+        try:
+            with open(self.journal_path, 'r+', encoding='utf-8', newline='\n') as f:
+                valid_end = 0
+                for line in iter(f.readline, ''):
+                    if not line.endswith("\n"):
+                        break
+                    valid_end = f.tell()
+                    try:
+                        self._replay(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                # 截掉中断时写了一半的末行，之后追加的记录才能从新行开始
+                f.truncate(valid_end)
+        except OSError:
+            pass
+
+    def _replay(self, record: Dict[str, Any]) -> None:
+        """应用一条日志记录"""
+        kind = record["type"]
+        if kind == "file_id":
+            self._file_id = record["file_id"]
+        elif kind == "begin":
+            if record["fingerprint"] != self._fingerprint:
+                self._chunks = {}
+            self._fingerprint = record["fingerprint"]
+        elif kind == "chunk":
+            self._chunks[int(record["index"])] = record["text"]
+
+    def _append(self, *records: Dict[str, Any], truncate: bool = False) -> None:
+        """追加日志记录（调用方需持有锁），truncate为True时先清空旧记录"""
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, 'w' if truncate else 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(dict(record, time=int(time.time())), ensure_ascii=False) + "\n")
+
+    @property
+    def file_id(self) -> str:
+        """上次上传得到的远程文件ID，没有时为空字符串"""
+        return self._file_id
+
+    def set_file_id(self, file_id: str) -> None:
+        """记录远程文件ID（文件ID变化时已完成的块仍然有效，因为块内容只取决于文档内容）"""
+        with self._lock:
+            if self._file_id != file_id:
+                self._file_id = file_id
+                self._append({"type": "file_id", "file_id": file_id})
+
+    def begin(self, fingerprint: str, total_chunks: int) -> int:
+        """
+        开始一次分块处理
+
+        Args:
+            fingerprint: 分块结果的指纹（原始内容、分块参数、提示词模板和模型），与日志不一致时丢弃已完成的块
+            total_chunks: 总块数
+
+        Returns:
+            可以直接复用的已完成块数量
+        """
+        with self._lock:
+            if self._fingerprint != fingerprint:
+                # 旧块全部作废，重写日志只保留文件ID，避免日志无限增长
+                self._fingerprint = fingerprint
+                self._chunks = {}
+                records = [{"type": "file_id", "file_id": self._file_id}] if self._file_id else []
+                records.append({"type": "begin", "fingerprint": fingerprint, "total_chunks": total_chunks})
+                self._append(*records, truncate=True)
+            return len(self._chunks)
+
+    def get(self, index: int) -> Optional[str]:
+        """获取第index块已完成的输出，未完成返回None"""
+        with self._lock:
+            return self._chunks.get(index)
+
+    def complete(self, index: int, text: str) -> None:
+        """登记第index块的输出并立即追加到日志"""
+        with self._lock:
+            self._chunks[index] = text
+            self._append({"type": "chunk", "index": index, "text": text})
+
+    def finish(self) -> None:
+        """所有块都已成功完成，删除日志文件"""
+        with self._lock:
+            self.finished = True
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分块器 - 按标题、段落和表格边界切分文本，并按估算的token预算打包
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import List
+
+# GLM分词器的粗略估算：中文约1.5个字符一个token，其他字符约4个字符一个token
+CJK_CHARS_PER_TOKEN = 1.5
+OTHER_CHARS_PER_TOKEN = 4.0
+
+DEFAULT_CHUNK_TOKENS = 4000
+
+_CJK_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+_HEADING_RE = re.compile(
+    r'^\s*(#{1,6}\s+\S'
+    r'|第[一二三四五六七八九十百千零〇\d]+[章节篇部分条]'
+    r'|[一二三四五六七八九十]+、'
+    r'|\d+(\.\d+)+\s*\S)'
+)
+_TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-{3,}')
+_SENTENCE_END_RE = re.compile(r'(?<=[。！？；.!?;])')
+
+# 标题行长度上限，超过时视为普通段落
+_MAX_HEADING_LENGTH = 80
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文本在GLM分词器下的token数量"""
+    cjk_count = len(_CJK_RE.findall(text))
+    other_count = len(text) - cjk_count
+    return int(math.ceil(cjk_count / CJK_CHARS_PER_TOKEN + other_count / OTHER_CHARS_PER_TOKEN))
+
+
+@dataclass
+class Block:
+    """文本结构块"""
+    kind: str  # heading / paragraph / table
+    text: str
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+@dataclass
+class Chunk:
+    """打包后的文本块"""
+    index: int
+    text: str
+    tokens: int
+    context: str = ""  # 与上一块重叠的内容，仅作为上下文参考
+
+
+def _is_heading(line: str) -> bool:
+    return len(line.strip()) <= _MAX_HEADING_LENGTH and bool(_HEADING_RE.match(line))
+
+
+def _is_table_line(line: str) -> bool:
+    stripped = line.strip()
+    return stripped.startswith("|") or line.count("\t") >= 2
+
+
+def split_blocks(text: str) -> List[Block]:
+    """
+    将文本切分为标题、段落和表格块
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        结构块列表，顺序与原文一致
+    """
+    blocks: List[Block] = []
+    paragraph: List[str] = []
+    table: List[str] = []
+
+    def flush_paragraph() -> None:
+        if paragraph:
+            blocks.append(Block("paragraph", "\n".join(paragraph)))
+            paragraph.clear()
+
+    def flush_table() -> None:
+        if table:
+            blocks.append(Block("table", "\n".join(table)))
+            table.clear()
+
+    for line in text.splitlines():
+        if _is_table_line(line):
+            flush_paragraph()
+            table.append(line)
+            continue
+        flush_table()
+        if not line.strip():
+            flush_paragraph()
+        elif _is_heading(line):
+            flush_paragraph()
+            blocks.append(Block("heading", line.strip()))
+        else:
+            paragraph.append(line)
+    flush_paragraph()
+    flush_table()
+    return blocks
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """按字符数硬切分（最后手段）"""
+    tokens = max(1, estimate_tokens(text))
+    chars_per_piece = max(1, int(len(text) * max_tokens / tokens))
+    return [text[i:i + chars_per_piece] for i in range(0, len(text), chars_per_piece)]
+
+
+def _pack(pieces: List[str], max_tokens: int, separator: str, header: str = "") -> List[str]:
+    """将小片段贪心打包到预算内，header会重复放在每个包的开头"""
+    packed: List[str] = []
+    current: List[str] = []
+    budget = max_tokens - estimate_tokens(header)
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > budget:
+            packed.append(header + separator.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        packed.append(header + separator.join(current))
+    return packed
+
+
+def _split_oversized(block: Block, max_tokens: int) -> List[Block]:
+    """切分超出预算的结构块：表格按行切分并重复表头，段落按句子切分"""
+    if block.kind == "table":
+        rows = block.text.split("\n")
+        header = ""
+        if len(rows) > 2 and _TABLE_SEPARATOR_RE.match(rows[1]):
+            header = rows[0] + "\n" + rows[1] + "\n"
+            rows = rows[2:]
+        row_pieces: List[str] = []
+        for row in rows:
+            row_pieces.extend(_hard_split(row, max_tokens) if estimate_tokens(row) > max_tokens else [row])
+        return [Block("table", text) for text in _pack(row_pieces, max_tokens, "\n", header)]
+
+    sentences: List[str] = []
+    for sentence in _SENTENCE_END_RE.split(block.text):
+        if not sentence:
+            continue
+        sentences.extend(_hard_split(sentence, max_tokens) if estimate_tokens(sentence) > max_tokens else [sentence])
+    return [Block(block.kind, text) for text in _pack(sentences, max_tokens, "")]
+
+
+def _tail_context(blocks: List[Block], overlap_tokens: int) -> str:
+    """取上一块末尾不超过overlap_tokens的完整结构块作为重叠上下文"""
+    selected: List[str] = []
+    used = 0
+    for block in reversed(blocks):
+        if used + block.tokens > overlap_tokens:
+            break
+        selected.insert(0, block.text)
+        used += block.tokens
+    if not selected and blocks:
+        # 最后一个结构块本身就超出重叠预算时，取其末尾的若干句子
+        sentences = [s for s in _SENTENCE_END_RE.split(blocks[-1].text) if s]
+        for sentence in reversed(sentences):
+            if used + estimate_tokens(sentence) > overlap_tokens:
+                break
+            selected.insert(0, sentence)
+            used += estimate_tokens(sentence)
+        return "".join(selected)
+    return "\n\n".join(selected)
+
+
+def split_into_chunks(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_tokens: int = 0) -> List[Chunk]:
+    """
+    按结构边界将文本切分为不超过token预算的块
+
+    Args:
+        text: 原始文本
+        max_tokens: 每块的估算token上限
+        overlap_tokens: 相邻块之间重叠的上下文token上限，0表示不重叠
+
+    Returns:
+        文本块列表
+    """
+    max_tokens = max(1, max_tokens)
+    grouped: List[List[Block]] = []
+    current: List[Block] = []
+    current_tokens = 0
+
+    def flush() -> None:
+        nonlocal current, current_tokens
+        # 避免标题落在块末尾而正文在下一块：把末尾的标题带到下一块
+        carried: List[Block] = []
+        while current and current[-1].kind == "heading" and len(current) > 1:
+            carried.insert(0, current.pop())
+        if current:
+            grouped.append(current)
+        current = carried
+        current_tokens = sum(block.tokens for block in carried)
+
+    for block in split_blocks(text):
+        pieces = [block] if block.tokens <= max_tokens else _split_oversized(block, max_tokens)
+        for piece in pieces:
+            piece_tokens = piece.tokens
+            over_budget = current_tokens + piece_tokens > max_tokens
+            # 新的标题在当前块已过半时开启新块，让章节尽量完整地落在同一块中
+            heading_break = piece.kind == "heading" and current_tokens >= max_tokens // 2
+            if current and (over_budget or heading_break):
+                flush()
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        grouped.append(current)
+
+    chunks: List[Chunk] = []
+    for index, blocks in enumerate(grouped):
+        chunk_text = "\n\n".join(block.text for block in blocks)
+        context = _tail_context(grouped[index - 1], overlap_tokens) if index > 0 and overlap_tokens > 0 else ""
+        chunks.append(Chunk(index=index, text=chunk_text, tokens=estimate_tokens(chunk_text), context=context))
+    return chunks
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置注册表 - 一次加载并校验模型配置与提示词，文件修改后自动重新加载
+"""
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import yaml
+from dotenv import load_dotenv
+
+try:
+    from .http_client import configure_pool
+except ImportError:
+    from utils.http_client import configure_pool
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，相对路径都以此为基准解析，与当前工作目录无关
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, "config", "model_config.yaml")
+DEFAULT_PROMPTS_PATH = os.path.join(PROJECT_ROOT, "prompts", "document_extraction_prompts.yaml")
+
+# API密钥默认读取的模型配置
+DEFAULT_API_KEY_MODEL = "glm-4.5v"
+
+# 模型配置文件中可选的运行时配置段
+OPTIONAL_SECTIONS = ("http", "chunking", "docx", "pdf_split", "cleanup", "images", "rate_limits", "transport",
+                     "deadlines", "hedging")
+
+# Word文档本地解析后交给模型整理的方式
+DOCX_LLM_FORMAT_MODES = ("never", "complex", "always")
+
+
+class ConfigError(ValueError):
+    """配置文件缺失或格式不正确"""
+
+
+def resolve_path(path: str) -> str:
+    """将相对路径解析为相对于项目根目录的绝对路径"""
+    if os.path.isabs(path):
+        return path
+    return os.path.normpath(os.path.join(PROJECT_ROOT, path))
+
+
+def validate_config(config: Any) -> None:
+    """校验模型配置文件结构"""
+    if not isinstance(config, dict):
+        raise ConfigError("模型配置文件内容必须是映射")
+    models = config.get("models")
+    if not isinstance(models, dict) or not models:
+        raise ConfigError("模型配置文件缺少 models 配置")
+    for name, model_config in models.items():
+        if not isinstance(model_config, dict):
+            raise ConfigError(f"模型 '{name}' 的配置必须是映射")
+        for field in ("provider", "model_name", "api_base"):
+            if not model_config.get(field):
+                raise ConfigError(f"模型 '{name}' 缺少 {field} 配置")
+    for section in OPTIONAL_SECTIONS:
+        if not isinstance(config.get(section) or {}, dict):
+            raise ConfigError(f"{section} 配置必须是映射")
+    for model, limits in (config.get("rate_limits") or {}).items():
+        if not isinstance(limits or {}, dict):
+            raise ConfigError(f"rate_limits.{model} 配置必须是映射")
+    llm_format = (config.get("docx") or {}).get("llm_format", "complex")
+    if llm_format not in DOCX_LLM_FORMAT_MODES:
+        raise ConfigError(f"docx.llm_format 必须是 {'/'.join(DOCX_LLM_FORMAT_MODES)} 之一")
+
+
+def validate_prompts(prompts: Any) -> None:
+    """校验提示词文件结构"""
+    if not isinstance(prompts, dict):
+        raise ConfigError("提示词文件内容必须是映射")
+    template = prompts.get("document_extraction_prompt")
+    if not isinstance(template, str) or "{file_content}" not in template:
+        raise ConfigError("提示词文件缺少包含 {file_content} 占位符的 document_extraction_prompt")
+
+
+def resolve_api_key(raw_key: Optional[str]) -> str:
+    """解析配置中的API密钥，支持 ${ENV_NAME} 形式的环境变量引用"""
+    if not raw_key:
+        return ""
+    if raw_key.startswith('${') and raw_key.endswith('}'):
+        return os.getenv(raw_key[2:-1]) or ""
+    return raw_key.strip('"\'')
+
+
+class _WatchedYaml:
+    """按修改时间缓存的YAML文件"""
+
+    def __init__(self, path: str, validator: Callable[[Any], None]):
+        self.path = path
+        self.validator = validator
+        self._mtime: Optional[float] = None
+        self._data: Any = None
+
+    def get(self) -> Any:
+        """返回文件内容，仅在文件修改时间变化后重新解析"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            raise ConfigError(f"配置文件不存在: {self.path}")
+        if mtime != self._mtime:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = yaml.safe_load(f)
+                self.validator(data)
+            except (ConfigError, yaml.YAMLError) as e:
+                if self._data is None:
+                    raise ConfigError(f"配置文件无效 {self.path}: {e}")
+                # 运行中修改出错时保留上一份有效配置
+                logger.warning("⚠️ 配置文件重新加载失败，继续使用旧配置 %s: %s", self.path, e)
+                self._mtime = mtime
+                return self._data
+            self._data = data
+            self._mtime = mtime
+            logger.info("📋 已加载配置文件: %s", self.path)
+        return self._data
+
+
+class ConfigRegistry:
+    """配置注册表类"""
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, prompts_path: str = DEFAULT_PROMPTS_PATH):
+        """
+        初始化配置注册表
+
+        Args:
+            config_path: 模型配置文件路径，相对路径以项目根目录为基准
+            prompts_path: 提示词文件路径，相对路径以项目根目录为基准
+        """
+        self._lock = threading.Lock()
+        self._config = _WatchedYaml(resolve_path(config_path), validate_config)
+        self._prompts = _WatchedYaml(resolve_path(prompts_path), validate_prompts)
+        self._applied_http_config: Optional[Dict[str, Any]] = None
+        load_dotenv(dotenv_path=os.path.join(PROJECT_ROOT, '.env'))
+
+    def load(self) -> "ConfigRegistry":
+        """立即加载并校验所有配置（启动时调用，配置错误时抛出ConfigError）"""
+        self.get_config()
+        self.get_prompts()
+        return self
+
+    def get_config(self) -> Dict[str, Any]:
+        """获取模型配置"""
+        with self._lock:
+            config = self._config.get()
+            self._apply_http_config(config.get("http") or {})
+            return config
+
+    def get_prompts(self) -> Dict[str, Any]:
+        """获取全部提示词"""
+        with self._lock:
+            return self._prompts.get()
+
+    def get_prompt(self, name: str = "document_extraction_prompt") -> str:
+        """获取指定名称的提示词模板，不存在时返回空字符串"""
+        return self.get_prompts().get(name, "")
+
+    def get_section(self, name: str) -> Dict[str, Any]:
+        """获取模型配置文件中的可选配置段，未配置时返回空字典"""
+        return self.get_config().get(name) or {}
+
+    def get_model_config(self, model_type: str) -> Dict[str, Any]:
+        """获取指定模型的配置"""
+        model_config = self.get_config()["models"].get(model_type)
+        if model_config is None:
+            raise ConfigError(f"在 model_config.yaml 中未找到 '{model_type}' 的配置")
+        return model_config
+
+    def get_api_key(self, model_type: str = DEFAULT_API_KEY_MODEL) -> str:
+        """获取指定模型配置中的API密钥，未配置时返回空字符串"""
+        try:
+            return resolve_api_key(self.get_model_config(model_type).get("api_key"))
+        except ConfigError:
+            return ""
+
+    def _apply_http_config(self, http_config: Dict[str, Any]) -> None:
+        """将配置文件中的 http 配置应用到共享连接池（调用方需持有锁）"""
+        if http_config == self._applied_http_config:
+            return
+        try:
+            configure_pool(**http_config)
+        except TypeError as e:
+            raise ConfigError(f"http 配置包含未知字段: {e}")
+        self._applied_http_config = dict(http_config)
+
+
+_registry: Optional[ConfigRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ConfigRegistry:
+    """获取进程内共享的配置注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ConfigRegistry()
+        return _registry
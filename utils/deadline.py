@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截止时间传递 - 通过上下文变量把批次和单个文档的截止时间传给其中的每一个HTTP调用
+"""
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 当前上下文的截止时间（time.monotonic()时刻），None表示不限制；asyncio任务创建时复制上下文，子任务自动继承
+_deadline: ContextVar[Optional[float]] = ContextVar("doc_extraction_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """剩余时间已用完，放弃后续工作"""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    在代码块内设置截止时间，与外层的截止时间取较早者（例如批次截止时间内的单个文档截止时间）
+
+    Args:
+        seconds: 从现在起的时间预算（秒），None表示沿用外层的截止时间
+
+    Returns:
+        代码块内生效的截止时间
+    """
+    deadline = _deadline.get()
+    if seconds is not None:
+        scoped = time.monotonic() + max(0.0, seconds)
+        deadline = scoped if deadline is None else min(deadline, scoped)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """当前上下文的剩余时间（秒），未设置截止时间时返回None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_deadline(label: str) -> Optional[float]:
+    """
+    确认还有剩余时间
+
+    Args:
+        label: 日志和异常信息中使用的调用名称
+
+    Returns:
+        剩余时间（秒），未设置截止时间时返回None
+
+    Raises:
+        DeadlineExceeded: 剩余时间已用完
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"{label}: 已超过截止时间")
+    return remaining
+
+
+async def run_with_deadline(awaitable: Awaitable[T], seconds: Optional[float], label: str) -> T:
+    """
+    在截止时间内等待awaitable完成，超时时取消其中所有未完成的工作
+
+    Args:
+        awaitable: 要执行的协程
+        seconds: 时间预算（秒），与外层截止时间取较早者；两者都没有时不限制
+        label: 异常信息中使用的名称
+
+    Returns:
+        awaitable的结果
+
+    Raises:
+        DeadlineExceeded: 开始前剩余时间已用完，或执行超时
+    """
+    with deadline_scope(seconds):
+        remaining = remaining_time()
+        if remaining is None:
+            return await awaitable
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(f"{label}: 已超过截止时间，未开始处理")
+        try:
+            # wait_for在当前上下文中创建任务，其中的HTTP调用都能读到截止时间
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError as e:
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise DeadlineExceeded(f"{label}: {remaining:.0f}秒内未完成") from e
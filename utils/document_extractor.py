@@ -4,27 +4,126 @@
 文档抽取工具 - 支持从PDF和Word文件抽取内容
 """
 import os
+import logging
+import asyncio
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
 import yaml
-import requests
 from dotenv import load_dotenv
 
+try:
+    from .glm_client import (
+        run_sync,
+        get_file_content_async,
+        chat_completion_async,
+        stream_chat_completion_async,
+        extract_message_content,
+    )
+    from .stream_writer import IncrementalMarkdownWriter, OrderedChunkWriter
+    from .extraction_cache import ExtractionCache, file_sha256, text_sha256, cache_disabled_by_env
+    from .glm_file_manager import GLMFileManager
+    from .config_registry import get_registry, resolve_path
+    from .chunker import Chunk, DEFAULT_CHUNK_TOKENS, estimate_tokens, split_into_chunks
+    from .chunk_journal import ChunkJournal
+    from .metrics import STAGE_CHAT_COMPLETION, get_metrics
+    from .image_analyzer import (
+        analyze_document_images_async, describe_document_images_async, link_image_descriptions,
+    )
+    from .resilience import CALL_CHAT, CALL_CHUNK
+    from .deadline import DeadlineExceeded
+    from .hedging import get_hedger, hedging_enabled
+    from .docx_extractor import DocxExtractionError, extract_docx
+    from .extraction_planner import (
+        CHUNK_MAX_TOKENS, ExtractionPlan, STRATEGY_LARGE_CHUNKED, STRATEGY_LOCAL_DOCX, STRATEGY_SPLIT_PDF,
+        collect_signals, fallback_plan, log_decision, output_token_budget, plan_from_signals,
+    )
+    from .pdf_splitter import (
+        DEFAULT_MAX_PAGES_PER_RANGE, HAS_PYPDF, PageRange, PdfSplitError,
+        count_pages, plan_page_ranges, write_page_ranges,
+    )
+except ImportError:
+    from utils.glm_client import (
+        run_sync,
+        get_file_content_async,
+        chat_completion_async,
+        stream_chat_completion_async,
+        extract_message_content,
+    )
+    from utils.stream_writer import IncrementalMarkdownWriter, OrderedChunkWriter
+    from utils.extraction_cache import ExtractionCache, file_sha256, text_sha256, cache_disabled_by_env
+    from utils.glm_file_manager import GLMFileManager
+    from utils.config_registry import get_registry, resolve_path
+    from utils.chunker import Chunk, DEFAULT_CHUNK_TOKENS, estimate_tokens, split_into_chunks
+    from utils.chunk_journal import ChunkJournal
+    from utils.metrics import STAGE_CHAT_COMPLETION, get_metrics
+    from utils.image_analyzer import (
+        analyze_document_images_async, describe_document_images_async, link_image_descriptions,
+    )
+    from utils.resilience import CALL_CHAT, CALL_CHUNK
+    from utils.deadline import DeadlineExceeded
+    from utils.hedging import get_hedger, hedging_enabled
+    from utils.docx_extractor import DocxExtractionError, extract_docx
+    from utils.extraction_planner import (
+        CHUNK_MAX_TOKENS, ExtractionPlan, STRATEGY_LARGE_CHUNKED, STRATEGY_LOCAL_DOCX, STRATEGY_SPLIT_PDF,
+        collect_signals, fallback_plan, log_decision, output_token_budget, plan_from_signals,
+    )
+    from utils.pdf_splitter import (
+        DEFAULT_MAX_PAGES_PER_RANGE, HAS_PYPDF, PageRange, PdfSplitError,
+        count_pages, plan_page_ranges, write_page_ranges,
+    )
+
+logger = logging.getLogger(__name__)
+
+# 文档内容提取使用的模型
+EXTRACTION_MODEL = "glm-4.5v"
+
+# 大文件分块处理时同时发送的块请求数量上限
+DEFAULT_CHUNK_CONCURRENCY = 4
+
+# 输出因max_tokens被截断（finish_reason为length）时最多续写的次数
+MAX_CONTINUATIONS = 3
+
+# 续写请求的提示词，提示词文件中的 continuation_prompt 优先
+DEFAULT_CONTINUATION_PROMPT = "上面的输出因长度限制被截断。请紧接着已输出内容的最后一个字继续输出，不要重复已输出的内容，也不要添加任何说明。"
+
+# 抽取结果缓存（按文件内容、提示词模板、模型和max_tokens寻址）
+extraction_cache = ExtractionCache()
+
+
+@dataclass
+class ExtractionStatus:
+    """一次抽取的结果状态：模型未能完整处理内容（回退为原始文本、有块失败等）时标记为降级"""
+    degraded: bool = False
+    reasons: List[str] = field(default_factory=list)
+
+    def mark_degraded(self, reason: str) -> None:
+        """标记为降级结果，降级结果不写入缓存，运行清单也不记为成功"""
+        self.degraded = True
+        self.reasons.append(reason)
+
+
+def _mark_degraded(status: Optional[ExtractionStatus], reason: str) -> None:
+    if status is not None:
+        status.mark_degraded(reason)
+
 def read_api_key(config_path: str) -> str:
-    """从配置文件中读取API密钥"""
+    """从配置文件中读取API密钥（保留向后兼容，抽取流程使用 config_registry 缓存的配置）"""
+    config_path = resolve_path(config_path)
     try:
         # 加载环境变量
         base_dir = os.path.dirname(os.path.dirname(__file__))
         dotenv_path = os.path.join(base_dir, '.env')
         load_dotenv(dotenv_path=dotenv_path)
-        print(f"🔍 加载环境变量文件: {dotenv_path}")
+        logger.debug("🔍 加载环境变量文件: %s", dotenv_path)
         
-        print(f"🔍 尝试读取配置文件: {config_path}")
+        logger.debug("🔍 尝试读取配置文件: %s", config_path)
         if not os.path.exists(config_path):
-            print(f"❌ 配置文件不存在: {config_path}")
+            logger.error("❌ 配置文件不存在: %s", config_path)
             return ""
         
         with open(config_path, 'r', encoding='utf-8') as f:
             config = yaml.safe_load(f)
-            print(f"📋 配置文件内容: {config}")
         
         # 首先尝试从配置文件获取API密钥
         api_key = config.get("models", {}).get("glm-4.5v", {}).get("api_key", "")
@@ -33,257 +132,321 @@ def read_api_key(config_path: str) -> str:
         if api_key and api_key.startswith('${') and api_key.endswith('}'):
             env_key = api_key[2:-1]  # 提取环境变量名
             api_key = os.getenv(env_key)
-            print(f"🔍 从环境变量 {env_key} 获取API密钥")
+            logger.debug("🔍 从环境变量 %s 获取API密钥", env_key)
             if api_key:
-                print(f"✅ 成功从环境变量读取API密钥: {api_key[:10]}...{api_key[-4:]}")
+                logger.debug("✅ 成功从环境变量读取API密钥: %s...%s", api_key[:10], api_key[-4:])
             else:
-                print(f"❌ 环境变量 {env_key} 中未找到API密钥")
+                logger.error("❌ 环境变量 %s 中未找到API密钥", env_key)
         elif api_key:
             # 移除可能的引号
             api_key = api_key.strip('"\'')
-            print(f"✅ 成功从配置文件读取API密钥: {api_key[:10]}...{api_key[-4:]}")
+            logger.debug("✅ 成功从配置文件读取API密钥: %s...%s", api_key[:10], api_key[-4:])
         else:
-            print("❌ 配置文件中未找到API密钥")
+            logger.error("❌ 配置文件中未找到API密钥")
         return api_key
     except Exception as e:
-        print(f"❌ 读取API密钥失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ 读取API密钥失败: %s", e)
         return ""
 
 def read_extraction_prompts(prompts_path: str) -> dict:
-    """从YAML文件读取文档提取提示词"""
+    """从YAML文件读取文档提取提示词（保留向后兼容，抽取流程使用 config_registry 缓存的提示词）"""
+    prompts_path = resolve_path(prompts_path)
     try:
-        print(f"🔍 读取提示词文件: {prompts_path}")
+        logger.debug("🔍 读取提示词文件: %s", prompts_path)
         if not os.path.exists(prompts_path):
-            print(f"❌ 提示词文件不存在: {prompts_path}")
+            logger.error("❌ 提示词文件不存在: %s", prompts_path)
             return {}
         
         with open(prompts_path, 'r', encoding='utf-8') as f:
             prompts = yaml.safe_load(f)
-            print(f"✅ 成功读取提示词: {list(prompts.keys())}")
+            logger.debug("✅ 成功读取提示词: %s", list(prompts.keys()))
             return prompts
     except Exception as e:
-        print(f"❌ 读取提示词失败: {e}")
+        logger.error("❌ 读取提示词失败: %s", e)
         return {}
 
+
+async def upload_file_async(file_path: str, api_key: str) -> str:
+    """上传文件到GLM-4.5V服务器，服务器上已有相同内容的文件时直接复用其文件ID"""
+    file_id = await GLMFileManager(api_key).upload_file_async(file_path)
+    return file_id or ""
+
 def upload_file(file_path: str, api_key: str) -> str:
-    """上传文件到GLM-4.5V服务器"""
-    try:
-        print(f"🔍 开始上传文件: {file_path}")
-        if not os.path.exists(file_path):
-            print(f"❌ 文件不存在: {file_path}")
-            return ""
-        
-        file_size = os.path.getsize(file_path)
-        print(f"📁 文件大小: {file_size} bytes")
-        
-        url = "https://open.bigmodel.cn/api/paas/v4/files"
-        headers = {
-            "Authorization": f"Bearer {api_key}"
-        }
-        file_name = os.path.basename(file_path)
-        print(f"📄 文件名: {file_name}")
-        
-        with open(file_path, 'rb') as f:
-            files = {'file': (file_name, f)}
-            # 注意：对于文件上传，payload应该作为data参数传递，而不是单独的data
-            data = {'purpose': 'file-extract'}
-            print(f"🌐 发送请求到: {url}")
-            print(f"📋 请求头: {headers}")
-            print(f"📦 文件参数准备完成")
-            
-            # 增强重试机制
-            max_retries = 3
-            retry_delay = 5  # 秒
-            for attempt in range(max_retries):
-                try:
-                    print(f"🔄 尝试 {attempt + 1}/{max_retries}")
-                    response = requests.post(url, headers=headers, files=files, data=data, timeout=60)
-                    if response.status_code == 200:
-                        break
-                    else:
-                        print(f"⚠️ 请求失败，状态码: {response.status_code}")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ {retry_delay}秒后重试...")
-                            import time
-                            time.sleep(retry_delay)
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ 第{attempt + 1}次请求失败: {e}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            
-            print(f"📊 响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"✅ 响应数据: {data}")
-                # 根据参考代码，响应中的字段是"id"而不是"file_id"
-                file_id = data.get("id", "")
-                if file_id:
-                    print(f"🎯 文件上传成功，文件ID: {file_id}")
-                else:
-                    print("❌ 响应中未找到id")
-                return file_id
-            else:
-                print(f"❌ 服务器响应错误: {response.text}")
-                raise Exception(f"文件上传失败: {response.status_code} - {response.text}")
-    except requests.exceptions.Timeout:
-        print("❌ 请求超时")
-        return ""
-    except requests.exceptions.ConnectionError:
-        print("❌ 网络连接错误")
-        return ""
-    except requests.exceptions.RequestException as e:
-        print(f"❌ 请求异常: {e}")
-        return ""
-    except Exception as e:
-        print(f"❌ 文件上传步骤失败: {e}")
-        import traceback
-        traceback.print_exc()
-        return ""
+    """上传文件到GLM-4.5V服务器（同步包装）"""
+    return run_sync(upload_file_async(file_path, api_key))
+
+def _delete_uploads_enabled(delete_upload: Optional[bool]) -> bool:
+    """是否在抽取成功后删除上传的文件（未指定时读取配置 cleanup.delete_after_extraction）"""
+    if delete_upload is not None:
+        return delete_upload
+    return bool(get_registry().get_section("cleanup").get("delete_after_extraction", False))
+
+async def _delete_upload_after_extraction_async(file_id: str, api_key: str, delete_upload: Optional[bool]) -> None:
+    """抽取成功后删除服务器上的上传文件，同时清除上传登记表中指向它的记录"""
+    if not file_id or not _delete_uploads_enabled(delete_upload):
+        return
+    if not await GLMFileManager(api_key).delete_file_async(file_id):
+        logger.warning("⚠️ 删除已上传文件失败，可稍后使用 GLMFileManager.cleanup_files 清理: %s", file_id)
+
+def _file_type_name(file_type: str) -> str:
+    """文件类型的显示名称"""
+    return {
+        "pdf": "PDF",
+        "docx": "Word(.docx)",
+        "doc": "Word(.doc)"
+    }.get(file_type, "未知")
 
-def extract_content_from_file(file_path: str, file_type: str) -> str:
+def _select_max_tokens(file_size: int) -> int:
+    """根据文件大小选择max_tokens"""
+    if file_size > 5 * 1024 * 1024:  # 大于5MB的文件
+        return 16000
+    elif file_size > 2 * 1024 * 1024:  # 大于2MB的文件
+        return 12000
+    else:
+        return 8000
+
+def _build_cache_key(file_path: str, plan: ExtractionPlan) -> str:
+    """计算文件的抽取结果缓存键（不同抽取方式的结果分开缓存）"""
+    prompt_template = get_registry().get_prompt("document_extraction_prompt")
+    return ExtractionCache.make_key(
+        file_sha256(file_path),
+        text_sha256(prompt_template),
+        f"{EXTRACTION_MODEL}+{plan.cache_tag}",
+        plan.max_tokens,
+    )
+
+async def extract_content_from_file_async(file_path: str, file_type: str, use_cache: bool = True,
+                                          stream_path: Optional[str] = None,
+                                          delete_upload: Optional[bool] = None,
+                                          status: Optional[ExtractionStatus] = None) -> str:
     """
-    通用文档内容抽取函数
-    
+    通用文档内容抽取函数（异步）
+
     Args:
         file_path: 文件路径
         file_type: 文件类型 (pdf, docx, doc)
-    
+        use_cache: 是否使用抽取结果缓存，False时跳过读取和写入
+        stream_path: 流式输出文件路径，提供时模型输出边生成边写入该文件
+        delete_upload: 抽取成功后是否删除上传到服务器的文件，None时读取配置 cleanup.delete_after_extraction
+        status: 结果状态，提供时记录结果是否降级；只有未降级的结果才写入缓存
+
     Returns:
         提取的文本内容
     """
-    # 检查文件大小，决定是否需要分页处理
-    file_size = os.path.getsize(file_path)
-    print(f"📊 文件大小: {file_size} bytes")
-    
-    if file_size > 10 * 1024 * 1024:  # 大于10MB的文件使用分页处理
-        print("📄 文件较大，使用分页处理")
-        return extract_content_large_file(file_path, file_type)
-    else:
-        print("📄 文件较小，使用常规处理")
-        return extract_content_normal_file(file_path, file_type)
+    if status is None:
+        status = ExtractionStatus()
+    # 根据本地信号（页数、文本密度、图片数量、Word部件大小）规划抽取方式
+    signals = await asyncio.to_thread(collect_signals, file_path, file_type)
+    logger.debug("📊 文件大小: %s bytes", signals.file_size)
+    config = get_registry().get_config()
+    plan = plan_from_signals(signals, config)
+    await asyncio.to_thread(log_decision, signals, plan)
+
+    use_cache = use_cache and not cache_disabled_by_env()
+    cache_key = None
+    if use_cache:
+        # 在上传之前检查缓存，命中时无需任何网络请求
+        cache_key = await asyncio.to_thread(_build_cache_key, file_path, plan)
+        cached_content = extraction_cache.get(cache_key)
+        if cached_content:
+            logger.info("⚡ 命中抽取结果缓存: %s", os.path.basename(file_path))
+            return cached_content
+
+    content: Optional[str] = None
+    planned_strategy = plan.strategy
+    if plan.strategy == STRATEGY_LOCAL_DOCX:
+        logger.info("📄 Word文档本地解析 (模型整理方式: %s)", plan.docx_llm_format)
+        content = await extract_content_docx_local_async(file_path, plan.docx_llm_format, stream_path,
+                                                         use_cache=use_cache, status=status) or None
+        if content is None:
+            plan = fallback_plan(signals, config, "本地解析未得到内容，改为上传到GLM服务器解析")
+    elif plan.strategy == STRATEGY_SPLIT_PDF:
+        content = await extract_pdf_by_page_ranges_async(file_path, use_cache, stream_path,
+                                                         pages_per_range=plan.pages_per_range,
+                                                         max_tokens=plan.max_tokens, delete_upload=delete_upload,
+                                                         status=status)
+        if content is None:
+            plan = fallback_plan(signals, config, "PDF无法切分，改为整份上传")
+
+    if content is None:
+        if plan.strategy != planned_strategy:
+            log_decision(signals, plan, None)
+            if cache_key:
+                # 首选方式退回后，按实际使用的方式缓存
+                cache_key = await asyncio.to_thread(_build_cache_key, file_path, plan)
+        if plan.strategy == STRATEGY_LARGE_CHUNKED:
+            logger.info("📄 文件较大，上传后分块处理")
+            content = await extract_content_large_file_async(file_path, file_type, stream_path, use_cache=use_cache,
+                                                             chunk_tokens=plan.chunk_tokens, split_pdf=False,
+                                                             delete_upload=delete_upload, status=status)
+        else:
+            logger.info("📄 使用常规处理 (max_tokens: %s)", plan.max_tokens)
+            content = await extract_content_normal_file_async(file_path, file_type, stream_path,
+                                                              max_tokens=plan.max_tokens, delete_upload=delete_upload,
+                                                              use_cache=use_cache, status=status)
+
+    if content and status.degraded:
+        # 降级结果不缓存，下次运行重新请求模型（分块处理可从分块日志中未完成的块继续）
+        logger.warning("⚠️ %s 的结果不完整，不写入缓存: %s", os.path.basename(file_path), '；'.join(status.reasons))
+    elif cache_key and content:
+        try:
+            extraction_cache.put(cache_key, content)
+        except OSError as e:
+            logger.warning("⚠️ 写入抽取结果缓存失败: %s", e)
+    return content
 
-def extract_content_normal_file(file_path: str, file_type: str) -> str:
+def extract_content_from_file(file_path: str, file_type: str, use_cache: bool = True,
+                              stream_path: Optional[str] = None, delete_upload: Optional[bool] = None) -> str:
+    """通用文档内容抽取函数（同步包装）"""
+    return run_sync(extract_content_from_file_async(file_path, file_type, use_cache, stream_path, delete_upload))
+
+async def _chat_with_continuation_async(payload: Dict[str, Any], api_key: str, label: str,
+                                        call_type: str = CALL_CHAT, stream: bool = False,
+                                        writer: Optional[IncrementalMarkdownWriter] = None) -> Optional[Dict[str, Any]]:
+    """
+    调用聊天完成API，输出因max_tokens被截断时自动续写
+
+    续写请求在原始消息后附上已输出的内容，要求模型从截断处继续，而不是重新生成整份文档。
+
+    Args:
+        payload: 请求体
+        api_key: API密钥
+        label: 日志中使用的调用名称
+        call_type: 非流式请求的调用类型（chat / chunk），决定超时和重试配置；流式请求按空闲时间计算超时
+        stream: 是否使用流式调用
+        writer: 流式输出的写入器（仅stream为True时使用），续写内容直接追加在后面
+
+    Returns:
+        聊天完成响应数据，content为各段输出拼接后的完整内容；首次请求失败返回None
+    """
+    messages: List[Dict[str, Any]] = list(payload["messages"])
+    parts: List[str] = []
+    chat_data: Optional[Dict[str, Any]] = None
+    for continuation in range(MAX_CONTINUATIONS + 1):
+        request = dict(payload, messages=messages)
+        if stream:
+            if writer:
+                writer.mark()
+            segment_data = await stream_chat_completion_async(
+                request, api_key, on_delta=writer.append if writer else None,
+                on_reset=writer.reset if writer else None, label=label,
+            )
+        else:
+            segment_data = await chat_completion_async(request, api_key, label=label, call_type=call_type)
+        if segment_data is None:
+            if chat_data is not None:
+                logger.warning("⚠️ %s续写失败，返回截断前已生成的 %s 字符", label, len("".join(parts)))
+            break
+        chat_data = segment_data
+        segment = extract_message_content(segment_data)
+        parts.append(segment)
+        if segment_data.get("choices", [{}])[0].get("finish_reason") != "length" or not segment:
+            break
+        if continuation == MAX_CONTINUATIONS:
+            logger.warning("⚠️ %s已续写 %s 次仍被截断，输出可能不完整", label, MAX_CONTINUATIONS)
+            break
+        logger.info("✂️ %s输出达到max_tokens被截断，从已输出的 %s 字符之后续写 (%s/%s)", label,
+                    len("".join(parts)), continuation + 1, MAX_CONTINUATIONS)
+        get_metrics().inc("continuations_total", stage=STAGE_CHAT_COMPLETION)
+        continuation_prompt = get_registry().get_prompt("continuation_prompt") or DEFAULT_CONTINUATION_PROMPT
+        messages = list(payload["messages"]) + [
+            {"role": "assistant", "content": "".join(parts)},
+            {"role": "user", "content": continuation_prompt},
+        ]
+
+    if chat_data is not None and len(parts) > 1:
+        chat_data["choices"][0]["message"]["content"] = "".join(parts)
+    return chat_data
+
+async def extract_content_normal_file_async(file_path: str, file_type: str, stream_path: Optional[str] = None,
+                                            max_tokens: Optional[int] = None,
+                                            delete_upload: Optional[bool] = None, use_cache: bool = True,
+                                            status: Optional[ExtractionStatus] = None) -> str:
     """
     常规文档内容抽取函数（适用于小文件）
-    
+
     Args:
         file_path: 文件路径
         file_type: 文件类型 (pdf, docx, doc)
-    
+        stream_path: 流式输出文件路径，提供时模型输出边生成边写入该文件
+        max_tokens: 输出token上限的下限（如规划器的估算）；获取到文件文本时取该值与按文本估算token数
+            计算的预算中较大者，未能获取文本时使用该值，默认按文件大小选择
+        delete_upload: 抽取成功后是否删除上传到服务器的文件，None时读取配置
+        use_cache: 是否使用图片描述缓存
+        status: 结果状态，聊天API失败、回退为文件原始文本时标记为降级
+
     Returns:
         提取的文本内容
     """
+    file_type_name = _file_type_name(file_type)
     try:
-        file_type_name = {
-            "pdf": "PDF",
-            "docx": "Word(.docx)",
-            "doc": "Word(.doc)"
-        }.get(file_type, "未知")
-        
-        print(f"\n🚀 === 开始{file_type_name}内容抽取 ===")
-        print(f"📁 输入文件: {file_path}")
-        
+        logger.info("🚀 === 开始%s内容抽取 ===", file_type_name)
+        logger.info("📁 输入文件: %s", file_path)
+
         if not os.path.exists(file_path):
-            print(f"❌ {file_type_name}文件未找到: {file_path}")
+            logger.error("❌ %s文件未找到: %s", file_type_name, file_path)
             raise FileNotFoundError(f"{file_type_name}文件未找到: {file_path}")
-        
+
         # 读取API密钥
-        print("🔑 步骤1: 读取API密钥")
-        api_key = read_api_key("config/model_config.yaml")
+        logger.info("🔑 步骤1: 读取API密钥")
+        api_key = get_registry().get_api_key()
         if not api_key:
-            print("❌ API密钥未找到")
+            logger.error("❌ API密钥未找到")
             raise Exception("API密钥未找到")
-        
+
         # 上传文件
-        print("📤 步骤2: 上传文件到GLM服务器")
-        file_id = upload_file(file_path, api_key)
+        logger.info("📤 步骤2: 上传文件到GLM服务器")
+        file_id = await upload_file_async(file_path, api_key)
         if not file_id:
-            print("❌ 文件上传失败")
+            logger.error("❌ 文件上传失败")
             raise Exception("文件上传失败")
-        
+
         # 调用 GLM-4.5V 模型的 API
-        print("🤖 步骤3: 调用GLM-4.5V模型进行内容提取")
-        
-        # 读取YAML提示词
-        prompts_path = "prompts/document_extraction_prompts.yaml"
-        prompts = read_extraction_prompts(prompts_path)
-        
-        url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
+        logger.info("🤖 步骤3: 调用GLM-4.5V模型进行内容提取")
+
+        # 读取YAML提示词（由配置注册表缓存，仅在文件修改后重新解析）
+        prompts = get_registry().get_prompts()
+
         # 使用统一的文档提取提示词
         prompt_key = "document_extraction_prompt"
+        input_tokens = None
         if prompt_key in prompts:
             prompt_template = prompts[prompt_key]
             # 先获取文件内容，然后将其包含在提示词中
-            file_content_url = f"https://open.bigmodel.cn/api/paas/v4/files/{file_id}/content"
-            print(f"🌐 获取文件内容用于处理: {file_content_url}")
-            
-            # 增强文件内容获取的重试机制
-            max_retries = 3
-            retry_delay = 5
-            file_response = None
-            for attempt in range(max_retries):
-                try:
-                    print(f"🔄 获取文件内容尝试 {attempt + 1}/{max_retries}")
-                    file_response = requests.get(file_content_url, headers=headers, timeout=300)  # 增加超时时间到5分钟
-                    if file_response.status_code == 200:
-                        break
-                    else:
-                        print(f"⚠️ 获取文件内容失败，状态码: {file_response.status_code}")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ {retry_delay}秒后重试...")
-                            import time
-                            time.sleep(retry_delay)
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ 获取文件内容第{attempt + 1}次尝试失败: {e}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            
-            if file_response and file_response.status_code == 200:
-                file_data = file_response.json()
+            logger.debug("🌐 获取文件内容用于处理")
+            file_data = await get_file_content_async(file_id, api_key)
+
+            if file_data is not None:
                 raw_content = file_data.get("content", "")
-                print(f"📝 获取到文件内容，长度: {len(raw_content)} 字符")
-                
+                logger.info("📝 获取到文件内容，长度: %s 字符", len(raw_content))
+                input_tokens = estimate_tokens(raw_content) if raw_content else None
+
                 # 将文件内容包含在提示词中
                 content = prompt_template.format(
                     file_content=raw_content
                 )
             else:
-                print(f"❌ 获取文件内容失败: {file_response.text if file_response else '无响应'}")
                 content = prompt_template.format(
                     file_content="[文件内容获取失败，请尝试其他方式]"
                 )
         else:
             # 如果YAML文件中没有找到对应的提示词，使用默认提示词
             content = f"请提取以下文档的内容：\n文件ID: {file_id}\n文件类型: {file_type_name}\n请返回提取信息后的Markdown文档。"
-        
+
         # 使用GLM-4.5V的聊天完成API，结合提示词来处理内容
-        print(f"🌐 使用聊天完成API处理文件内容")
-        
-        # 根据文件大小动态调整max_tokens
+        logger.debug("🌐 使用聊天完成API处理文件内容")
+
+        # 按文件文本的估算token数确定max_tokens（不低于调用方给出的值，如规划器计入图片和扫描页后的估算），没有文本时按文件大小选择
         file_size = os.path.getsize(file_path)
-        if file_size > 5 * 1024 * 1024:  # 大于5MB的文件
-            max_tokens = 16000
-        elif file_size > 2 * 1024 * 1024:  # 大于2MB的文件
-            max_tokens = 12000
+        if input_tokens:
+            max_tokens = max(max_tokens or 0, output_token_budget(input_tokens))
         else:
-            max_tokens = 8000
-            
-        print(f"📊 文件大小: {file_size} bytes, 设置max_tokens: {max_tokens}")
-        
+            max_tokens = max_tokens or _select_max_tokens(file_size)
+
+        logger.debug("📊 文件大小: %s bytes, 估算输入 %s tokens, 设置max_tokens: %s", file_size, input_tokens, max_tokens)
+
         payload = {
-            "model": "glm-4.5v",
+            "model": EXTRACTION_MODEL,
             "messages": [
                 {
                     "role": "user",
@@ -293,202 +456,99 @@ def extract_content_normal_file(file_path: str, file_type: str) -> str:
             "max_tokens": max_tokens,
             "temperature": 0.3
         }
-        
-        # 增强聊天API的重试机制
-        max_retries = 3
-        retry_delay = 10  # 聊天API重试间隔稍长
-        chat_response = None
-        for attempt in range(max_retries):
-            try:
-                print(f"🔄 聊天API尝试 {attempt + 1}/{max_retries}")
-                chat_response = requests.post(url, headers=headers, json=payload, timeout=300)  # 增加超时时间到5分钟
-                print(f"📊 聊天完成API响应状态码: {chat_response.status_code}")
-                if chat_response.status_code == 200:
-                    break
-                else:
-                    print(f"⚠️ 聊天API失败，状态码: {chat_response.status_code}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            except requests.exceptions.RequestException as e:
-                print(f"❌ 聊天API第{attempt + 1}次尝试失败: {e}")
-                if attempt < max_retries - 1:
-                    print(f"⏳ {retry_delay}秒后重试...")
-                    import time
-                    time.sleep(retry_delay)
-        
-        if chat_response and chat_response.status_code == 200:
-            chat_data = chat_response.json()
-            print(f"✅ 聊天完成API响应数据: {chat_data}")
-            
+
+        # 输出被截断时自动续写
+        if stream_path:
+            # 流式模式：边生成边写入输出文件，超时按空闲时间计算
+            with IncrementalMarkdownWriter(stream_path) as writer:
+                chat_data = await _chat_with_continuation_async(payload, api_key, label="流式聊天API", stream=True,
+                                                                writer=writer)
+                writer.close(commit=chat_data is not None)
+        else:
+            chat_data = await _chat_with_continuation_async(payload, api_key, label="聊天API")
+
+        if chat_data is not None:
+            logger.debug("✅ 聊天完成API响应数据: %s", chat_data)
+
             # 获取处理后的内容
-            processed_content = chat_data.get("choices", [{}])[0].get("message", {}).get("content", "")
+            processed_content = extract_message_content(chat_data)
             if processed_content:
-                print(f"📝 成功处理文件内容，长度: {len(processed_content)} 字符")
-                print(f"📄 内容预览: {processed_content[:200]}...")
-                
-                # 处理图片：如果文档中有图片，尝试提取并插入到相应位置
-                processed_content = _process_images_in_content(processed_content, file_id, api_key, headers)
-                
+                logger.info("📝 成功处理文件内容，长度: %s 字符", len(processed_content))
+                logger.debug("📄 内容预览: %s...", processed_content[:200])
+
+                # 处理图片：只分析文档中实际嵌入的图片
+                processed_content = await _process_images_in_content_async(processed_content, file_path, file_type,
+                                                                           api_key, use_cache=use_cache)
+
+                await _delete_upload_after_extraction_async(file_id, api_key, delete_upload)
                 return processed_content
             else:
-                print("❌ 聊天完成API响应中未找到内容")
-                print(f"完整响应: {chat_data}")
+                logger.error("❌ 聊天完成API响应中未找到内容")
+                logger.debug("完整响应: %s", chat_data)
                 return ""
         else:
-            print(f"❌ 聊天完成API调用失败: {chat_response.text if chat_response else '无响应'}")
             # 如果聊天API失败，回退到文件内容API
-            print("🔄 回退到文件内容API...")
-            file_content_url = f"https://open.bigmodel.cn/api/paas/v4/files/{file_id}/content"
-            print(f"🌐 文件内容API URL: {file_content_url}")
-            
-            # 再次尝试获取文件内容，使用增强的重试机制
-            max_retries = 3
-            retry_delay = 5
-            fallback_file_response = None
-            for attempt in range(max_retries):
-                try:
-                    print(f"🔄 回退获取文件内容尝试 {attempt + 1}/{max_retries}")
-                    fallback_file_response = requests.get(file_content_url, headers=headers, timeout=300)
-                    print(f"📊 回退文件内容响应状态码: {fallback_file_response.status_code}")
-                    if fallback_file_response.status_code == 200:
-                        file_response = fallback_file_response
-                        break
-                    else:
-                        print(f"⚠️ 回退获取文件内容失败，状态码: {fallback_file_response.status_code}")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ {retry_delay}秒后重试...")
-                            import time
-                            time.sleep(retry_delay)
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ 回退获取文件内容第{attempt + 1}次尝试失败: {e}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            
-            if fallback_file_response and fallback_file_response.status_code == 200:
-                file_data = fallback_file_response.json()
-                print(f"✅ 文件内容响应数据: {file_data}")
-                
+            logger.info("🔄 回退到文件内容API...")
+            file_data = await get_file_content_async(file_id, api_key, label="回退获取文件内容")
+
+            if file_data is not None:
+                logger.debug("✅ 文件内容响应数据: %s", file_data)
+
                 # 获取文件内容
                 file_content = file_data.get("content", "")
                 if file_content:
-                    print(f"📝 成功获取文件内容，长度: {len(file_content)} 字符")
-                    print(f"📄 内容预览: {file_content[:200]}...")
+                    logger.info("📝 成功获取文件内容，长度: %s 字符", len(file_content))
+                    logger.debug("📄 内容预览: %s...", file_content[:200])
+                    _mark_degraded(status, "聊天API失败，使用文件原始文本")
                     return file_content
                 else:
-                    print("❌ 文件内容响应中未找到content")
-                    print(f"完整响应: {file_data}")
+                    logger.error("❌ 文件内容响应中未找到content")
+                    logger.debug("完整响应: %s", file_data)
                     return ""
             else:
-                print(f"❌ 文件内容API调用失败: {fallback_file_response.text if fallback_file_response else '无响应'}")
                 return ""
+    except DeadlineExceeded:
+        # 截止时间已到，放弃整个文档，不再回退
+        raise
     except Exception as e:
-        file_type_name = {
-            "pdf": "PDF",
-            "docx": "Word(.docx)",
-            "doc": "Word(.doc)"
-        }.get(file_type, "未知")
-        print(f"❌ {file_type_name}内容抽取步骤失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ %s内容抽取步骤失败: %s", file_type_name, e)
         return ""
 
-def _process_images_in_content(content: str, file_id: str, api_key: str, headers: dict) -> str:
+def extract_content_normal_file(file_path: str, file_type: str, stream_path: Optional[str] = None,
+                                max_tokens: Optional[int] = None, delete_upload: Optional[bool] = None,
+                                use_cache: bool = True) -> str:
+    """常规文档内容抽取函数（同步包装）"""
+    return run_sync(extract_content_normal_file_async(file_path, file_type, stream_path, max_tokens, delete_upload,
+                                                      use_cache))
+
+async def _process_images_in_content_async(content: str, file_path: str, file_type: str, api_key: str,
+                                          use_cache: bool = True, link_images: bool = False) -> str:
     """
-    处理内容中的图片，将图片引用转换为实际的Markdown图片语法
-    
+    分析文档中实际嵌入的图片，将图片描述追加到内容末尾
+
     Args:
         content: 原始内容
-        file_id: 文件ID
+        file_path: 文件路径（在本地检测嵌入的图片）
+        file_type: 文件类型 (pdf, docx, doc)
         api_key: API密钥
-        headers: 请求头
-    
+        use_cache: 是否使用图片描述缓存
+        link_images: 内容是否由本地解析生成（包含 ![图片](word/media/...) 链接），是则把链接替换为对应描述的编号
+
     Returns:
         处理后的内容
     """
     try:
-        # 检查内容中是否有图片引用
-        if "![图片描述]" in content or "图片" in content:
-            print("🖼️ 检测到内容中可能包含图片，尝试提取图片信息...")
-            
-            # 使用GLM-4.5V分析内容中的图片
-            image_analysis_prompt = f"""
-请分析以下文档内容，识别并提取所有图片信息：
-
-**文档内容：**
-{content}
-
-**任务要求：**
-1. 识别文档中所有图片的位置和描述
-2. 为每个图片生成合适的标题和描述
-3. 如果图片包含文字，请提取图片中的文字内容
-4. 返回格式化的Markdown图片语法
-
-**输出格式：**
-请按照以下格式返回图片信息：
-![图片标题](图片描述)
-图片文字内容（如果有）：
-
-请开始分析并返回图片信息。
-"""
-            
-            url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-            payload = {
-                "model": "glm-4.5v",
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": image_analysis_prompt
-                    }
-                ],
-                "max_tokens": 2000,
-                "temperature": 0.3
-            }
-            
-            # 增强图片分析API的重试机制
-            max_retries = 2
-            retry_delay = 5
-            image_response = None
-            for attempt in range(max_retries):
-                try:
-                    print(f"🔄 图片分析API尝试 {attempt + 1}/{max_retries}")
-                    image_response = requests.post(url, headers=headers, json=payload, timeout=120)
-                    if image_response.status_code == 200:
-                        break
-                    else:
-                        print(f"⚠️ 图片分析API失败，状态码: {image_response.status_code}")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ {retry_delay}秒后重试...")
-                            import time
-                            time.sleep(retry_delay)
-                except requests.exceptions.RequestException as e:
-                    print(f"❌ 图片分析API第{attempt + 1}次尝试失败: {e}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            
-            if image_response and image_response.status_code == 200:
-                image_data = image_response.json()
-                image_content = image_data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                
-                if image_content and "![图片" in image_content:
-                    print(f"✅ 成功提取图片信息，长度: {len(image_content)} 字符")
-                    
-                    # 将图片信息插入到原始内容中的相应位置
-                    # 这里简化处理，将图片信息添加到内容末尾
-                    content += "\n\n---\n\n## 图片内容\n\n" + image_content
-                else:
-                    print("⚠️ 未检测到有效的图片信息")
-            else:
-                print(f"❌ 图片分析失败: {image_response.text if image_response else '无响应'}")
-        
+        if link_images:
+            described = await describe_document_images_async(file_path, file_type, api_key, use_cache=use_cache)
+            return link_image_descriptions(content, described)
+        image_section = await analyze_document_images_async(file_path, file_type, api_key, use_cache=use_cache)
+        if image_section:
+            content += "\n\n---\n\n" + image_section
         return content
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"❌ 图片处理失败: {e}")
+        logger.error("❌ 图片处理失败: %s", e)
         return content
 
 # 为了保持向后兼容，保留原有的函数名
@@ -504,148 +564,413 @@ def extract_content_from_doc(doc_path: str) -> str:
     """从Word文件抽取内容"""
     return extract_content_from_file(doc_path, "doc")
 
-def extract_content_large_file(file_path: str, file_type: str) -> str:
+async def extract_content_from_pdf_async(pdf_path: str, use_cache: bool = True, stream_path: Optional[str] = None,
+                                         delete_upload: Optional[bool] = None,
+                                         status: Optional[ExtractionStatus] = None) -> str:
+    """从PDF文件抽取内容（异步）"""
+    return await extract_content_from_file_async(pdf_path, "pdf", use_cache, stream_path, delete_upload, status)
+
+async def extract_content_from_docx_async(docx_path: str, use_cache: bool = True, stream_path: Optional[str] = None,
+                                          delete_upload: Optional[bool] = None,
+                                          status: Optional[ExtractionStatus] = None) -> str:
+    """从Word文件抽取内容（异步）"""
+    return await extract_content_from_file_async(docx_path, "docx", use_cache, stream_path, delete_upload, status)
+
+async def extract_content_from_doc_async(doc_path: str, use_cache: bool = True, stream_path: Optional[str] = None,
+                                         delete_upload: Optional[bool] = None,
+                                         status: Optional[ExtractionStatus] = None) -> str:
+    """从Word文件抽取内容（异步）"""
+    return await extract_content_from_file_async(doc_path, "doc", use_cache, stream_path, delete_upload, status)
+
+async def extract_content_docx_local_async(docx_path: str, llm_format: str = "complex",
+                                          stream_path: Optional[str] = None, use_cache: bool = True,
+                                          status: Optional[ExtractionStatus] = None) -> str:
+    """
+    Word文档本地解析：直接读取 word/document.xml 生成Markdown，按需交给模型整理，并分析 word/media 中的图片
+
+    Args:
+        docx_path: .docx 文件路径
+        llm_format: 模型整理方式，never 不调用模型，complex 只整理含合并单元格、嵌套表格、公式或文本框的段落，
+                    always 全文交给模型整理（图片分析不受该设置影响）
+        stream_path: 流式输出文件路径（仅 always 模式下使用）
+        use_cache: 是否使用图片描述缓存
+        status: 结果状态，交给模型整理的块或段落失败、保留本地解析内容时标记为降级
+
+    Returns:
+        Markdown内容，解析失败返回空字符串
+    """
+    try:
+        document = await asyncio.to_thread(extract_docx, docx_path)
+    except DocxExtractionError as e:
+        logger.error("❌ %s", e)
+        return ""
+
+    markdown = document.markdown
+    logger.info("📝 本地解析完成: %s 个段落，%s 张图片，长度: %s 字符", len(document.sections), len(document.images), len(markdown))
+    if not markdown:
+        return markdown
+
+    complex_sections = [section for section in document.sections if section.complex_reasons]
+    format_with_model = llm_format == "always" or (llm_format == "complex" and bool(complex_sections))
+    if llm_format == "complex" and not complex_sections:
+        logger.info("✅ 文档不含复杂内容，无需调用模型整理")
+    if not format_with_model and not document.images:
+        return markdown
+
+    api_key = get_registry().get_api_key()
+    if not api_key:
+        logger.warning("⚠️ API密钥未找到，直接使用本地解析结果")
+        return markdown
+
+    if llm_format == "always":
+        markdown = await process_content_in_chunks_async(markdown, "Word", api_key, stream_path=stream_path,
+                                                         status=status)
+    elif format_with_model:
+        logger.info("🔧 %s 个段落含复杂内容 (%s)，交给模型整理", len(complex_sections),
+                    '、'.join(document.complex_reasons))
+        semaphore = asyncio.Semaphore(max(1, get_registry().get_section("chunking").get(
+            "concurrency", DEFAULT_CHUNK_CONCURRENCY)))
+
+        async def format_section(section) -> None:
+            async with semaphore:
+                # 整理失败时 process_single_chunk_async 原样返回段落内容
+                formatted = await process_single_chunk_async(section.markdown, "Word", api_key)
+            if formatted == section.markdown:
+                _mark_degraded(status, "复杂段落整理失败，保留本地解析内容")
+            section.markdown = formatted
+
+        await asyncio.gather(*(format_section(section) for section in complex_sections))
+        markdown = document.markdown
+
+    if document.images:
+        # 正文中的 ![图片](word/media/...) 链接指向压缩包内部，替换为图片描述的编号引用
+        markdown = await _process_images_in_content_async(markdown, docx_path, "docx", api_key, use_cache=use_cache,
+                                                          link_images=True)
+    return markdown
+
+def extract_content_docx_local(docx_path: str, llm_format: str = "complex", use_cache: bool = True) -> str:
+    """Word文档本地解析（同步包装）"""
+    return run_sync(extract_content_docx_local_async(docx_path, llm_format, use_cache=use_cache))
+
+async def extract_content_large_file_async(file_path: str, file_type: str, stream_path: Optional[str] = None,
+                                           use_cache: bool = True, chunk_tokens: Optional[int] = None,
+                                           split_pdf: bool = True, delete_upload: Optional[bool] = None,
+                                           status: Optional[ExtractionStatus] = None) -> str:
     """
     大文件内容抽取函数（适用于>10MB的文件）
-    
+
+    PDF优先按页码范围切分后并行抽取；无法切分时整份上传，再将返回的文本分块处理。
+
     Args:
         file_path: 文件路径
         file_type: 文件类型 (pdf, docx, doc)
-    
+        stream_path: 流式输出文件路径，提供时各块完成后按顺序写入该文件
+        use_cache: 是否缓存每个页码范围的抽取结果，以及是否使用图片描述缓存
+        chunk_tokens: 分块处理时每块的估算token上限，默认读取配置
+        split_pdf: PDF是否先尝试按页码范围切分
+        delete_upload: 全部块成功后是否删除上传到服务器的文件，None时读取配置
+        status: 结果状态，有块或页码范围失败时标记为降级
+
     Returns:
         提取的文本内容
     """
+    file_type_name = _file_type_name(file_type)
     try:
-        file_type_name = {
-            "pdf": "PDF",
-            "docx": "Word(.docx)",
-            "doc": "Word(.doc)"
-        }.get(file_type, "未知")
-        
-        print(f"\n🚀 === 开始{file_type_name}大文件内容抽取 ===")
-        print(f"📁 输入文件: {file_path}")
-        print(f"📊 文件大小: {os.path.getsize(file_path)} bytes")
-        
+        logger.info("🚀 === 开始%s大文件内容抽取 ===", file_type_name)
+        logger.info("📁 输入文件: %s", file_path)
+
         if not os.path.exists(file_path):
-            print(f"❌ {file_type_name}文件未找到: {file_path}")
+            logger.error("❌ %s文件未找到: %s", file_type_name, file_path)
             raise FileNotFoundError(f"{file_type_name}文件未找到: {file_path}")
-        
+
+        logger.debug("📊 文件大小: %s bytes", os.path.getsize(file_path))
+
+        if file_type == "pdf" and split_pdf:
+            split_content = await extract_pdf_by_page_ranges_async(file_path, use_cache, stream_path,
+                                                                   delete_upload=delete_upload, status=status)
+            if split_content is not None:
+                return split_content
+
         # 读取API密钥
-        print("🔑 步骤1: 读取API密钥")
-        api_key = read_api_key("config/model_config.yaml")
+        logger.info("🔑 步骤1: 读取API密钥")
+        api_key = get_registry().get_api_key()
         if not api_key:
-            print("❌ API密钥未找到")
+            logger.error("❌ API密钥未找到")
             raise Exception("API密钥未找到")
-        
-        # 上传文件
-        print("📤 步骤2: 上传文件到GLM服务器")
-        file_id = upload_file(file_path, api_key)
-        if not file_id:
-            print("❌ 文件上传失败")
-            raise Exception("文件上传失败")
-        
-        # 获取文件内容
-        print("📄 步骤3: 获取文件内容")
-        file_content_url = f"https://open.bigmodel.cn/api/paas/v4/files/{file_id}/content"
-        headers = {
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        # 获取文件内容
-        max_retries = 3
-        retry_delay = 5
-        file_response = None
-        for attempt in range(max_retries):
-            try:
-                print(f"🔄 获取文件内容尝试 {attempt + 1}/{max_retries}")
-                file_response = requests.get(file_content_url, headers=headers, timeout=300)
-                if file_response.status_code == 200:
-                    break
-                else:
-                    print(f"⚠️ 获取文件内容失败，状态码: {file_response.status_code}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            except requests.exceptions.RequestException as e:
-                print(f"❌ 获取文件内容第{attempt + 1}次尝试失败: {e}")
-                if attempt < max_retries - 1:
-                    print(f"⏳ {retry_delay}秒后重试...")
-                    import time
-                    time.sleep(retry_delay)
-        
-        if file_response and file_response.status_code == 200:
-            file_data = file_response.json()
+
+        # 分块处理日志：记录远程文件ID和已完成的块，中断后重新运行时从未完成的块继续
+        document_hash = await asyncio.to_thread(file_sha256, file_path)
+        journal = ChunkJournal(document_hash)
+
+        file_data = None
+        if journal.file_id:
+            logger.info("♻️ 复用分块日志中的文件ID: %s", journal.file_id)
+            file_data = await get_file_content_async(journal.file_id, api_key)
+
+        if file_data is None:
+            # 上传文件
+            logger.info("📤 步骤2: 上传文件到GLM服务器")
+            file_id = await upload_file_async(file_path, api_key)
+            if not file_id:
+                logger.error("❌ 文件上传失败")
+                raise Exception("文件上传失败")
+            journal.set_file_id(file_id)
+
+            # 获取文件内容
+            logger.info("📄 步骤3: 获取文件内容")
+            file_data = await get_file_content_async(file_id, api_key)
+
+        if file_data is not None:
             raw_content = file_data.get("content", "")
-            print(f"📝 获取到文件内容，长度: {len(raw_content)} 字符")
-            
+            logger.info("📝 获取到文件内容，长度: %s 字符", len(raw_content))
+
             if not raw_content:
-                print("❌ 文件内容为空")
+                logger.error("❌ 文件内容为空")
                 return ""
-            
+
             # 分块处理内容
-            print("🔧 步骤4: 分块处理大文件内容")
-            return process_content_in_chunks(raw_content, file_type_name, api_key)
+            logger.info("🔧 步骤4: 分块处理大文件内容")
+            content = await process_content_in_chunks_async(raw_content, file_type_name, api_key,
+                                                            chunk_tokens=chunk_tokens, stream_path=stream_path,
+                                                            journal=journal, status=status)
+            # 扫描件和图片较多的大文件同样需要分析嵌入的图片
+            content = await _process_images_in_content_async(content, file_path, file_type, api_key,
+                                                             use_cache=use_cache)
+            # 有块失败时保留上传的文件，重新运行时由分块日志复用
+            if journal.finished:
+                await _delete_upload_after_extraction_async(journal.file_id, api_key, delete_upload)
+            return content
         else:
-            print(f"❌ 获取文件内容失败: {file_response.text if file_response else '无响应'}")
             return ""
-            
+
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"❌ {file_type_name}大文件内容抽取步骤失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ %s大文件内容抽取步骤失败: %s", file_type_name, e)
         return ""
 
-def process_content_in_chunks(content: str, file_type_name: str, api_key: str) -> str:
+def extract_content_large_file(file_path: str, file_type: str, stream_path: Optional[str] = None,
+                               use_cache: bool = True, chunk_tokens: Optional[int] = None,
+                               split_pdf: bool = True, delete_upload: Optional[bool] = None) -> str:
+    """大文件内容抽取函数（同步包装）"""
+    return run_sync(extract_content_large_file_async(file_path, file_type, stream_path, use_cache, chunk_tokens,
+                                                     split_pdf, delete_upload))
+
+async def extract_pdf_by_page_ranges_async(pdf_path: str, use_cache: bool = True,
+                                           stream_path: Optional[str] = None,
+                                           pages_per_range: Optional[int] = None,
+                                           max_tokens: Optional[int] = None,
+                                           delete_upload: Optional[bool] = None,
+                                           status: Optional[ExtractionStatus] = None) -> Optional[str]:
     """
-    将大文件内容分块处理
-    
+    将大PDF按页码范围切分为小文件，并行上传和抽取后按页码顺序合并
+
+    每个页码范围的结果单独缓存，某个范围失败或降级后重新运行只需重试该范围。
+
+    Args:
+        pdf_path: PDF文件路径
+        use_cache: 是否使用页码范围的抽取结果缓存和图片描述缓存
+        stream_path: 流式输出文件路径，提供时各范围完成后按页码顺序写入该文件
+        pages_per_range: 每个范围的页数，默认按配置的目标大小计算
+        max_tokens: 每个范围输出token上限的下限，各范围再按其自身文本的估算token数调高；默认只按各范围的文本或大小选择
+        delete_upload: 每个范围抽取成功后是否删除其上传文件，None时读取配置
+        status: 结果状态，有范围降级时标记为降级
+
+    Returns:
+        合并后的内容；有范围失败时返回空字符串；不切分（未启用、未安装pypdf或无法读取）时返回None
+    """
+    split_config = get_registry().get_section("pdf_split")
+    if not split_config.get("enabled", True):
+        return None
+    if not HAS_PYPDF:
+        logger.warning("⚠️ 未安装pypdf库，大PDF整份上传")
+        return None
+
+    file_size = os.path.getsize(pdf_path)
+    try:
+        page_count = await asyncio.to_thread(count_pages, pdf_path)
+    except PdfSplitError as e:
+        logger.warning("⚠️ %s，大PDF整份上传", e)
+        return None
+    target_bytes = int(float(split_config.get("target_range_mb", 5)) * 1024 * 1024)
+    if pages_per_range:
+        # 规划器已给出页数时只按页数切分
+        ranges = plan_page_ranges(page_count, file_size, file_size, pages_per_range)
+    else:
+        ranges = plan_page_ranges(page_count, file_size, target_bytes,
+                                  split_config.get("max_pages_per_range", DEFAULT_MAX_PAGES_PER_RANGE))
+    if len(ranges) <= 1:
+        return None
+    logger.info("✂️ PDF共 %s 页，切分为 %s 个页码范围并行抽取", page_count, len(ranges))
+
+    # 每个范围的缓存键由源文件哈希和页码范围决定
+    results = {}
+    cache_keys = {}
+    if use_cache:
+        file_hash = await asyncio.to_thread(file_sha256, pdf_path)
+        prompt_hash = text_sha256(get_registry().get_prompt("document_extraction_prompt"))
+        for page_range in ranges:
+            cache_keys[page_range.index] = ExtractionCache.make_key(
+                f"{file_hash}:{page_range.label}", prompt_hash, EXTRACTION_MODEL, max_tokens or 0)
+            cached_content = extraction_cache.get(cache_keys[page_range.index])
+            if cached_content:
+                results[page_range.index] = cached_content
+        if results:
+            logger.info("⚡ %s/%s 个页码范围命中缓存", len(results), len(ranges))
+
+    stream_writer = IncrementalMarkdownWriter(stream_path) if stream_path else None
+    ordered_writer = OrderedChunkWriter(stream_writer, "\n\n") if stream_writer else None
+    semaphore = asyncio.Semaphore(max(1, split_config.get("concurrency", DEFAULT_CHUNK_CONCURRENCY)))
+
+    def section(page_range: PageRange, content: str) -> str:
+        return f"<!-- 第 {page_range.start_page}-{page_range.end_page} 页 -->\n\n{content}"
+
+    async def handle_range(page_range: PageRange, range_path: str) -> None:
+        range_status = ExtractionStatus()
+        async with semaphore:
+            logger.debug("🔄 抽取第 %s-%s 页", page_range.start_page, page_range.end_page)
+            content = await extract_content_normal_file_async(range_path, "pdf", max_tokens=max_tokens,
+                                                              delete_upload=delete_upload, use_cache=use_cache,
+                                                              status=range_status)
+        if not content:
+            logger.error("❌ 第 %s-%s 页抽取失败", page_range.start_page, page_range.end_page)
+            return
+        results[page_range.index] = content
+        if range_status.degraded:
+            # 降级的范围（如模型失败后的原始文本）不缓存，重新运行时重试
+            for reason in range_status.reasons:
+                _mark_degraded(status, f"第 {page_range.start_page}-{page_range.end_page} 页{reason}")
+        elif page_range.index in cache_keys:
+            try:
+                extraction_cache.put(cache_keys[page_range.index], content)
+            except OSError as e:
+                logger.warning("⚠️ 写入抽取结果缓存失败: %s", e)
+        if ordered_writer:
+            ordered_writer.complete(page_range.index, section(page_range, content))
+
+    try:
+        if ordered_writer:
+            for index in sorted(results):
+                ordered_writer.complete(index, section(ranges[index], results[index]))
+        missing = [page_range for page_range in ranges if page_range.index not in results]
+        if missing:
+            with tempfile.TemporaryDirectory(prefix="pdf_ranges_") as tmp_dir:
+                written = await asyncio.to_thread(write_page_ranges, pdf_path, missing, tmp_dir)
+                await asyncio.gather(*(handle_range(page_range, range_path) for page_range, range_path in written))
+    except PdfSplitError as e:
+        logger.warning("⚠️ %s，大PDF整份上传", e)
+        return None
+    finally:
+        if stream_writer:
+            # 所有范围都成功时才替换输出文件，否则保留原有文件
+            stream_writer.close(commit=all(page_range.index in results for page_range in ranges))
+
+    failed = [page_range.label for page_range in ranges if page_range.index not in results]
+    if failed:
+        logger.error("❌ %s 个页码范围抽取失败: %s（已成功的范围已缓存，重新运行只重试失败的范围）", len(failed), ', '.join(failed))
+        return ""
+    return "\n\n".join(section(page_range, results[page_range.index]) for page_range in ranges)
+
+async def process_content_in_chunks_async(content: str, file_type_name: str, api_key: str,
+                                         max_concurrency: Optional[int] = None,
+                                         chunk_tokens: Optional[int] = None,
+                                         overlap_tokens: Optional[int] = None,
+                                         stream_path: Optional[str] = None,
+                                         journal: Optional[ChunkJournal] = None,
+                                         status: Optional[ExtractionStatus] = None) -> str:
+    """
+    将大文件内容按标题、段落和表格边界分块并发处理
+
     Args:
         content: 原始文件内容
         file_type_name: 文件类型名称
         api_key: API密钥
-    
+        max_concurrency: 同时处理的块数量上限，默认读取配置中的 chunking.concurrency
+        chunk_tokens: 每块的估算token上限，默认读取配置中的 chunking.chunk_tokens
+        overlap_tokens: 相邻块重叠的上下文token上限，默认读取配置中的 chunking.overlap_tokens
+        stream_path: 流式输出文件路径，提供时各块以流式调用处理，并按原始顺序尽早写入该文件
+        journal: 分块处理日志，提供时跳过日志中已完成的块，并在每块成功后立即记录
+        status: 结果状态，有块失败（使用原始内容）时标记为降级
+
     Returns:
-        处理后的完整内容
+        处理后的完整内容（各块按原始顺序拼接）
     """
+    stream_writer = IncrementalMarkdownWriter(stream_path) if stream_path else None
     try:
-        # 根据内容长度决定分块大小
         content_length = len(content)
-        print(f"📊 原始内容长度: {content_length} 字符")
-        
-        # 设置分块大小（字符数）
-        if content_length > 50000:  # 超过5万字符
-            chunk_size = 15000  # 每块1.5万字符
-        elif content_length > 20000:  # 超过2万字符
-            chunk_size = 10000  # 每块1万字符
-        else:
-            chunk_size = 8000   # 每块8000字符
-            
-        print(f"🔧 设置分块大小: {chunk_size} 字符")
-        
-        # 计算需要分多少块
-        num_chunks = (content_length + chunk_size - 1) // chunk_size
-        print(f"📦 将分 {num_chunks} 块处理")
-        
-        processed_chunks = []
-        
-        # 逐块处理
-        for i in range(num_chunks):
-            start_idx = i * chunk_size
-            end_idx = min((i + 1) * chunk_size, content_length)
-            chunk_content = content[start_idx:end_idx]
-            
-            print(f"🔄 处理第 {i + 1}/{num_chunks} 块 (字符 {start_idx}-{end_idx})")
-            
-            # 处理单个块
-            processed_chunk = process_single_chunk(chunk_content, file_type_name, api_key)
-            if processed_chunk:
-                processed_chunks.append(processed_chunk)
-                print(f"✅ 第 {i + 1} 块处理完成，长度: {len(processed_chunk)} 字符")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📊 原始内容长度: %s 字符，估算 %s tokens", content_length, estimate_tokens(content))
+
+        chunking_config = get_registry().get_section("chunking")
+        if chunk_tokens is None:
+            chunk_tokens = chunking_config.get("chunk_tokens", DEFAULT_CHUNK_TOKENS)
+        if overlap_tokens is None:
+            overlap_tokens = chunking_config.get("overlap_tokens", 0)
+        if max_concurrency is None:
+            max_concurrency = chunking_config.get("concurrency", DEFAULT_CHUNK_CONCURRENCY)
+        logger.debug("🔧 设置分块大小: %s tokens，重叠: %s tokens", chunk_tokens, overlap_tokens)
+
+        chunks = split_into_chunks(content, chunk_tokens, overlap_tokens)
+        num_chunks = len(chunks)
+        logger.info("📦 将分 %s 块处理，并发数: %s", num_chunks, max_concurrency)
+
+        if journal:
+            # 原始内容、分块参数、提示词模板或模型变化后，旧日志中的块不再对应，需要全部重新处理
+            prompt_hash = text_sha256(get_registry().get_prompt("document_extraction_prompt"))
+            fingerprint = text_sha256(f"{text_sha256(content)}|{chunk_tokens}|{overlap_tokens}|{num_chunks}"
+                                      f"|{prompt_hash}|{EXTRACTION_MODEL}")
+            resumed = journal.begin(fingerprint, num_chunks)
+            if resumed:
+                logger.info("♻️ 从分块日志恢复 %s/%s 块，仅处理剩余部分", resumed, num_chunks)
+        failed_chunks = []
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        ordered_writer = OrderedChunkWriter(stream_writer) if stream_writer else None
+
+        async def handle_chunk(chunk: Chunk) -> str:
+            i = chunk.index
+            journaled = journal.get(i) if journal else None
+            if journaled is not None:
+                if ordered_writer:
+                    ordered_writer.complete(i, journaled)
+                return journaled
+
+            async with semaphore:
+                logger.debug("🔄 处理第 %s/%s 块 (约 %s tokens)", i + 1, num_chunks, chunk.tokens)
+                try:
+                    processed_chunk = await process_single_chunk_async(chunk.text, file_type_name, api_key, chunk.context,
+                                                                       stream=stream_writer is not None)
+                except DeadlineExceeded:
+                    raise
+                except Exception as e:
+                    logger.error("❌ 第 %s 块处理异常: %s", i + 1, e)
+                    processed_chunk = ""
+
+            # process_single_chunk_async 失败时原样返回块内容，此时不能记入日志
+            if processed_chunk and processed_chunk != chunk.text:
+                logger.debug("✅ 第 %s 块处理完成，长度: %s 字符", i + 1, len(processed_chunk))
+                if journal:
+                    journal.complete(i, processed_chunk)
             else:
-                print(f"⚠️ 第 {i + 1} 块处理失败，使用原始内容")
-                processed_chunks.append(chunk_content)
-        
+                logger.warning("⚠️ 第 %s 块处理失败，使用原始内容", i + 1)
+                processed_chunk = chunk.text
+                failed_chunks.append(i)
+            if ordered_writer:
+                ordered_writer.complete(i, processed_chunk)
+            return processed_chunk
+
+        # gather按传入顺序返回结果，保证各块按原始顺序拼接
+        processed_chunks = await asyncio.gather(*(handle_chunk(chunk) for chunk in chunks))
+
+        if failed_chunks:
+            _mark_degraded(status, f"{len(failed_chunks)}/{num_chunks} 块处理失败，使用原始内容")
+        if journal:
+            if failed_chunks:
+                # 保留日志，下次运行只重试失败的块
+                logger.warning("⚠️ %s 块处理失败，已保留分块日志: %s", len(failed_chunks), journal.journal_path)
+            else:
+                journal.finish()
+
         # 合并所有处理后的块
         if len(processed_chunks) == 1:
             final_content = processed_chunks[0]
@@ -663,53 +988,69 @@ def process_content_in_chunks(content: str, file_type_name: str, api_key: str) -
 
 # 文档结束
 """
-        
-        print(f"🎉 大文件处理完成，最终内容长度: {len(final_content)} 字符")
+
+        logger.info("🎉 大文件处理完成，最终内容长度: %s 字符", len(final_content))
+        if stream_writer:
+            stream_writer.close(commit=True)
         return final_content
-        
+
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"❌ 分块处理失败: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ 分块处理失败: %s", e)
+        _mark_degraded(status, "分块处理失败，使用原始内容")
         return content  # 返回原始内容作为回退
+    finally:
+        if stream_writer:
+            stream_writer.close()
+
+def process_content_in_chunks(content: str, file_type_name: str, api_key: str,
+                              max_concurrency: Optional[int] = None,
+                              chunk_tokens: Optional[int] = None,
+                              overlap_tokens: Optional[int] = None) -> str:
+    """将大文件内容分块并发处理（同步包装）"""
+    return run_sync(process_content_in_chunks_async(content, file_type_name, api_key, max_concurrency,
+                                                    chunk_tokens, overlap_tokens))
 
-def process_single_chunk(chunk_content: str, file_type_name: str, api_key: str) -> str:
+async def process_single_chunk_async(chunk_content: str, file_type_name: str, api_key: str, context: str = "",
+                                     stream: bool = False, hedge: Optional[bool] = None) -> str:
     """
     处理单个内容块
-    
+
     Args:
         chunk_content: 单个块的内容
         file_type_name: 文件类型名称
         api_key: API密钥
-    
+        context: 与上一块重叠的上下文，只用于保持连贯，不要求模型输出
+        stream: 是否使用流式调用（超时按空闲时间计算）
+        hedge: 是否对冲：耗时超过近期块请求的P95时再发一个相同的请求，取先完成的结果；
+            None时读取配置 hedging.enabled
+
     Returns:
         处理后的块内容
     """
     try:
-        # 读取YAML提示词
-        prompts_path = "prompts/document_extraction_prompts.yaml"
-        prompts = read_extraction_prompts(prompts_path)
-        
-        url = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
+        prompt_input = chunk_content
+        if context:
+            prompt_input = f"【上文参考（仅用于保持内容连贯，请勿重复输出）】\n{context}\n\n【待提取内容】\n{chunk_content}"
+
+        # 读取YAML提示词（由配置注册表缓存，仅在文件修改后重新解析）
+        prompts = get_registry().get_prompts()
+
         # 使用统一的文档提取提示词
         prompt_key = "document_extraction_prompt"
         if prompt_key in prompts:
             prompt_template = prompts[prompt_key]
             # 将块内容包含在提示词中
             content = prompt_template.format(
-                file_content=chunk_content
+                file_content=prompt_input
             )
         else:
             # 如果YAML文件中没有找到对应的提示词，使用默认提示词
             content = f"""请提取以下文档片段的内容：
 
 **文档片段：**
-{chunk_content}
+{prompt_input}
 
 **文件类型：** {file_type_name}
 
@@ -720,12 +1061,13 @@ def process_single_chunk(chunk_content: str, file_type_name: str, api_key: str)
 4. 如果这是大文档的一部分，请确保内容连贯性
 
 请开始处理。"""
-        
-        # 设置块处理的token限制
-        max_tokens = min(6000, len(chunk_content) // 2)  # 根据块大小动态调整
-        
+
+        # 按块内容的估算token数设置输出上限
+        input_tokens = estimate_tokens(chunk_content)
+        max_tokens = output_token_budget(input_tokens, upper=CHUNK_MAX_TOKENS)
+
         payload = {
-            "model": "glm-4.5v",
+            "model": EXTRACTION_MODEL,
             "messages": [
                 {
                     "role": "user",
@@ -735,46 +1077,40 @@ def process_single_chunk(chunk_content: str, file_type_name: str, api_key: str)
             "max_tokens": max_tokens,
             "temperature": 0.3
         }
-        
-        print(f"📊 块内容长度: {len(chunk_content)} 字符，设置max_tokens: {max_tokens}")
-        
-        # 发送请求处理块内容
-        max_retries = 2
-        retry_delay = 5
-        chunk_response = None
-        for attempt in range(max_retries):
-            try:
-                print(f"🔄 块处理API尝试 {attempt + 1}/{max_retries}")
-                chunk_response = requests.post(url, headers=headers, json=payload, timeout=120)
-                if chunk_response.status_code == 200:
-                    break
-                else:
-                    print(f"⚠️ 块处理API失败，状态码: {chunk_response.status_code}")
-                    if attempt < max_retries - 1:
-                        print(f"⏳ {retry_delay}秒后重试...")
-                        import time
-                        time.sleep(retry_delay)
-            except requests.exceptions.RequestException as e:
-                print(f"❌ 块处理API第{attempt + 1}次尝试失败: {e}")
-                if attempt < max_retries - 1:
-                    print(f"⏳ {retry_delay}秒后重试...")
-                    import time
-                    time.sleep(retry_delay)
-        
-        if chunk_response and chunk_response.status_code == 200:
-            chunk_data = chunk_response.json()
-            processed_chunk = chunk_data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
+
+        logger.debug("📊 块内容长度: %s 字符，估算 %s tokens，设置max_tokens: %s", len(chunk_content), input_tokens,
+                     max_tokens)
+
+        # 发送请求处理块内容，输出被截断时自动续写
+        def request_chunk():
+            # 块结果在完成后才写入输出文件，请求本身没有副作用，可以安全地重复发送
+            return _chat_with_continuation_async(payload, api_key, label="块处理API", call_type=CALL_CHUNK,
+                                                 stream=stream)
+
+        if hedging_enabled() if hedge is None else hedge:
+            chunk_data = await get_hedger(CALL_CHUNK).run(request_chunk, "块处理API")
+        else:
+            chunk_data = await request_chunk()
+
+        if chunk_data is not None:
+            processed_chunk = extract_message_content(chunk_data)
+
             if processed_chunk:
-                print(f"✅ 块内容处理成功，长度: {len(processed_chunk)} 字符")
+                logger.debug("✅ 块内容处理成功，长度: %s 字符", len(processed_chunk))
                 return processed_chunk
             else:
-                print("❌ 块内容处理结果为空")
+                logger.error("❌ 块内容处理结果为空")
                 return chunk_content  # 返回原始内容
         else:
-            print(f"❌ 块内容处理失败: {chunk_response.text if chunk_response else '无响应'}")
             return chunk_content  # 返回原始内容
-            
+
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f"❌ 单块处理失败: {e}")
-        return chunk_content  # 返回原始内容作为回退
\ No newline at end of file
+        logger.error("❌ 单块处理失败: %s", e)
+        return chunk_content  # 返回原始内容作为回退
+
+def process_single_chunk(chunk_content: str, file_type_name: str, api_key: str, context: str = "",
+                         stream: bool = False, hedge: Optional[bool] = None) -> str:
+    """处理单个内容块（同步包装）"""
+    return run_sync(process_single_chunk_async(chunk_content, file_type_name, api_key, context, stream, hedge))
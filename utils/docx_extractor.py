@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Word本地解析器 - 直接读取 .docx 中的 word/document.xml，生成带标题层级、列表和表格的Markdown，无需任何网络请求
+"""
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+M_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+W = f"{{{W_NS}}}"
+M = f"{{{M_NS}}}"
+
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+
+# 样式名称中的标题层级，例如 "heading 1"、"标题 2"
+_HEADING_NAME_RE = re.compile(r'^(?:heading|标题)\s*(\d)$', re.IGNORECASE)
+_HEADING_ID_RE = re.compile(r'^(?:heading|标题)(\d)$', re.IGNORECASE)
+
+# 复杂内容的原因说明
+COMPLEX_MERGED_CELLS = "合并单元格"
+COMPLEX_NESTED_TABLE = "嵌套表格"
+COMPLEX_EQUATION = "公式"
+COMPLEX_TEXTBOX = "文本框"
+
+
+class DocxExtractionError(ValueError):
+    """文件不是有效的 .docx 文档"""
+
+
+@dataclass
+class DocxSection:
+    """以标题开头的一段内容（第一个标题之前的内容单独成段）"""
+    markdown: str
+    complex_reasons: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DocxContent:
+    """本地解析结果"""
+    sections: List[DocxSection]
+    images: List[str] = field(default_factory=list)  # 文档中引用的图片在压缩包内的路径，按出现顺序
+
+    @property
+    def markdown(self) -> str:
+        return "\n\n".join(section.markdown for section in self.sections if section.markdown)
+
+    @property
+    def complex_reasons(self) -> List[str]:
+        reasons: List[str] = []
+        for section in self.sections:
+            reasons.extend(reason for reason in section.complex_reasons if reason not in reasons)
+        return reasons
+
+
+def is_docx(file_path: str) -> bool:
+    """判断文件是否为可本地解析的 .docx（旧版 .doc 是二进制格式，不能本地解析）"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            return DOCUMENT_PART in archive.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def _attr(element: Optional[ET.Element], name: str) -> Optional[str]:
+    return None if element is None else element.get(f"{W}{name}")
+
+
+def _is_on(element: Optional[ET.Element]) -> bool:
+    """开关属性（如 w:b）存在且未被显式关闭"""
+    return element is not None and _attr(element, "val") not in ("0", "false", "off")
+
+
+def _read_heading_styles(archive: zipfile.ZipFile) -> Dict[str, int]:
+    """从 styles.xml 读取样式ID到标题层级的映射（包括继承自标题样式的自定义样式）"""
+    try:
+        root = ET.fromstring(archive.read(STYLES_PART))
+    except (KeyError, ET.ParseError):
+        return {}
+
+    direct: Dict[str, int] = {}
+    based_on: Dict[str, str] = {}
+    for style in root.iter(f"{W}style"):
+        if _attr(style, "type") != "paragraph":
+            continue
+        style_id = _attr(style, "styleId") or ""
+        name = (_attr(style.find(f"{W}name"), "val") or "").strip()
+        outline = _attr(style.find(f"{W}pPr/{W}outlineLvl"), "val")
+        match = _HEADING_NAME_RE.match(name)
+        if name.lower() == "title":
+            direct[style_id] = 1
+        elif match:
+            direct[style_id] = int(match.group(1))
+        elif outline is not None and outline.isdigit() and int(outline) < 9:
+            direct[style_id] = int(outline) + 1
+        parent = _attr(style.find(f"{W}basedOn"), "val")
+        if parent:
+            based_on[style_id] = parent
+
+    levels = dict(direct)
+    for style_id in based_on:
+        current, seen = style_id, set()
+        while current not in direct and current in based_on and current not in seen:
+            seen.add(current)
+            current = based_on[current]
+        if current in direct:
+            levels.setdefault(style_id, direct[current])
+    return levels
+
+
+def _read_relationships(archive: zipfile.ZipFile) -> Dict[str, str]:
+    """读取 document.xml 的关系ID到压缩包内路径的映射"""
+    try:
+        root = ET.fromstring(archive.read(DOCUMENT_RELS_PART))
+    except (KeyError, ET.ParseError):
+        return {}
+    relationships = {}
+    for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target") or ""
+        if rel.get("TargetMode") == "External":
+            continue
+        relationships[rel.get("Id")] = posixpath.normpath(posixpath.join("word", target.lstrip("/")))
+    return relationships
+
+
+def _escape_cell(text: str) -> str:
+    return text.replace("|", "\\|").replace("\n", "<br>")
+
+
+class _DocxParser:
+    """document.xml 解析器"""
+
+    def __init__(self, heading_styles: Dict[str, int], relationships: Dict[str, str]):
+        self.heading_styles = heading_styles
+        self.relationships = relationships
+        self.images: List[str] = []
+        self.sections: List[DocxSection] = [DocxSection("")]
+        self._blocks: List[str] = []
+
+    # ---- 段落 ----
+
+    def _run_text(self, run: ET.Element, reasons: List[str]) -> str:
+        parts = []
+        for child in run:
+            if child.tag == f"{W}t":
+                parts.append(child.text or "")
+            elif child.tag == f"{W}tab":
+                parts.append("\t")
+            elif child.tag in (f"{W}br", f"{W}cr"):
+                parts.append("\n")
+            elif child.tag in (f"{W}drawing", f"{W}pict"):
+                for element in child.iter():
+                    if element.tag.endswith("}txbxContent"):
+                        reasons.append(COMPLEX_TEXTBOX)
+                        parts.append(" ".join(self._paragraph_text(p, reasons) for p in element.iter(f"{W}p")))
+                        break
+                    embed = element.get(f"{{{R_NS}}}embed") or element.get(f"{{{R_NS}}}id")
+                    if embed and embed in self.relationships:
+                        media_path = self.relationships[embed]
+                        self.images.append(media_path)
+                        parts.append(f"![图片]({media_path})")
+                        break
+        return "".join(parts)
+
+    def _paragraph_text(self, paragraph: ET.Element, reasons: List[str], formatted: bool = False) -> str:
+        """拼接段落中的文本，formatted为True时保留加粗和斜体"""
+        pieces: List[List] = []  # [文本, 加粗, 斜体]
+
+        def walk(element: ET.Element) -> None:
+            for child in element:
+                if child.tag == f"{W}r":
+                    rpr = child.find(f"{W}rPr")
+                    bold = formatted and _is_on(None if rpr is None else rpr.find(f"{W}b"))
+                    italic = formatted and _is_on(None if rpr is None else rpr.find(f"{W}i"))
+                    text = self._run_text(child, reasons)
+                    if not text:
+                        continue
+                    if pieces and pieces[-1][1] == bold and pieces[-1][2] == italic:
+                        pieces[-1][0] += text
+                    else:
+                        pieces.append([text, bold, italic])
+                elif child.tag in (f"{M}oMath", f"{M}oMathPara"):
+                    reasons.append(COMPLEX_EQUATION)
+                    math_text = "".join(t.text or "" for t in child.iter(f"{M}t"))
+                    pieces.append([f"${math_text}$", False, False])
+                elif child.tag in (f"{W}hyperlink", f"{W}ins", f"{W}smartTag", f"{W}sdt",
+                                   f"{W}sdtContent", f"{W}fldSimple"):
+                    walk(child)
+
+        walk(paragraph)
+        output = []
+        for text, bold, italic in pieces:
+            stripped = text.strip()
+            if (bold or italic) and stripped:
+                marker = "***" if bold and italic else ("**" if bold else "*")
+                leading = text[:len(text) - len(text.lstrip())]
+                trailing = text[len(text.rstrip()):]
+                text = f"{leading}{marker}{stripped}{marker}{trailing}"
+            output.append(text)
+        return "".join(output)
+
+    def _heading_level(self, paragraph: ET.Element) -> int:
+        ppr = paragraph.find(f"{W}pPr")
+        if ppr is None:
+            return 0
+        outline = _attr(ppr.find(f"{W}outlineLvl"), "val")
+        if outline is not None and outline.isdigit() and int(outline) < 9:
+            return int(outline) + 1
+        style_id = _attr(ppr.find(f"{W}pStyle"), "val") or ""
+        if style_id in self.heading_styles:
+            return self.heading_styles[style_id]
+        match = _HEADING_ID_RE.match(style_id)
+        return int(match.group(1)) if match else 0
+
+    def _add_paragraph(self, paragraph: ET.Element) -> None:
+        reasons: List[str] = []
+        level = self._heading_level(paragraph)
+        if level:
+            text = " ".join(self._paragraph_text(paragraph, reasons).split())
+            if text:
+                self._start_section()
+                self._blocks.append(f"{'#' * min(level, 6)} {text}")
+                self.sections[-1].complex_reasons.extend(reasons)
+            return
+
+        text = self._paragraph_text(paragraph, reasons, formatted=True).strip()
+        if not text:
+            return
+        num_pr = paragraph.find(f"{W}pPr/{W}numPr")
+        if num_pr is not None:
+            indent_level = _attr(num_pr.find(f"{W}ilvl"), "val") or "0"
+            indent = "  " * int(indent_level) if indent_level.isdigit() else ""
+            text = f"{indent}- {text}"
+        self._blocks.append(text)
+        self._add_reasons(reasons)
+
+    # ---- 表格 ----
+
+    def _cell_text(self, cell: ET.Element, reasons: List[str]) -> str:
+        lines = []
+        for child in cell:
+            if child.tag == f"{W}p":
+                text = self._paragraph_text(child, reasons, formatted=True).strip()
+                if text:
+                    lines.append(text)
+            elif child.tag == f"{W}tbl":
+                reasons.append(COMPLEX_NESTED_TABLE)
+                lines.extend(self._paragraph_text(p, reasons).strip() for p in child.iter(f"{W}p"))
+        return _escape_cell("\n".join(line for line in lines if line))
+
+    def _add_table(self, table: ET.Element) -> None:
+        reasons: List[str] = []
+        rows: List[List[str]] = []
+        for row in table.findall(f"{W}tr"):
+            cells: List[str] = []
+            for cell in row.findall(f"{W}tc"):
+                tc_pr = cell.find(f"{W}tcPr")
+                span = _attr(None if tc_pr is None else tc_pr.find(f"{W}gridSpan"), "val")
+                span_count = int(span) if span and span.isdigit() else 1
+                v_merge = None if tc_pr is None else tc_pr.find(f"{W}vMerge")
+                if span_count > 1 or v_merge is not None:
+                    reasons.append(COMPLEX_MERGED_CELLS)
+                # 纵向合并的后续单元格留空；横向合并的单元格补齐空列，保持列数一致
+                text = "" if v_merge is not None and _attr(v_merge, "val") != "restart" else self._cell_text(cell, reasons)
+                cells.append(text)
+                cells.extend([""] * (span_count - 1))
+            rows.append(cells)
+        if not rows:
+            return
+
+        width = max(len(row) for row in rows)
+        lines = []
+        for index, row in enumerate(rows):
+            row = row + [""] * (width - len(row))
+            lines.append("| " + " | ".join(row) + " |")
+            if index == 0:
+                lines.append("|" + "|".join([" --- "] * width) + "|")
+        self._blocks.append("\n".join(lines))
+        self._add_reasons(reasons)
+
+    # ---- 段落分组 ----
+
+    def _add_reasons(self, reasons: List[str]) -> None:
+        section_reasons = self.sections[-1].complex_reasons
+        section_reasons.extend(reason for reason in reasons if reason not in section_reasons)
+
+    def _start_section(self) -> None:
+        self._flush_section()
+        self.sections.append(DocxSection(""))
+
+    def _flush_section(self) -> None:
+        self.sections[-1].markdown = "\n\n".join(self._blocks)
+        self._blocks = []
+
+    def parse(self, body: ET.Element) -> DocxContent:
+        def walk(element: ET.Element) -> None:
+            for child in element:
+                if child.tag == f"{W}p":
+                    self._add_paragraph(child)
+                elif child.tag == f"{W}tbl":
+                    self._add_table(child)
+                elif child.tag in (f"{W}sdt", f"{W}sdtContent", f"{W}customXml"):
+                    walk(child)
+
+        walk(body)
+        self._flush_section()
+        sections = [section for section in self.sections if section.markdown]
+        return DocxContent(sections=sections, images=self.images)
+
+
+def extract_docx(file_path: str) -> DocxContent:
+    """
+    本地解析 .docx 文档
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        解析结果，包含按标题划分的Markdown段落、需要模型整理的复杂内容原因和图片路径
+
+    Raises:
+        DocxExtractionError: 文件不是有效的 .docx 文档
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            document = ET.fromstring(archive.read(DOCUMENT_PART))
+            heading_styles = _read_heading_styles(archive)
+            relationships = _read_relationships(archive)
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError) as e:
+        raise DocxExtractionError(f"无法本地解析Word文档 {file_path}: {e}")
+
+    body = document.find(f"{W}body")
+    if body is None:
+        raise DocxExtractionError(f"Word文档缺少正文: {file_path}")
+    return _DocxParser(heading_styles, relationships).parse(body)
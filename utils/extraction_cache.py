@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取结果缓存 - 以文件内容哈希为键的本地磁盘缓存
+"""
+import os
+import time
+import hashlib
+from typing import List, Optional, Tuple
+
+# 所有本地缓存（抽取结果、上传登记表、分块日志等）的根目录，默认位于项目根目录下的 .cache，
+# 可通过环境变量 DOC_EXTRACTION_CACHE_DIR 指定其他目录
+CACHE_DIR_ENV = "DOC_EXTRACTION_CACHE_DIR"
+DEFAULT_CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 缓存总大小上限 512MB
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600  # 缓存条目最长保留 30 天
+
+# 设置该环境变量为 1/true/yes 时跳过缓存
+NO_CACHE_ENV = "DOC_EXTRACTION_NO_CACHE"
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """分块计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    """计算文本的SHA-256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_root() -> str:
+    """本地缓存根目录（每次调用时读取环境变量，导入模块后再设置 DOC_EXTRACTION_CACHE_DIR 同样生效）"""
+    return os.getenv(CACHE_DIR_ENV) or DEFAULT_CACHE_ROOT
+
+
+def cache_path(*parts: str) -> str:
+    """缓存根目录下的路径"""
+    return os.path.join(cache_root(), *parts)
+
+
+def cache_disabled_by_env() -> bool:
+    """检查是否通过环境变量关闭了缓存"""
+    return os.getenv(NO_CACHE_ENV, "").strip().lower() in ("1", "true", "yes")
+
+
+class ExtractionCache:
+    """抽取结果缓存类，每个条目是缓存目录下的一个Markdown文件"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, subdir: str = "extractions"):
+        """
+        初始化抽取结果缓存
+
+        Args:
+            cache_dir: 缓存目录，None时使用缓存根目录下的 subdir（每次访问时解析）
+            max_bytes: 缓存总大小上限，超出时按最近访问时间淘汰
+            max_age_seconds: 条目最长保留时间，超时的条目视为失效
+            subdir: 未指定cache_dir时使用的子目录名
+        """
+        self._cache_dir = cache_dir
+        self.subdir = subdir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    @property
+    def cache_dir(self) -> str:
+        """缓存目录"""
+        return self._cache_dir or cache_path(self.subdir)
+
+    @staticmethod
+    def make_key(file_hash: str, prompt_hash: str, model: str, max_tokens: int) -> str:
+        """由文件内容哈希、提示词模板哈希、模型名和max_tokens生成缓存键"""
+        raw_key = "|".join([file_hash, prompt_hash, model, str(max_tokens)])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.md")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存条目
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的Markdown内容，未命中或已过期返回None
+        """
+        entry_path = self._entry_path(key)
+        try:
+            mtime = os.path.getmtime(entry_path)
+        except OSError:
+            return None
+
+        if time.time() - mtime > self.max_age_seconds:
+            self._remove(entry_path)
+            return None
+
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        # 以修改时间记录最近访问时间，供按大小淘汰时使用
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """
+        写入缓存条目，写入后执行淘汰
+
+        Args:
+            key: 缓存键
+            content: Markdown内容
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, entry_path)
+        self.evict()
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        """列出所有缓存条目 (路径, 修改时间, 大小)"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".md"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def evict(self) -> int:
+        """
+        淘汰过期条目，并在总大小超限时按最近访问时间从旧到新删除
+
+        Returns:
+            删除的条目数量
+        """
+        now = time.time()
+        removed = 0
+        live_entries = []
+        for path, mtime, size in self._entries():
+            if now - mtime > self.max_age_seconds:
+                removed += self._remove(path)
+            else:
+                live_entries.append((path, mtime, size))
+
+        total_bytes = sum(size for _, _, size in live_entries)
+        for path, _, size in sorted(live_entries, key=lambda entry: entry[1]):
+            if total_bytes <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total_bytes -= size
+        return removed
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数量"""
+        return sum(self._remove(path) for path, _, _ in self._entries())
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
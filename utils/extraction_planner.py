@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取策略规划器 - 根据页数、文本密度、图片数量、Word部件大小等本地信号选择抽取方式、分块大小和token预算
+"""
+import os
+import logging
+import json
+import math
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+try:
+    from .chunker import DEFAULT_CHUNK_TOKENS, estimate_tokens
+    from .docx_extractor import DOCUMENT_PART
+    from .extraction_cache import cache_root
+    from .pdf_splitter import HAS_PYPDF, DEFAULT_MAX_PAGES_PER_RANGE
+except ImportError:
+    from utils.chunker import DEFAULT_CHUNK_TOKENS, estimate_tokens
+    from utils.docx_extractor import DOCUMENT_PART
+    from utils.extraction_cache import cache_root
+    from utils.pdf_splitter import HAS_PYPDF, DEFAULT_MAX_PAGES_PER_RANGE
+
+logger = logging.getLogger(__name__)
+
+if HAS_PYPDF:
+    from pypdf import PdfReader
+
+# 抽取方式
+STRATEGY_LOCAL_DOCX = "local_docx"  # Word本地解析
+STRATEGY_NORMAL = "normal"  # 整份上传，一次模型调用
+STRATEGY_SPLIT_PDF = "split_pdf"  # PDF按页码范围切分后并行抽取
+STRATEGY_LARGE_CHUNKED = "large_chunked"  # 整份上传，返回的文本分块处理
+
+LARGE_FILE_BYTES = 10 * 1024 * 1024  # 超过该大小的文件不整份交给一次模型调用
+MIN_MAX_TOKENS = 4000
+MAX_MAX_TOKENS = 16000  # 单次调用的输出token上限
+CHUNK_MAX_TOKENS = 6000  # 分块处理时每块的输出token上限
+OUTPUT_MARGIN = 1.3  # Markdown标记带来的输出膨胀系数
+
+# 文本层的估算参数（根据规划日志调优）
+SAMPLE_PAGES = 5  # 最多抽样的页数
+IMAGE_TOKENS = 200  # 每张插图描述的输出token
+SCANNED_PAGE_TOKENS = 800  # 扫描页（几乎没有文本层）OCR后的输出token
+SCANNED_PAGE_TEXT_CHARS = 50  # 文本少于该字符数且含图片的页视为扫描页
+DOCX_XML_BYTES_PER_TOKEN = 12  # document.xml中每个输出token约对应的字节数
+
+# 规划日志默认位于缓存根目录下的 planner_decisions.jsonl（相对路径在写入时按缓存根目录解析）
+DEFAULT_DECISION_LOG = "planner_decisions.jsonl"
+
+
+@dataclass
+class DocumentSignals:
+    """文档的本地信号"""
+    file_path: str
+    file_type: str
+    file_size: int
+    is_docx: bool = False
+    page_count: Optional[int] = None
+    sampled_pages: int = 0
+    sampled_text_tokens: int = 0
+    sampled_images: int = 0  # 抽样页中非扫描页上的插图数量
+    scanned_pages: int = 0
+    docx_xml_bytes: int = 0
+    docx_media_count: int = 0
+    docx_media_bytes: int = 0
+
+    @property
+    def has_page_signals(self) -> bool:
+        return bool(self.page_count) and self.sampled_pages > 0
+
+    def estimated_tokens_per_page(self) -> float:
+        """根据抽样页估算每页的输出token"""
+        if not self.has_page_signals:
+            return 0.0
+        tokens = (self.sampled_text_tokens + self.scanned_pages * SCANNED_PAGE_TOKENS
+                  + self.sampled_images * IMAGE_TOKENS)
+        return tokens / self.sampled_pages
+
+
+@dataclass
+class ExtractionPlan:
+    """抽取计划"""
+    strategy: str
+    max_tokens: int
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    pages_per_range: Optional[int] = None
+    estimated_output_tokens: Optional[int] = None
+    docx_llm_format: Optional[str] = None
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def cache_tag(self) -> str:
+        """区分不同抽取方式的缓存标记"""
+        if self.strategy == STRATEGY_LOCAL_DOCX:
+            return f"{self.strategy}:{self.docx_llm_format}"
+        if self.strategy == STRATEGY_SPLIT_PDF:
+            return f"{self.strategy}:{self.pages_per_range}:{self.max_tokens}"
+        if self.strategy == STRATEGY_LARGE_CHUNKED:
+            return f"{self.strategy}:{self.chunk_tokens}"
+        return f"{self.strategy}:{self.max_tokens}"
+
+
+def _clamp_max_tokens(tokens: float, upper: int = MAX_MAX_TOKENS) -> int:
+    return int(min(upper, max(MIN_MAX_TOKENS, math.ceil(tokens / 1000) * 1000)))
+
+
+def output_token_budget(input_tokens: int, upper: int = MAX_MAX_TOKENS) -> int:
+    """
+    根据输入文本的估算token数计算输出token上限
+
+    Args:
+        input_tokens: 输入文本的估算token数（chunker.estimate_tokens）
+        upper: 预算上限
+
+    Returns:
+        max_tokens（计入Markdown膨胀系数并留出1000 tokens余量，按千取整）
+    """
+    return _clamp_max_tokens(input_tokens * OUTPUT_MARGIN + 1000, upper)
+
+
+def _count_page_images(page: Any) -> int:
+    """统计页面资源中的图片XObject数量"""
+    try:
+        xobjects = page["/Resources"].get_object().get("/XObject")
+        if xobjects is None:
+            return 0
+        return sum(1 for ref in xobjects.get_object().values() if ref.get_object().get("/Subtype") == "/Image")
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return 0
+
+
+def collect_signals(file_path: str, file_type: str) -> DocumentSignals:
+    """
+    采集文档的本地信号（只读取少量页面或压缩包目录，不做完整解析）
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型 (pdf, docx, doc)
+
+    Returns:
+        文档信号，无法读取的信号保持默认值
+    """
+    signals = DocumentSignals(file_path=file_path, file_type=file_type, file_size=os.path.getsize(file_path))
+
+    if file_type == "pdf" and HAS_PYPDF:
+        try:
+            reader = PdfReader(file_path)
+            signals.page_count = len(reader.pages)
+            step = max(1, signals.page_count // SAMPLE_PAGES)
+            for page_number in list(range(0, signals.page_count, step))[:SAMPLE_PAGES]:
+                page = reader.pages[page_number]
+                text = page.extract_text() or ""
+                images = _count_page_images(page)
+                signals.sampled_pages += 1
+                signals.sampled_text_tokens += estimate_tokens(text)
+                if images and len(text.strip()) < SCANNED_PAGE_TEXT_CHARS:
+                    signals.scanned_pages += 1
+                else:
+                    signals.sampled_images += images
+        except Exception as e:
+            # 损坏或加密的PDF只使用文件大小
+            logger.warning("⚠️ 读取PDF信号失败 %s: %s", os.path.basename(file_path), e)
+    elif file_type in ("docx", "doc"):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                for info in archive.infolist():
+                    if info.filename == DOCUMENT_PART:
+                        signals.is_docx = True
+                        signals.docx_xml_bytes = info.file_size
+                    elif info.filename.startswith("word/media/"):
+                        signals.docx_media_count += 1
+                        signals.docx_media_bytes += info.file_size
+        except (OSError, zipfile.BadZipFile):
+            pass  # 旧版 .doc 是二进制格式
+    return signals
+
+
+def _chunk_tokens(config: Dict[str, Any]) -> int:
+    """分块大小：配置值，且每块的输出不能超过分块处理的输出上限"""
+    configured = (config.get("chunking") or {}).get("chunk_tokens", DEFAULT_CHUNK_TOKENS)
+    return min(configured, int(CHUNK_MAX_TOKENS / OUTPUT_MARGIN))
+
+
+def _size_based_plan(signals: DocumentSignals, chunk_tokens: int, reason: str) -> ExtractionPlan:
+    """没有可用信号时按文件大小规划"""
+    if signals.file_size > LARGE_FILE_BYTES:
+        return ExtractionPlan(STRATEGY_LARGE_CHUNKED, MAX_MAX_TOKENS, chunk_tokens=chunk_tokens,
+                              reasons=[reason, "文件超过10MB，上传后分块处理"])
+    if signals.file_size > 5 * 1024 * 1024:
+        max_tokens = 16000
+    elif signals.file_size > 2 * 1024 * 1024:
+        max_tokens = 12000
+    else:
+        max_tokens = 8000
+    return ExtractionPlan(STRATEGY_NORMAL, max_tokens, chunk_tokens=chunk_tokens, reasons=[reason, "按文件大小选择max_tokens"])
+
+
+def plan_from_signals(signals: DocumentSignals, config: Optional[Dict[str, Any]] = None) -> ExtractionPlan:
+    """
+    根据文档信号选择抽取方式
+
+    Args:
+        signals: 文档信号
+        config: 模型配置文件内容，读取其中的 chunking、docx、pdf_split 配置段
+
+    Returns:
+        抽取计划
+    """
+    config = config or {}
+    docx_config = config.get("docx") or {}
+    split_config = config.get("pdf_split") or {}
+    chunk_tokens = _chunk_tokens(config)
+
+    if signals.is_docx:
+        if docx_config.get("local_extraction", True):
+            llm_format = docx_config.get("llm_format", "complex")
+            return ExtractionPlan(STRATEGY_LOCAL_DOCX, 0, chunk_tokens=chunk_tokens, docx_llm_format=llm_format,
+                                  reasons=["docx可本地解析"])
+        estimated = (signals.docx_xml_bytes / DOCX_XML_BYTES_PER_TOKEN
+                     + signals.docx_media_count * IMAGE_TOKENS) * OUTPUT_MARGIN
+        reasons = [f"document.xml {signals.docx_xml_bytes} 字节，{signals.docx_media_count} 张图片"]
+        if signals.file_size > LARGE_FILE_BYTES or estimated > MAX_MAX_TOKENS:
+            return ExtractionPlan(STRATEGY_LARGE_CHUNKED, MAX_MAX_TOKENS, chunk_tokens=chunk_tokens,
+                                  estimated_output_tokens=int(estimated),
+                                  reasons=reasons + ["预计输出超过单次调用上限，上传后分块处理"])
+        return ExtractionPlan(STRATEGY_NORMAL, _clamp_max_tokens(estimated + 1000), chunk_tokens=chunk_tokens,
+                              estimated_output_tokens=int(estimated), reasons=reasons)
+
+    if not signals.has_page_signals:
+        return _size_based_plan(signals, chunk_tokens, "无法读取页面信号")
+
+    tokens_per_page = signals.estimated_tokens_per_page()
+    estimated = tokens_per_page * signals.page_count * OUTPUT_MARGIN
+    reasons = [
+        f"{signals.page_count} 页，抽样 {signals.sampled_pages} 页约 {tokens_per_page:.0f} tokens/页，"
+        f"{signals.sampled_images} 张图片，{signals.scanned_pages} 页为扫描页"
+    ]
+    too_big = signals.file_size > LARGE_FILE_BYTES
+    too_long = estimated > MAX_MAX_TOKENS
+    if (too_big or too_long) and signals.page_count > 1 and split_config.get("enabled", True):
+        # 每个范围同时满足目标大小和单次调用的输出上限
+        target_bytes = int(float(split_config.get("target_range_mb", 5)) * 1024 * 1024)
+        by_bytes = target_bytes * signals.page_count // max(1, signals.file_size)
+        by_tokens = int(MAX_MAX_TOKENS * 0.8 // max(1.0, tokens_per_page * OUTPUT_MARGIN))
+        pages_per_range = max(1, min(by_bytes, by_tokens, split_config.get("max_pages_per_range", DEFAULT_MAX_PAGES_PER_RANGE)))
+        range_tokens = tokens_per_page * pages_per_range * OUTPUT_MARGIN
+        reasons.append("文件超过10MB" if too_big else f"预计输出约 {estimated:.0f} tokens，超过单次调用上限")
+        return ExtractionPlan(STRATEGY_SPLIT_PDF, _clamp_max_tokens(range_tokens + 1000), chunk_tokens=chunk_tokens,
+                              pages_per_range=pages_per_range, estimated_output_tokens=int(estimated),
+                              reasons=reasons + [f"按每 {pages_per_range} 页切分"])
+    if too_big:
+        return ExtractionPlan(STRATEGY_LARGE_CHUNKED, MAX_MAX_TOKENS, chunk_tokens=chunk_tokens,
+                              estimated_output_tokens=int(estimated), reasons=reasons + ["文件超过10MB，上传后分块处理"])
+    return ExtractionPlan(STRATEGY_NORMAL, _clamp_max_tokens(estimated + 1000), chunk_tokens=chunk_tokens,
+                          estimated_output_tokens=int(estimated), reasons=reasons)
+
+
+def fallback_plan(signals: DocumentSignals, config: Optional[Dict[str, Any]] = None, reason: str = "") -> ExtractionPlan:
+    """首选方式不可用（如本地解析或切分失败）时，按文件大小退回上传抽取"""
+    return _size_based_plan(signals, _chunk_tokens(config or {}), reason or "首选抽取方式不可用")
+
+
+def log_decision(signals: DocumentSignals, plan: ExtractionPlan, log_path: Optional[str] = DEFAULT_DECISION_LOG) -> None:
+    """记录规划结果，并追加到规划日志（JSON Lines，相对路径位于缓存根目录下）供后续调优"""
+    logger.info("📐 抽取策略: %s, max_tokens=%s, chunk_tokens=%s, pages_per_range=%s (%s)", plan.strategy,
+                plan.max_tokens, plan.chunk_tokens, plan.pages_per_range, '；'.join(plan.reasons))
+    if not log_path:
+        return
+    record = {"time": int(time.time()), "signals": asdict(signals), "plan": asdict(plan)}
+    log_path = os.path.join(cache_root(), log_path)
+    try:
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning("⚠️ 写入规划日志失败: %s", e)
+
+
+def plan_extraction(file_path: str, file_type: str, config: Optional[Dict[str, Any]] = None,
+                    log_path: Optional[str] = DEFAULT_DECISION_LOG) -> ExtractionPlan:
+    """
+    采集信号、规划抽取方式并记录规划结果
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型 (pdf, docx, doc)
+        config: 模型配置文件内容
+        log_path: 规划日志路径（相对路径位于缓存根目录下），None时只打印不写文件
+
+    Returns:
+        抽取计划
+    """
+    signals = collect_signals(file_path, file_type)
+    plan = plan_from_signals(signals, config)
+    log_decision(signals, plan, log_path)
+    return plan
@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GLM异步传输层 - 基于httpx的文件上传、文件内容获取与聊天完成接口
+"""
+import os
+import logging
+import json
+import time
+import asyncio
+import email.utils
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import httpx
+
+try:
+    from .http_client import get_async_client, host_semaphore, run_sync
+    from .metrics import get_metrics, STAGE_UPLOAD, STAGE_FILE_CONTENT, STAGE_CHAT_COMPLETION
+    from .rate_limiter import ModelRateLimiter, RateLimitLease, estimate_request_tokens, get_rate_limiter
+    from .deadline import DeadlineExceeded, check_deadline, remaining_time
+    from .resilience import (
+        CALL_CHAT, CALL_FILE_CONTENT, CALL_FILE_MANAGE, CALL_STREAM, CALL_UPLOAD, CallProfile, CircuitBreaker,
+        backoff_delay, get_circuit_breaker, get_profile, is_retryable_status,
+    )
+except ImportError:
+    from utils.http_client import get_async_client, host_semaphore, run_sync
+    from utils.metrics import get_metrics, STAGE_UPLOAD, STAGE_FILE_CONTENT, STAGE_CHAT_COMPLETION
+    from utils.rate_limiter import ModelRateLimiter, RateLimitLease, estimate_request_tokens, get_rate_limiter
+    from utils.deadline import DeadlineExceeded, check_deadline, remaining_time
+    from utils.resilience import (
+        CALL_CHAT, CALL_FILE_CONTENT, CALL_FILE_MANAGE, CALL_STREAM, CALL_UPLOAD, CallProfile, CircuitBreaker,
+        backoff_delay, get_circuit_breaker, get_profile, is_retryable_status,
+    )
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = "https://open.bigmodel.cn/api/paas/v4"
+
+# 设置该环境变量可将请求发往其他地址（例如本地压测用的模拟服务器）
+API_BASE_ENV = "GLM_API_BASE"
+
+# 超时发生时剩余时间少于该值（秒），视为超时时间被截止时间截短，而不是服务器无响应
+DEADLINE_SLACK = 0.05
+
+
+def api_base() -> str:
+    """获取GLM API地址"""
+    return (os.getenv(API_BASE_ENV) or DEFAULT_API_BASE).rstrip("/")
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """解析响应的Retry-After头（秒数或HTTP日期），没有或无法解析时返回None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def auth_headers(api_key: str, json_body: bool = False) -> Dict[str, str]:
+    """构造GLM API请求头"""
+    headers = {"Authorization": f"Bearer {api_key}"}
+    if json_body:
+        headers["Content-Type"] = "application/json"
+    return headers
+
+
+def _record_attempt(stage: str, response: Optional[httpx.Response] = None, error: Optional[Exception] = None) -> None:
+    """记录单次HTTP请求的状态码和收发字节数"""
+    metrics = get_metrics()
+    if response is None:
+        metrics.inc("http_requests_total", stage=stage, status=type(error).__name__ if error else "error")
+        return
+    metrics.inc("http_requests_total", stage=stage, status=response.status_code)
+    metrics.inc("http_bytes_sent_total", int(response.request.headers.get("Content-Length") or 0), stage=stage)
+    received = response.num_bytes_downloaded
+    if not received:
+        # 响应体已预先读入内存（未经过网络流）时按正文长度计算
+        try:
+            received = len(response.content)
+        except httpx.ResponseNotRead:
+            received = 0
+    metrics.inc("http_bytes_received_total", received, stage=stage)
+
+
+@asynccontextmanager
+async def _rate_limit_slot(limiter: Optional[ModelRateLimiter], tokens: int) -> AsyncIterator[Optional[RateLimitLease]]:
+    """有速率限制器时占用一个名额，否则直接执行"""
+    if limiter is None:
+        yield None
+        return
+    async with limiter.slot(tokens) as lease:
+        yield lease
+
+
+async def _wait_before_retry(label: str, stage: str, profile: CallProfile, attempt: int,
+                             retry_after: Optional[float] = None, rate_limited: bool = False) -> None:
+    """重试前按指数退避加随机抖动等待（速率限制器已因429暂停时不再额外等待），剩余时间不够等待时放弃"""
+    get_metrics().inc("http_retries_total", stage=stage)
+    if rate_limited:
+        # 限制器已按Retry-After暂停该模型的所有请求，下一次尝试会等到暂停结束
+        return
+    delay = backoff_delay(profile, attempt, retry_after)
+    remaining = remaining_time()
+    if remaining is not None and delay >= remaining:
+        raise DeadlineExceeded(f"{label}: 剩余 {remaining:.1f}秒，不足以等待 {delay:.1f}秒后重试")
+    logger.info("⏳ %s %.1f秒后重试...", label, delay)
+    await asyncio.sleep(delay)
+
+
+def _deadline_expired(error: Exception) -> bool:
+    """请求超时是否因为超时时间被截止时间截短（此时不算服务器的失败）"""
+    remaining = remaining_time()
+    return isinstance(error, httpx.TimeoutException) and remaining is not None and remaining < DEADLINE_SLACK
+
+
+def _circuit_rejected(breaker: CircuitBreaker, label: str, stage: str) -> None:
+    """记录因熔断而未发送的请求"""
+    get_metrics().inc("circuit_rejections_total", stage=stage)
+    logger.error("❌ %s未发送: %s 处于熔断状态", label, breaker.name)
+
+
+async def request_with_retries(method: str, url: str, *, label: str, call_type: str = CALL_FILE_MANAGE,
+                               max_retries: Optional[int] = None, retry_delay: Optional[float] = None,
+                               timeout: Optional[float] = None, stage: str = "other",
+                               rate_limiter: Optional[ModelRateLimiter] = None, reserve_tokens: int = 0,
+                               **kwargs: Any) -> Optional[httpx.Response]:
+    """
+    发送HTTP请求，可重试的失败（网络错误、408/429/5xx）按指数退避加随机抖动重试，其余4xx立即返回
+
+    Args:
+        method: HTTP方法
+        url: 请求URL
+        label: 日志中使用的调用名称
+        call_type: 调用类型，决定超时、最大尝试次数和退避时间（见 resilience.DEFAULT_PROFILES）
+        max_retries: 最大尝试次数，默认按调用类型
+        retry_delay: 第一次重试前的最长退避时间（秒），默认按调用类型
+        timeout: 读取超时时间（秒），默认按调用类型
+        stage: 指标中使用的阶段名称，整个调用（含重试）的耗时记入该阶段
+        rate_limiter: 模型速率限制器，提供时每次尝试前等待名额，429后按Retry-After暂停
+        reserve_tokens: 每次尝试预扣的token数
+        **kwargs: 传递给httpx的其他参数
+
+    Returns:
+        最后一次得到的响应（可能不是200），全部因异常失败或主机处于熔断状态时返回None
+
+    Raises:
+        DeadlineExceeded: 当前上下文的截止时间已到（见 deadline.deadline_scope），每次尝试的超时不超过剩余时间
+    """
+    profile = get_profile(call_type, max_attempts=max_retries, base_delay=retry_delay, read_timeout=timeout)
+    breaker = get_circuit_breaker(url)
+    response = None
+    metrics = get_metrics()
+    start_time = time.monotonic()
+    # 使用共享的连接池客户端，复用与服务器之间的长连接
+    client = get_async_client()
+    try:
+        for attempt in range(profile.max_attempts):
+            remaining = check_deadline(label)
+            if not breaker.allow():
+                _circuit_rejected(breaker, label, stage)
+                break
+            status = None
+            retry_after = None
+            try:
+                logger.debug("🔄 %s尝试 %s/%s", label, attempt + 1, profile.max_attempts)
+                async with _rate_limit_slot(rate_limiter, reserve_tokens) as lease:
+                    async with host_semaphore(url):
+                        response = await client.request(method, url, timeout=profile.timeout(remaining), **kwargs)
+                    status = response.status_code
+                    retry_after = retry_after_seconds(response)
+                    if lease:
+                        lease.record(status, retry_after)
+                breaker.record(status < 500)
+                _record_attempt(stage, response)
+                if status == 200:
+                    break
+                if not is_retryable_status(status):
+                    logger.error("❌ %s失败，状态码 %s 不可重试", label, status)
+                    break
+                logger.warning("⚠️ %s失败，状态码: %s", label, status)
+            except httpx.TransportError as e:
+                _record_attempt(stage, error=e)
+                if _deadline_expired(e):
+                    raise DeadlineExceeded(f"{label}: 截止时间前未收到响应") from e
+                breaker.record(False)
+                logger.warning("⚠️ %s第%s次尝试失败: %s", label, attempt + 1, e)
+            except httpx.HTTPError as e:
+                # 非网络层错误（如响应解码失败）重试也不会成功
+                _record_attempt(stage, error=e)
+                logger.error("❌ %s失败: %s", label, e)
+                break
+            if attempt < profile.max_attempts - 1:
+                await _wait_before_retry(label, stage, profile, attempt, retry_after,
+                                         rate_limited=rate_limiter is not None and status == 429)
+    except DeadlineExceeded:
+        metrics.observe("stage_duration_seconds", time.monotonic() - start_time, stage=stage, outcome="deadline")
+        raise
+    outcome = "ok" if response is not None and response.status_code == 200 else "error"
+    metrics.observe("stage_duration_seconds", time.monotonic() - start_time, stage=stage, outcome=outcome)
+    return response
+
+
+async def upload_file_async(file_path: str, api_key: str, purpose: str = "file-extract") -> str:
+    """
+    上传文件到GLM服务器
+
+    Args:
+        file_path: 本地文件路径
+        api_key: API密钥
+        purpose: 文件用途，默认为file-extract
+
+    Returns:
+        上传成功返回文件ID，失败返回空字符串
+    """
+    try:
+        logger.debug("🔍 开始上传文件: %s", file_path)
+        if not os.path.exists(file_path):
+            logger.error("❌ 文件不存在: %s", file_path)
+            return ""
+
+        file_size = os.path.getsize(file_path)
+        logger.debug("📁 文件大小: %s bytes", file_size)
+
+        url = f"{api_base()}/files"
+        file_name = os.path.basename(file_path)
+        logger.debug("📄 文件名: %s", file_name)
+
+        # 一次性读入内存，重试时可以重复发送
+        with open(file_path, 'rb') as f:
+            file_bytes = f.read()
+
+        logger.debug("🌐 发送请求到: %s", url)
+        response = await request_with_retries(
+            "POST", url, label="上传文件", call_type=CALL_UPLOAD, stage=STAGE_UPLOAD,
+            headers=auth_headers(api_key),
+            files={'file': (file_name, file_bytes)},
+            data={'purpose': purpose},
+        )
+        if response is None:
+            logger.error("❌ 文件上传失败: 无响应")
+            return ""
+
+        logger.debug("📊 响应状态码: %s", response.status_code)
+        if response.status_code != 200:
+            logger.error("❌ 服务器响应错误: %s", response.text)
+            return ""
+
+        data = response.json()
+        logger.debug("✅ 响应数据: %s", data)
+        # 响应中的字段是"id"而不是"file_id"
+        file_id = data.get("id", "")
+        if file_id:
+            logger.info("🎯 文件上传成功，文件ID: %s", file_id)
+        else:
+            logger.error("❌ 响应中未找到id")
+        return file_id
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.exception("❌ 文件上传步骤失败: %s", e)
+        return ""
+
+
+async def get_file_content_async(file_id: str, api_key: str, label: str = "获取文件内容") -> Optional[Dict[str, Any]]:
+    """
+    获取GLM解析后的文件内容
+
+    Args:
+        file_id: 文件ID
+        api_key: API密钥
+        label: 日志中使用的调用名称
+
+    Returns:
+        文件内容响应数据（包含content字段），失败返回None
+    """
+    file_content_url = f"{api_base()}/files/{file_id}/content"
+    logger.debug("🌐 文件内容API URL: %s", file_content_url)
+    response = await request_with_retries(
+        "GET", file_content_url, label=label, call_type=CALL_FILE_CONTENT, stage=STAGE_FILE_CONTENT,
+        headers=auth_headers(api_key),
+    )
+    if response is not None and response.status_code == 200:
+        return response.json()
+    logger.error("❌ %s失败: %s", label, response.text if response is not None else '无响应')
+    return None
+
+
+async def get_file_info_response_async(file_id: str, api_key: str) -> Optional[httpx.Response]:
+    """
+    获取服务器上文件的详细信息，返回原始响应以便调用方区分文件不存在（404）和临时失败
+
+    Args:
+        file_id: 文件ID
+        api_key: API密钥
+
+    Returns:
+        原始响应，请求失败返回None
+    """
+    return await request_with_retries(
+        "GET", f"{api_base()}/files/{file_id}", label="获取文件信息", call_type=CALL_FILE_MANAGE, stage="file_info",
+        headers=auth_headers(api_key),
+    )
+
+
+async def get_file_info_async(file_id: str, api_key: str) -> Optional[Dict[str, Any]]:
+    """
+    获取服务器上文件的详细信息
+
+    Args:
+        file_id: 文件ID
+        api_key: API密钥
+
+    Returns:
+        文件详细信息，文件不存在或请求失败返回None
+    """
+    response = await get_file_info_response_async(file_id, api_key)
+    if response is not None and response.status_code == 200:
+        return response.json()
+    return None
+
+
+async def list_files_async(api_key: str, params: Dict[str, Any]) -> Optional[httpx.Response]:
+    """
+    获取服务器上的文件列表
+
+    Args:
+        api_key: API密钥
+        params: 查询参数（limit、purpose等）
+
+    Returns:
+        原始响应，请求失败返回None
+    """
+    return await request_with_retries(
+        "GET", f"{api_base()}/files", label="获取文件列表", call_type=CALL_FILE_MANAGE, stage="file_list",
+        headers=auth_headers(api_key), params=params,
+    )
+
+
+async def delete_file_async(file_id: str, api_key: str) -> Optional[httpx.Response]:
+    """
+    删除服务器上的文件
+
+    Args:
+        file_id: 文件ID
+        api_key: API密钥
+
+    Returns:
+        原始响应，请求失败返回None
+    """
+    return await request_with_retries(
+        "DELETE", f"{api_base()}/files/{file_id}", label="删除文件", call_type=CALL_FILE_MANAGE, stage="file_delete",
+        headers=auth_headers(api_key),
+    )
+
+
+async def chat_completion_async(payload: Dict[str, Any], api_key: str, label: str = "聊天API",
+                                max_retries: Optional[int] = None, retry_delay: Optional[float] = None,
+                                timeout: Optional[float] = None, stage: str = STAGE_CHAT_COMPLETION,
+                                call_type: str = CALL_CHAT) -> Optional[Dict[str, Any]]:
+    """
+    调用聊天完成API
+
+    Args:
+        payload: 请求体
+        api_key: API密钥
+        label: 日志中使用的调用名称
+        max_retries: 最大尝试次数，默认按调用类型
+        retry_delay: 第一次重试前的最长退避时间（秒），默认按调用类型
+        timeout: 读取超时时间（秒），默认按调用类型
+        stage: 指标中使用的阶段名称
+        call_type: 调用类型（chat / chunk / image），决定超时和重试配置
+
+    Returns:
+        聊天完成响应数据，失败返回None
+    """
+    url = f"{api_base()}/chat/completions"
+    model = str(payload.get("model", ""))
+    limiter = get_rate_limiter(model)
+    reserved = estimate_request_tokens(payload)
+    response = await request_with_retries(
+        "POST", url, label=label, call_type=call_type, max_retries=max_retries, retry_delay=retry_delay,
+        timeout=timeout, stage=stage, rate_limiter=limiter, reserve_tokens=reserved,
+        headers=auth_headers(api_key, json_body=True), json=payload,
+    )
+    if response is not None and response.status_code == 200:
+        data = response.json()
+        get_metrics().record_usage(data.get("usage"), stage, model)
+        limiter.settle_tokens(reserved, data.get("usage"))
+        return data
+    logger.error("❌ %s调用失败: %s", label, response.text if response is not None else '无响应')
+    return None
+
+
+async def stream_chat_completion_async(payload: Dict[str, Any], api_key: str,
+                                       on_delta: Optional[Callable[[str], None]] = None,
+                                       on_reset: Optional[Callable[[], None]] = None,
+                                       label: str = "流式聊天API", max_retries: Optional[int] = None,
+                                       retry_delay: Optional[float] = None, idle_timeout: Optional[float] = None,
+                                       stage: str = STAGE_CHAT_COMPLETION,
+                                       call_type: str = CALL_STREAM) -> Optional[Dict[str, Any]]:
+    """
+    以流式（SSE）方式调用聊天完成API，每收到一段内容就回调on_delta
+
+    超时按空闲时间计算：只要服务器持续输出，生成时间再长也不会被中断。
+
+    Args:
+        payload: 请求体（会自动加上 stream=True）
+        api_key: API密钥
+        on_delta: 收到增量内容时的回调
+        on_reset: 输出中途失败、即将重试时的回调，用于丢弃已写出的部分内容
+        label: 日志中使用的调用名称
+        max_retries: 最大尝试次数，默认按调用类型
+        retry_delay: 第一次重试前的最长退避时间（秒），默认按调用类型
+        idle_timeout: 两次收到数据之间的最长等待时间（秒），默认按调用类型
+        stage: 指标中使用的阶段名称
+        call_type: 调用类型，决定超时和重试配置
+
+    Returns:
+        与非流式接口结构相同的响应数据（额外包含首字节时间ttfb），失败返回None
+
+    Raises:
+        DeadlineExceeded: 当前上下文的截止时间已到，空闲超时不超过剩余时间
+    """
+    url = f"{api_base()}/chat/completions"
+    body = dict(payload, stream=True)
+    model = str(payload.get("model", ""))
+    limiter = get_rate_limiter(model)
+    reserved = estimate_request_tokens(payload)
+    profile = get_profile(call_type, max_attempts=max_retries, base_delay=retry_delay, read_timeout=idle_timeout)
+    breaker = get_circuit_breaker(url)
+    client = get_async_client()
+    metrics = get_metrics()
+    call_start = time.monotonic()
+    error_text = "无响应"
+
+    try:
+        for attempt in range(profile.max_attempts):
+            remaining = check_deadline(label)
+            if not breaker.allow():
+                _circuit_rejected(breaker, label, stage)
+                error_text = "熔断中"
+                break
+            parts = []
+            finish_reason = None
+            usage = None
+            ttfb = None
+            status = None
+            retry_after = None
+            fatal = False
+            start_time = time.monotonic()
+            try:
+                logger.debug("🔄 %s尝试 %s/%s", label, attempt + 1, profile.max_attempts)
+                async with limiter.slot(reserved) as lease, host_semaphore(url):
+                    async with client.stream("POST", url, headers=auth_headers(api_key, json_body=True),
+                                             json=body, timeout=profile.timeout(remaining)) as response:
+                        status = response.status_code
+                        if status != 200:
+                            await response.aread()
+                            retry_after = retry_after_seconds(response)
+                            lease.record(status, retry_after)
+                            breaker.record(status < 500)
+                            _record_attempt(stage, response)
+                            error_text = response.text
+                            logger.warning("⚠️ %s失败，状态码: %s", label, status)
+                        else:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    break
+                                event = json.loads(data)
+                                choice = (event.get("choices") or [{}])[0]
+                                delta = (choice.get("delta") or {}).get("content") or ""
+                                if delta:
+                                    if ttfb is None:
+                                        ttfb = time.monotonic() - start_time
+                                        logger.info("⏱️ %s首字节时间: %.2f秒", label, ttfb)
+                                    parts.append(delta)
+                                    if on_delta:
+                                        on_delta(delta)
+                                finish_reason = choice.get("finish_reason") or finish_reason
+                                usage = event.get("usage") or usage
+                            lease.record(status)
+                            breaker.record(True)
+                            _record_attempt(stage, response)
+                            metrics.record_usage(usage, stage, model)
+                            limiter.settle_tokens(reserved, usage)
+                            if ttfb is not None:
+                                metrics.observe("ttfb_seconds", ttfb, stage=stage)
+                            metrics.observe("stage_duration_seconds", time.monotonic() - call_start,
+                                            stage=stage, outcome="ok")
+                            return {
+                                "choices": [{
+                                    "message": {"role": "assistant", "content": "".join(parts)},
+                                    "finish_reason": finish_reason,
+                                }],
+                                "usage": usage,
+                                "ttfb": ttfb,
+                            }
+            except (httpx.TransportError, ValueError) as e:
+                # 连接中断、空闲超时或收到不完整的事件，重新请求
+                _record_attempt(stage, error=e)
+                if _deadline_expired(e):
+                    raise DeadlineExceeded(f"{label}: 截止时间前未完成输出") from e
+                if isinstance(e, httpx.TransportError):
+                    breaker.record(False)
+                error_text = str(e)
+                logger.warning("⚠️ %s第%s次尝试失败: %s", label, attempt + 1, e)
+            except httpx.HTTPError as e:
+                _record_attempt(stage, error=e)
+                error_text = str(e)
+                logger.error("❌ %s失败: %s", label, e)
+                fatal = True
+            if parts and on_reset:
+                on_reset()
+            if status is not None and status != 200 and not is_retryable_status(status):
+                logger.error("❌ %s状态码 %s 不可重试", label, status)
+                fatal = True
+            if fatal:
+                break
+            if attempt < profile.max_attempts - 1:
+                await _wait_before_retry(label, stage, profile, attempt, retry_after, rate_limited=status == 429)
+    except DeadlineExceeded:
+        metrics.observe("stage_duration_seconds", time.monotonic() - call_start, stage=stage, outcome="deadline")
+        raise
+
+    metrics.observe("stage_duration_seconds", time.monotonic() - call_start, stage=stage, outcome="error")
+    logger.error("❌ %s调用失败: %s", label, error_text)
+    return None
+
+
+def extract_message_content(chat_data: Dict[str, Any]) -> str:
+    """从聊天完成响应中取出第一条消息内容"""
+    return chat_data.get("choices", [{}])[0].get("message", {}).get("content", "")
@@ -4,81 +4,189 @@
 GLM文件管理器 - 管理GLM-4.5V服务器的文件操作
 """
 import os
-import requests
-import yaml
-from typing import Dict, List, Optional, Any
+import time
+import logging
+import asyncio
+import fnmatch
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+try:
+    from .glm_client import (
+        run_sync,
+        upload_file_async,
+        get_file_info_async,
+        get_file_info_response_async,
+        list_files_async,
+        delete_file_async,
+        retry_after_seconds,
+    )
+    from .upload_registry import UploadRegistry, get_upload_registry
+    from .extraction_cache import file_sha256
+    from .config_registry import get_registry
+except ImportError:
+    from utils.glm_client import (
+        run_sync,
+        upload_file_async,
+        get_file_info_async,
+        get_file_info_response_async,
+        list_files_async,
+        delete_file_async,
+        retry_after_seconds,
+    )
+    from utils.upload_registry import UploadRegistry, get_upload_registry
+    from utils.extraction_cache import file_sha256
+    from utils.config_registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+
+# 批量清理时的默认并发删除数量和分页大小
+DEFAULT_CLEANUP_CONCURRENCY = 8
+DEFAULT_PAGE_SIZE = 100
+
+# 单个文件删除的最大尝试次数，以及429响应没有Retry-After时的基础等待时间（秒）
+DELETE_MAX_ATTEMPTS = 4
+DEFAULT_RATE_LIMIT_DELAY = 1.0
+
+
+class FileListError(RuntimeError):
+    """获取服务器文件列表失败"""
+
+
+class _DeletePacer:
+    """批量删除共享的暂停点：任一请求被限流后，所有删除任务等到Retry-After之后再继续"""
+
+    def __init__(self):
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 
 class GLMFileManager:
     """GLM文件管理器类"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, registry: Optional[UploadRegistry] = None):
         """
         初始化GLM文件管理器
         
         Args:
             api_key: GLM API密钥
+            registry: 上传文件登记表，默认使用进程内共享的 .cache/uploads.json 登记表
         """
         self.api_key = api_key
-        self.base_url = "https://open.bigmodel.cn/api/paas/v4"
-        self.headers = {
-            "Authorization": f"Bearer {api_key}"
-        }
+        self.registry = registry if registry is not None else get_upload_registry()
     
-    def get_file_list(self, limit: int = 20, purpose: str = "file-extract") -> List[Dict[str, Any]]:
+    async def iter_files_async(self, purpose: Optional[str] = "file-extract", page_size: int = DEFAULT_PAGE_SIZE,
+                               after: Optional[str] = None, order: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
         """
-        获取文件列表
+        逐页获取文件列表并逐个产出文件记录（异步生成器）
+
+        只在取完当前页后才请求下一页，调用方提前停止迭代时不会再发出请求。
+
+        Args:
+            purpose: 按用途筛选（服务端筛选），None表示不限
+            page_size: 每页数量
+            after: 从该文件ID之后开始列出（分页游标）
+            order: 排序方式（服务端排序，如 asc / desc），None时使用服务器默认顺序
+
+        Yields:
+            文件记录，包含id、filename、bytes、created_at、purpose等信息
+
+        Raises:
+            FileListError: 获取某一页失败
+        """
+        async for page in self._iter_pages_async(purpose, page_size, after, order):
+            for file_info in page:
+                yield file_info
+
+    async def _iter_pages_async(self, purpose: Optional[str], page_size: int, after: Optional[str] = None,
+                                order: Optional[str] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """逐页获取文件列表并按页产出（参数同 iter_files_async）"""
+        while True:
+            params = {"limit": str(page_size)}
+            if purpose:
+                params["purpose"] = purpose
+            if order:
+                params["order"] = order
+            if after:
+                params["after"] = after
+            logger.debug("📋 请求参数: %s", params)
+            response = await list_files_async(self.api_key, params)
+            if response is None:
+                raise FileListError("获取文件列表失败: 无响应")
+            if response.status_code != 200:
+                raise FileListError(f"获取文件列表失败: {response.text}")
+            data = response.json()
+            page = data.get("data", [])
+            logger.debug("📁 本页 %s 个文件", len(page))
+            if page:
+                yield page
+            if not page or not data.get("has_more"):
+                return
+            after = page[-1].get("id")
+
+    def iter_files(self, purpose: Optional[str] = "file-extract", page_size: int = DEFAULT_PAGE_SIZE,
+                   after: Optional[str] = None, order: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """逐页获取文件列表并逐个产出文件记录（同步生成器，参数同 iter_files_async）"""
+        pages = self.iter_files_async(purpose, page_size, after, order)
+        try:
+            while True:
+                try:
+                    yield run_sync(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            run_sync(pages.aclose())
+
+    async def get_file_list_async(self, limit: int = 20, purpose: str = "file-extract") -> List[Dict[str, Any]]:
+        """
+        获取文件列表（异步）
         
         Args:
-            limit: 返回文件数量限制，默认20
+            limit: 返回文件数量限制，默认20（超过单页数量时自动翻页）
             purpose: 文件用途，默认为file-extract
         
         Returns:
             文件列表，每个文件包含id、filename、bytes、created_at、purpose等信息
         """
+        logger.debug("🔍 获取文件列表，限制数量: %s, 用途: %s", limit, purpose)
+        files: List[Dict[str, Any]] = []
+        if limit <= 0:
+            return files
         try:
-            print(f"🔍 获取文件列表，限制数量: {limit}, 用途: {purpose}")
-            
-            url = f"{self.base_url}/files"
-            params = {
-                "limit": str(limit),
-                "purpose": purpose
-            }
-            
-            print(f"🌐 请求URL: {url}")
-            print(f"📋 请求参数: {params}")
-            
-            response = requests.get(url, headers=self.headers, params=params)
-            print(f"📊 响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(f"✅ 成功获取文件列表")
-                
-                # 根据GLM API文档，文件列表在data字段中
-                files = data.get("data", [])
-                print(f"📁 找到 {len(files)} 个文件")
-                
-                # 打印文件信息
-                for file_info in files:
-                    print(f"📄 文件ID: {file_info.get('id')}, "
-                          f"文件名: {file_info.get('filename')}, "
-                          f"大小: {file_info.get('bytes')} bytes, "
-                          f"创建时间: {file_info.get('created_at')}")
-                
-                return files
-            else:
-                print(f"❌ 获取文件列表失败: {response.text}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 请求异常: {e}")
+            async for file_info in self.iter_files_async(purpose, page_size=min(limit, DEFAULT_PAGE_SIZE)):
+                logger.debug("📄 文件ID: %s, 文件名: %s, 大小: %s bytes, 创建时间: %s", file_info.get('id'),
+                             file_info.get('filename'), file_info.get('bytes'), file_info.get('created_at'))
+                files.append(file_info)
+                if len(files) >= limit:
+                    break
+        except FileListError as e:
+            logger.error("❌ %s", e)
             return []
         except Exception as e:
-            print(f"❌ 获取文件列表步骤失败: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ 获取文件列表步骤失败: %s", e)
             return []
+        logger.info("📁 找到 %s 个文件", len(files))
+        return files
+    
+    def get_file_list(self, limit: int = 20, purpose: str = "file-extract") -> List[Dict[str, Any]]:
+        """
+        获取文件列表
+        
+        Args:
+            limit: 返回文件数量限制，默认20
+            purpose: 文件用途，默认为file-extract
+        
+        Returns:
+            文件列表，每个文件包含id、filename、bytes、created_at、purpose等信息
+        """
+        return run_sync(self.get_file_list_async(limit, purpose))
     
     def get_file_info(self, file_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -90,30 +198,45 @@ class GLMFileManager:
         Returns:
             文件详细信息，如果失败返回None
         """
+        logger.debug("🔍 获取文件信息，文件ID: %s", file_id)
+        data = run_sync(self.get_file_info_async(file_id))
+        if data is not None:
+            logger.debug("✅ 成功获取文件信息: %s", data)
+        else:
+            logger.error("❌ 获取文件信息失败: %s", file_id)
+        return data
+    
+    async def delete_file_async(self, file_id: str) -> bool:
+        """
+        删除文件（异步）
+        
+        Args:
+            file_id: 文件ID
+        
+        Returns:
+            删除成功返回True，失败返回False
+        """
         try:
-            print(f"🔍 获取文件信息，文件ID: {file_id}")
+            logger.info("🗑️ 删除文件，文件ID: %s", file_id)
             
-            url = f"{self.base_url}/files/{file_id}"
-            
-            response = requests.get(url, headers=self.headers)
-            print(f"📊 响应状态码: {response.status_code}")
+            response = await delete_file_async(file_id, self.api_key)
+            if response is None:
+                logger.error("❌ 文件删除失败: 无响应")
+                return False
+            logger.debug("📊 响应状态码: %s", response.status_code)
             
-            if response.status_code == 200:
-                data = response.json()
-                print(f"✅ 成功获取文件信息: {data}")
-                return data
+            # 404 说明文件已不在服务器上，同样清除指向它的登记记录
+            if response.status_code in (200, 404):
+                logger.info("✅ 文件删除成功")
+                self.registry.forget_file_id(file_id)
+                return True
             else:
-                print(f"❌ 获取文件信息失败: {response.text}")
-                return None
+                logger.error("❌ 文件删除失败: %s", response.text)
+                return False
                 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 请求异常: {e}")
-            return None
         except Exception as e:
-            print(f"❌ 获取文件信息步骤失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+            logger.exception("❌ 删除文件步骤失败: %s", e)
+            return False
     
     def delete_file(self, file_id: str) -> bool:
         """
@@ -125,205 +248,220 @@ class GLMFileManager:
         Returns:
             删除成功返回True，失败返回False
         """
-        try:
-            print(f"🗑️ 删除文件，文件ID: {file_id}")
-            
-            url = f"{self.base_url}/files/{file_id}"
-            
-            response = requests.delete(url, headers=self.headers)
-            print(f"📊 响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                print(f"✅ 文件删除成功")
+        return run_sync(self.delete_file_async(file_id))
+    
+    async def _delete_with_backoff_async(self, file_id: str, limiter: _DeletePacer) -> bool:
+        """删除单个文件，429时按Retry-After让所有删除任务一起暂停，5xx或网络错误时指数退避"""
+        for attempt in range(DELETE_MAX_ATTEMPTS):
+            await limiter.wait()
+            response = await delete_file_async(file_id, self.api_key)
+            status = response.status_code if response is not None else None
+            # 404 说明文件已不在服务器上，同样视为删除成功
+            if status in (200, 404):
+                self.registry.forget_file_id(file_id)
                 return True
+            if status == 429:
+                retry_after = retry_after_seconds(response)
+                limiter.pause(DEFAULT_RATE_LIMIT_DELAY * 2 ** attempt if retry_after is None else retry_after)
+            elif status is None or status >= 500:
+                await asyncio.sleep(DEFAULT_RATE_LIMIT_DELAY * 2 ** attempt)
             else:
-                print(f"❌ 文件删除失败: {response.text}")
+                logger.error("❌ 文件删除失败 %s: %s", file_id, response.text)
                 return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 请求异常: {e}")
-            return False
-        except Exception as e:
-            print(f"❌ 删除文件步骤失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-    
+        return False
+
+    async def cleanup_files_async(self, purpose: str = "file-extract", older_than: Optional[float] = None,
+                                  filename_pattern: Optional[str] = None,
+                                  concurrency: int = DEFAULT_CLEANUP_CONCURRENCY,
+                                  page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        分页获取服务器上的文件，按条件筛选后并发删除（无需交互确认）
+
+        逐页删除：取到下一页后再删除上一页中符合条件的文件（分页游标是上一页最后一个文件ID，请求时需仍然存在），
+        内存中最多保留两页的文件记录。
+
+        Args:
+            purpose: 文件用途，默认为file-extract
+            older_than: 只删除上传时间早于该秒数之前的文件，None表示不限
+            filename_pattern: 只删除文件名匹配该通配符（如 "*.pdf"）的文件，None表示不限
+            concurrency: 同时进行的删除请求数量上限
+            page_size: 获取文件列表时每页的数量
+            dry_run: 只列出匹配的文件，不删除
+
+        Returns:
+            删除结果统计，包含total、success、failed、failed_files；dry_run时额外包含files；
+            获取某一页失败时额外包含error，此前各页的删除结果仍然计入
+        """
+        result: Dict[str, Any] = {"total": 0, "success": 0, "failed": 0, "failed_files": []}
+        if dry_run:
+            result.update(dry_run=True, files=[])
+        cutoff = time.time() - older_than if older_than is not None else None
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        limiter = _DeletePacer()
+
+        def matches(file_info: Dict[str, Any]) -> bool:
+            if cutoff is not None and (file_info.get("created_at") or 0) > cutoff:
+                return False
+            return filename_pattern is None or fnmatch.fnmatch(file_info.get("filename") or "", filename_pattern)
+
+        async def delete_one(file_info: Dict[str, Any]) -> None:
+            file_id = file_info.get("id")
+            async with semaphore:
+                deleted = await self._delete_with_backoff_async(file_id, limiter)
+            if deleted:
+                result["success"] += 1
+                logger.debug("✅ 文件删除成功: %s (ID: %s)", file_info.get("filename"), file_id)
+            else:
+                result["failed"] += 1
+                result["failed_files"].append({"file_id": file_id, "filename": file_info.get("filename", "unknown")})
+
+        async def delete_page(matched: List[Dict[str, Any]]) -> None:
+            if matched and not dry_run:
+                await asyncio.gather(*(delete_one(file_info) for file_info in matched))
+
+        scanned = 0
+        previous: List[Dict[str, Any]] = []
+        try:
+            async for page in self._iter_pages_async(purpose, page_size):
+                scanned += len(page)
+                await delete_page(previous)
+                previous = [file_info for file_info in page if matches(file_info)]
+                result["total"] += len(previous)
+                if dry_run:
+                    result["files"].extend(previous)
+            await delete_page(previous)
+        except FileListError as e:
+            logger.error("❌ %s", e)
+            result["error"] = str(e)
+
+        logger.info("🗑️ 服务器上共 %s 个文件（用途: %s），%s 个符合删除条件", scanned, purpose, result["total"])
+        if dry_run:
+            return result
+        logger.info("📊 删除完成: 成功 %s 个，失败 %s 个", result["success"], result["failed"])
+        for failed_file in result["failed_files"]:
+            logger.warning("⚠️ 删除失败: %s (ID: %s)", failed_file["filename"], failed_file["file_id"])
+        return result
+
+    def cleanup_files(self, purpose: str = "file-extract", older_than: Optional[float] = None,
+                      filename_pattern: Optional[str] = None, concurrency: int = DEFAULT_CLEANUP_CONCURRENCY,
+                      page_size: int = DEFAULT_PAGE_SIZE, dry_run: bool = False) -> Dict[str, Any]:
+        """分页获取服务器上的文件，按条件筛选后并发删除（同步包装）"""
+        return run_sync(self.cleanup_files_async(purpose, older_than, filename_pattern, concurrency, page_size,
+                                                 dry_run))
+
     def delete_all_files(self, purpose: str = "file-extract", batch_size: int = 10, require_confirmation: bool = True) -> Dict[str, Any]:
         """
         删除所有上传的文件
-        
+
         Args:
             purpose: 文件用途，默认为file-extract
-            batch_size: 批量删除的大小，默认为10
-            require_confirmation: 是否需要用户确认，默认为True
-        
+            batch_size: 同时进行的删除请求数量上限，默认为10
+            require_confirmation: 是否需要用户确认，默认为True（自动化场景请使用 cleanup_files）
+
         Returns:
             删除结果统计，包含成功和失败的文件数量
         """
-        try:
-            # 如果需要用户确认
-            if require_confirmation:
-                print("\n🗑️ 是否要删除所有文件？此操作不可恢复！")
-                user_input = input("请输入 yes/Y 确认删除，或其他键跳过: ")
-                if user_input.lower() not in ['yes', 'y']:
-                    print("\n⏭️ 跳过删除文件操作")
-                    return {"total": 0, "success": 0, "failed": 0, "failed_files": [], "skipped": True}
-            
-            print(f"🗑️ 开始删除所有上传的文件，用途: {purpose}")
-            
-            # 获取所有文件
-            files = self.get_file_list(limit=1000, purpose=purpose)  # 获取大量文件
-            
-            if not files:
-                print("ℹ️ 没有找到需要删除的文件")
-                return {"total": 0, "success": 0, "failed": 0, "failed_files": []}
-            
-            total_files = len(files)
-            print(f"📁 找到 {total_files} 个文件需要删除")
-            
-            # 统计结果
-            result = {
-                "total": total_files,
-                "success": 0,
-                "failed": 0,
-                "failed_files": []
-            }
-            
-            # 批量删除文件
-            for i in range(0, total_files, batch_size):
-                batch = files[i:i + batch_size]
-                print(f"\n📦 删除批次 {i//batch_size + 1}/{(total_files + batch_size - 1)//batch_size}")
-                
-                for file_info in batch:
-                    file_id = file_info.get('id')
-                    filename = file_info.get('filename', 'unknown')
-                    
-                    print(f"🗑️ 删除文件: {filename} (ID: {file_id})")
-                    
-                    if self.delete_file(file_id):
-                        result["success"] += 1
-                        print(f"✅ 文件删除成功: {filename}")
-                    else:
-                        result["failed"] += 1
-                        result["failed_files"].append({
-                            "file_id": file_id,
-                            "filename": filename
-                        })
-                        print(f"❌ 文件删除失败: {filename}")
-                    
-                    # 添加短暂延迟，避免请求过于频繁
-                    import time
-                    time.sleep(0.1)
-            
-            print(f"\n📊 删除完成统计:")
-            print(f"   总文件数: {result['total']}")
-            print(f"   删除成功: {result['success']}")
-            print(f"   删除失败: {result['failed']}")
-            
-            if result["failed_files"]:
-                print(f"   失败文件列表:")
-                for failed_file in result["failed_files"]:
-                    print(f"     - {failed_file['filename']} (ID: {failed_file['file_id']})")
-            
-            return result
-            
-        except Exception as e:
-            print(f"❌ 删除所有文件步骤失败: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "total": 0,
-                "success": 0,
-                "failed": 0,
-                "failed_files": [],
-                "error": str(e)
-            }
+        if require_confirmation:
+            print("\n🗑️ 是否要删除所有文件？此操作不可恢复！")
+            user_input = input("请输入 yes/Y 确认删除，或其他键跳过: ")
+            if user_input.lower() not in ['yes', 'y']:
+                print("\n⏭️ 跳过删除文件操作")
+                return {"total": 0, "success": 0, "failed": 0, "failed_files": [], "skipped": True}
+        return self.cleanup_files(purpose, concurrency=batch_size)
+
+    async def get_file_info_async(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取特定文件的详细信息（异步）
+        
+        Args:
+            file_id: 文件ID
+        
+        Returns:
+            文件详细信息，文件不存在或请求失败返回None
+        """
+        return await get_file_info_async(file_id, self.api_key)
     
-    def upload_file(self, file_path: str, purpose: str = "file-extract") -> Optional[str]:
+    async def find_reusable_upload_async(self, content_hash: str, file_size: int, purpose: str = "file-extract") -> Optional[str]:
         """
-        上传文件到GLM服务器
+        在登记表中查找可复用的已上传文件，并向服务器确认其仍然有效
+        
+        Args:
+            content_hash: 文件内容SHA-256
+            file_size: 文件大小
+            purpose: 文件用途
+        
+        Returns:
+            可复用的文件ID，没有有效记录返回None（服务器确认不存在或ID、大小不符的记录会被自动清除；
+            网络错误、5xx或熔断等临时失败时保留记录并复用）
+        """
+        entry = self.registry.lookup(content_hash, purpose)
+        if not entry:
+            return None
+        
+        file_id = entry["file_id"]
+        response = await get_file_info_response_async(file_id, self.api_key)
+        if response is None or response.status_code not in (200, 404):
+            # 无法确认文件已失效，不清除记录；文件确已失效时后续抽取会失败，下次运行再确认
+            logger.warning("⚠️ 无法确认已上传文件是否有效（%s），保留登记记录并复用: %s",
+                           "请求失败" if response is None else f"状态码 {response.status_code}", file_id)
+            return file_id
+        
+        file_info = response.json() if response.status_code == 200 else None
+        if file_info and file_info.get("id") == file_id and file_info.get("bytes", file_size) == file_size:
+            logger.info("♻️ 复用已上传文件，文件ID: %s", file_id)
+            return file_id
+        
+        logger.info("🧹 已上传文件失效，清除登记记录: %s", file_id)
+        self.registry.forget(content_hash, purpose)
+        return None
+    
+    async def upload_file_async(self, file_path: str, purpose: str = "file-extract", reuse: bool = True) -> Optional[str]:
+        """
+        上传文件到GLM服务器（异步），相同内容的文件已在服务器上时直接复用
         
         Args:
             file_path: 本地文件路径
             purpose: 文件用途，默认为file-extract
+            reuse: 是否通过登记表复用已上传的文件
         
         Returns:
             上传成功返回文件ID，失败返回None
         """
-        try:
-            print(f"📤 上传文件: {file_path}")
-            
-            if not os.path.exists(file_path):
-                print(f"❌ 文件不存在: {file_path}")
-                return None
-            
-            file_size = os.path.getsize(file_path)
-            print(f"📁 文件大小: {file_size} bytes")
-            
-            url = f"{self.base_url}/files"
-            file_name = os.path.basename(file_path)
-            print(f"📄 文件名: {file_name}")
-            
-            with open(file_path, 'rb') as f:
-                files = {'file': (file_name, f)}
-                data = {'purpose': purpose}
-                
-                print(f"🌐 发送请求到: {url}")
-                
-                # 增强重试机制
-                max_retries = 3
-                retry_delay = 5  # 秒
-                for attempt in range(max_retries):
-                    try:
-                        print(f"🔄 尝试 {attempt + 1}/{max_retries}")
-                        response = requests.post(url, headers=self.headers, files=files, data=data, timeout=60)
-                        if response.status_code == 200:
-                            break
-                        else:
-                            print(f"⚠️ 请求失败，状态码: {response.status_code}")
-                            if attempt < max_retries - 1:
-                                print(f"⏳ {retry_delay}秒后重试...")
-                                import time
-                                time.sleep(retry_delay)
-                    except requests.exceptions.RequestException as e:
-                        print(f"❌ 第{attempt + 1}次请求失败: {e}")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ {retry_delay}秒后重试...")
-                            import time
-                            time.sleep(retry_delay)
-                
-                print(f"📊 响应状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    print(f"✅ 响应数据: {data}")
-                    file_id = data.get("id", "")
-                    if file_id:
-                        print(f"🎯 文件上传成功，文件ID: {file_id}")
-                        return file_id
-                    else:
-                        print("❌ 响应中未找到id")
-                        return None
-                else:
-                    print(f"❌ 服务器响应错误: {response.text}")
-                    return None
-                    
-        except requests.exceptions.Timeout:
-            print("❌ 请求超时")
-            return None
-        except requests.exceptions.ConnectionError:
-            print("❌ 网络连接错误")
-            return None
-        except requests.exceptions.RequestException as e:
-            print(f"❌ 请求异常: {e}")
+        logger.info("📤 上传文件: %s", file_path)
+        
+        if not os.path.exists(file_path):
+            logger.error("❌ 文件不存在: %s", file_path)
             return None
-        except Exception as e:
-            print(f"❌ 文件上传步骤失败: {e}")
-            import traceback
-            traceback.print_exc()
+        
+        file_size = os.path.getsize(file_path)
+        content_hash = None
+        if reuse:
+            content_hash = await asyncio.to_thread(file_sha256, file_path)
+            file_id = await self.find_reusable_upload_async(content_hash, file_size, purpose)
+            if file_id:
+                return file_id
+        
+        file_id = await upload_file_async(file_path, self.api_key, purpose)
+        if not file_id:
             return None
-
+        
+        if content_hash:
+            self.registry.record(content_hash, file_id, os.path.basename(file_path), file_size, purpose)
+        return file_id
+    
+    def upload_file(self, file_path: str, purpose: str = "file-extract", reuse: bool = True) -> Optional[str]:
+        """
+        上传文件到GLM服务器，相同内容的文件已在服务器上时直接复用
+        
+        Args:
+            file_path: 本地文件路径
+            purpose: 文件用途，默认为file-extract
+            reuse: 是否通过登记表复用已上传的文件
+        
+        Returns:
+            上传成功返回文件ID，失败返回None
+        """
+        return run_sync(self.upload_file_async(file_path, purpose, reuse))
 
 def get_file_list_example(api_key: str, limit: int = 20, purpose: str = "file-extract") -> List[Dict[str, Any]]:
     """
@@ -351,7 +489,7 @@ def load_api_key() -> str:
     # 1. 首先尝试从环境变量获取
     api_key = os.getenv("ZHIPUAI_API_KEY")
     if api_key:
-        print("✅ 从环境变量加载API密钥")
+        logger.info("✅ 从环境变量加载API密钥")
         return api_key
     
     # 2. 尝试从.env文件加载
@@ -360,35 +498,43 @@ def load_api_key() -> str:
         load_dotenv()
         api_key = os.getenv("ZHIPUAI_API_KEY")
         if api_key:
-            print("✅ 从.env文件加载API密钥")
+            logger.info("✅ 从.env文件加载API密钥")
             return api_key
     except ImportError:
-        print("⚠️ 未安装python-dotenv库，跳过.env文件加载")
+        logger.warning("⚠️ 未安装python-dotenv库，跳过.env文件加载")
     
     # 3. 尝试从配置文件加载
     try:
-        config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "model_config.yaml")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            # 尝试从glm-4.5v配置获取API密钥
-            if 'models' in config and 'glm-4.5v' in config['models']:
-                api_key = config['models']['glm-4.5v'].get('api_key')
-                if api_key:
-                    print("✅ 从配置文件(glm-4.5v)加载API密钥")
-                    return api_key
-            # 尝试从glm-4.5-air配置获取API密钥
-            if 'models' in config and 'glm-4.5-air' in config['models']:
-                api_key = config['models']['glm-4.5-air'].get('api_key')
-                if api_key:
-                    print("✅ 从配置文件(glm-4.5-air)加载API密钥")
-                    return api_key
+        registry = get_registry()
+        for model_type in ("glm-4.5v", "glm-4.5-air"):
+            api_key = registry.get_api_key(model_type)
+            if api_key:
+                logger.info("✅ 从配置文件(%s)加载API密钥", model_type)
+                return api_key
     except Exception as e:
-        print(f"⚠️ 从配置文件加载API密钥失败: {e}")
+        logger.warning("⚠️ 从配置文件加载API密钥失败: %s", e)
     
     return None
 
 
 if __name__ == "__main__":
+    import argparse
+    try:
+        from .log_config import configure_logging
+    except ImportError:
+        from utils.log_config import configure_logging
+    configure_logging()
+
+    parser = argparse.ArgumentParser(description="GLM文件管理器：查看并清理服务器上的文件")
+    parser.add_argument("--cleanup", action="store_true", help="非交互式清理，按下列条件并发删除文件")
+    parser.add_argument("--purpose", default="file-extract", help="文件用途 (默认: file-extract)")
+    parser.add_argument("--older-than-hours", type=float, help="只删除上传时间早于该小时数之前的文件")
+    parser.add_argument("--filename", help="只删除文件名匹配该通配符的文件，例如 \"*.pdf\"")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CLEANUP_CONCURRENCY,
+                        help=f"同时进行的删除请求数量 (默认: {DEFAULT_CLEANUP_CONCURRENCY})")
+    parser.add_argument("--dry-run", action="store_true", help="只列出符合条件的文件，不删除")
+    args = parser.parse_args()
+
     # 示例用法
     print("🚀 === GLM文件管理器示例 ===")
     print("正在尝试从多个来源加载API密钥...")
@@ -407,6 +553,16 @@ if __name__ == "__main__":
     # 创建文件管理器实例
     file_manager = GLMFileManager(api_key)
     
+    if args.cleanup:
+        older_than = args.older_than_hours * 3600 if args.older_than_hours is not None else None
+        result = file_manager.cleanup_files(args.purpose, older_than=older_than, filename_pattern=args.filename,
+                                            concurrency=args.concurrency, dry_run=args.dry_run)
+        if args.dry_run:
+            for file_info in result.get("files", []):
+                print(f"{file_info.get('id')}  {file_info.get('created_at')}  {file_info.get('filename')}")
+        print(f"清理结果: 符合条件 {result['total']} 个，删除成功 {result['success']} 个，失败 {result['failed']} 个")
+        exit(1 if result["failed"] or result.get("error") else 0)
+    
     # 获取文件列表
     print("\n📋 获取文件列表:")
     files = file_manager.get_file_list(limit=10)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对冲请求 - 调用耗时超过近期P95时再发一个相同的请求，取先完成的结果并取消另一个，额外请求数按比例限额
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+try:
+    from .config_registry import get_registry
+    from .metrics import get_metrics
+except ImportError:
+    from utils.config_registry import get_registry
+    from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_HEDGE_QUANTILE = 0.95
+DEFAULT_MIN_SAMPLES = 20  # 样本不足时不对冲
+DEFAULT_WINDOW = 200  # 只使用最近这些次成功调用的耗时
+DEFAULT_MAX_EXTRA_RATIO = 0.1  # 对冲请求数不超过原始调用数的该比例
+DEFAULT_MAX_BURST = 5  # 累积的对冲额度上限，避免长时间空闲后集中对冲
+
+
+class Hedger:
+    """
+    一类调用的对冲器，线程安全
+
+    每次调用积累 max_extra_ratio 个对冲额度，发出一个对冲请求消耗1个额度，因此长期的额外请求数
+    不超过原始调用数的 max_extra_ratio；延迟按最近成功调用耗时的分位数计算。
+    """
+
+    def __init__(self, name: str, quantile: float = DEFAULT_HEDGE_QUANTILE, min_samples: int = DEFAULT_MIN_SAMPLES,
+                 window: int = DEFAULT_WINDOW, max_extra_ratio: float = DEFAULT_MAX_EXTRA_RATIO,
+                 max_burst: float = DEFAULT_MAX_BURST):
+        """
+        初始化对冲器
+
+        Args:
+            name: 名称，用于日志和指标
+            quantile: 触发对冲的耗时分位数
+            min_samples: 开始对冲前至少需要的耗时样本数
+            window: 计算分位数使用的最近样本数
+            max_extra_ratio: 对冲请求数占原始调用数的比例上限
+            max_burst: 累积的对冲额度上限
+        """
+        self.name = name
+        self.quantile = min(max(quantile, 0.0), 1.0)
+        self.min_samples = max(1, min_samples)
+        self.max_extra_ratio = max(0.0, max_extra_ratio)
+        self.max_burst = max(1.0, max_burst)
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=max(self.min_samples, window))
+        self._credit = 0.0
+
+    def record_latency(self, seconds: float) -> None:
+        """记录一次成功调用的耗时"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """发出对冲请求前等待的时间（最近耗时的分位数），样本不足时返回None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+    def _add_credit(self) -> None:
+        with self._lock:
+            self._credit = min(self.max_burst, self._credit + self.max_extra_ratio)
+
+    def _try_spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            return True
+
+    async def run(self, make_call: Callable[[], Awaitable[Optional[T]]], label: str) -> Optional[T]:
+        """
+        执行调用，超过对冲延迟仍未完成时再发一个相同的调用，返回先成功的结果
+
+        耗时样本从进入本方法时开始计算，每次调用只记录一个样本；对冲请求胜出时记录的是调用方实际等待的时间
+        （也是被取消的首个请求真实耗时的下限），避免只保留快的调用使P95偏低。被取消的调用等待其结束后再返回。
+
+        Args:
+            make_call: 创建调用的函数，可能被调用两次，调用不能有副作用（例如写入输出文件）
+            label: 日志中使用的调用名称
+
+        Returns:
+            先成功完成的调用结果；两个调用都失败（返回None）时返回None
+
+        Raises:
+            Exception: 调用抛出的异常（如截止时间已到）；发出对冲请求后，两个调用都失败时才抛出
+        """
+        start = time.monotonic()
+        self._add_credit()
+        primary = asyncio.ensure_future(make_call())
+        delay = self.hedge_delay()
+        try:
+            if delay is None:
+                return self._record(await primary, start)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return self._record(primary.result(), start)
+            if not self._try_spend():
+                get_metrics().inc("hedge_budget_exhausted_total", hedger=self.name)
+                return self._record(await primary, start)
+
+            logger.info("🏁 %s超过 %.1f秒未完成，发出对冲请求", label, delay)
+            get_metrics().inc("hedged_requests_total", hedger=self.name)
+            hedge = asyncio.ensure_future(make_call())
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is not None:
+                            # 另一个调用仍可能成功，两个都失败后再抛出
+                            error = error or task.exception()
+                            continue
+                        result = task.result()
+                        if result is not None:
+                            if task is hedge:
+                                get_metrics().inc("hedge_wins_total", hedger=self.name)
+                                logger.info("🏁 %s对冲请求先完成", label)
+                            return self._record(result, start)
+                if error is not None:
+                    raise error
+                return None
+            finally:
+                for task in pending:
+                    task.cancel()
+                # 等待被取消的调用结束，释放其连接和并发名额，也避免未取回的异常
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            if not primary.done():
+                primary.cancel()
+                await asyncio.gather(primary, return_exceptions=True)
+
+    def _record(self, result: Optional[T], start: float) -> Optional[T]:
+        """调用成功时记录从开始到现在的耗时"""
+        if result is not None:
+            self.record_latency(time.monotonic() - start)
+        return result
+
+
+_hedgers: Dict[str, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+
+def hedging_enabled() -> bool:
+    """配置 hedging.enabled 是否开启"""
+    return bool(get_registry().get_section("hedging").get("enabled", False))
+
+
+def get_hedger(name: str) -> Hedger:
+    """获取进程内共享的对冲器，参数读取配置中的 hedging 段"""
+    with _hedgers_lock:
+        hedger = _hedgers.get(name)
+        if hedger is None:
+            config = get_registry().get_section("hedging")
+            hedger = _hedgers[name] = Hedger(
+                name,
+                quantile=config.get("quantile", DEFAULT_HEDGE_QUANTILE),
+                min_samples=config.get("min_samples", DEFAULT_MIN_SAMPLES),
+                window=config.get("window", DEFAULT_WINDOW),
+                max_extra_ratio=config.get("max_extra_ratio", DEFAULT_MAX_EXTRA_RATIO),
+            )
+        return hedger
+
+
+def reset_hedgers() -> None:
+    """丢弃所有对冲器的耗时样本和额度（测试和压测在两轮之间调用）"""
+    with _hedgers_lock:
+        _hedgers.clear()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端 - 带连接池和长连接的httpx客户端，以及同步调用使用的后台事件循环
+"""
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from typing import Awaitable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """连接池配置"""
+    max_connections: int = 100  # 连接池总连接数上限
+    max_keepalive_connections: int = 20  # 保持空闲长连接的数量上限
+    keepalive_expiry: float = 30.0  # 空闲长连接的保留时间（秒）
+    max_connections_per_host: int = 32  # 同一主机同时进行的请求数量上限
+
+
+_pool_config = PoolConfig()
+
+# 每个事件循环各自持有一个客户端和一组按主机划分的信号量
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_thread: Optional[threading.Thread] = None
+_sync_lock = threading.Lock()
+
+
+def configure_pool(**kwargs) -> PoolConfig:
+    """
+    修改连接池配置，只对之后新建的客户端生效
+
+    Args:
+        **kwargs: PoolConfig 的字段
+
+    Returns:
+        新的连接池配置
+    """
+    global _pool_config
+    _pool_config = replace(_pool_config, **kwargs)
+    return _pool_config
+
+
+def get_pool_config() -> PoolConfig:
+    """获取当前连接池配置"""
+    return _pool_config
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的异步HTTP客户端，不存在时按连接池配置创建"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        config = _pool_config
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+def host_semaphore(url: str) -> asyncio.Semaphore:
+    """获取限制单个主机并发请求数量的信号量"""
+    loop = asyncio.get_running_loop()
+    semaphores = _host_semaphores.setdefault(loop, {})
+    host = urlsplit(url).netloc
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, _pool_config.max_connections_per_host))
+        semaphores[host] = semaphore
+    return semaphore
+
+
+async def close_async_client() -> None:
+    """关闭当前事件循环的共享客户端（在事件循环结束前调用）"""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    _host_semaphores.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）同步包装函数使用的后台事件循环"""
+    global _sync_loop, _sync_thread
+    with _sync_lock:
+        if _sync_loop is None or _sync_loop.is_closed():
+            _sync_loop = asyncio.new_event_loop()
+            _sync_thread = threading.Thread(target=_sync_loop.run_forever, name="glm-http-loop", daemon=True)
+            _sync_thread.start()
+        return _sync_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    在同步代码中运行协程
+
+    所有同步调用共用一个后台事件循环，因此也共用同一个连接池，连续的同步调用可以复用长连接。
+    """
+    loop = _get_sync_loop()
+    if threading.current_thread() is _sync_thread:
+        raise RuntimeError("不能在后台事件循环内部调用同步包装函数，请直接 await 对应的异步函数")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内嵌图片分析 - 检测 .docx 的 word/media 和PDF的图片XObject，只把实际嵌入的图片并行交给视觉模型，结果按图片内容哈希缓存
+"""
+import os
+import re
+import base64
+import asyncio
+import hashlib
+import logging
+import zipfile
+import posixpath
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from .glm_client import chat_completion_async, extract_message_content
+    from .config_registry import get_registry
+    from .extraction_cache import ExtractionCache, cache_disabled_by_env, text_sha256
+    from .metrics import STAGE_IMAGE_ANALYSIS, get_metrics
+    from .pdf_splitter import HAS_PYPDF
+    from .resilience import CALL_IMAGE
+except ImportError:
+    from utils.glm_client import chat_completion_async, extract_message_content
+    from utils.config_registry import get_registry
+    from utils.extraction_cache import ExtractionCache, cache_disabled_by_env, text_sha256
+    from utils.metrics import STAGE_IMAGE_ANALYSIS, get_metrics
+    from utils.pdf_splitter import HAS_PYPDF
+    from utils.resilience import CALL_IMAGE
+
+logger = logging.getLogger(__name__)
+
+if HAS_PYPDF:
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+
+# 图片分析使用的视觉模型
+VISION_MODEL = "glm-4.5v"
+IMAGE_MAX_TOKENS = 1000
+
+DEFAULT_IMAGE_CONCURRENCY = 4
+DEFAULT_MAX_IMAGES = 20  # 每个文档最多分析的图片数量
+DEFAULT_MIN_IMAGE_BYTES = 4096  # 小于该大小的图片（图标、项目符号、分隔线等）不分析
+
+DOCX_MEDIA_PREFIX = "word/media/"
+
+# Markdown图片链接，本地解析 .docx 时生成 ![图片](word/media/image1.png)
+IMAGE_LINK_PATTERN = re.compile(r"!\[[^\]]*\]\(([^)\s]+)\)")
+
+# 视觉模型可以直接读取的图片格式；EMF/WMF等矢量图和未压缩的PDF位图需要转码，不做分析
+_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".bmp": "image/bmp",
+    ".webp": "image/webp",
+}
+_PDF_FILTER_MIME_TYPES = {
+    "/DCTDecode": "image/jpeg",
+    "/JPXDecode": "image/jp2",
+}
+
+# 图片分析提示词，提示词文件中的 image_analysis_prompt 优先
+DEFAULT_IMAGE_PROMPT = ("请描述这张文档插图：给出一个简短的标题，说明图片展示的内容；"
+                        "如果图片包含文字、表格或图表数据，请完整提取。直接返回Markdown，不要添加额外说明。")
+
+# 图片描述缓存（按图片内容、提示词、模型和max_tokens寻址），与抽取结果缓存分开存放
+image_cache = ExtractionCache(subdir="images")
+
+
+@dataclass
+class EmbeddedImage:
+    """文档中嵌入的一张图片"""
+    name: str  # 在文档中的位置：.docx 为压缩包内路径，PDF为 第N页/XObject名称
+    data: bytes
+    mime_type: str
+    aliases: List[str] = field(default_factory=list)  # 内容相同、按内容去重时合并到这张图片的其他位置
+
+    @property
+    def sha256(self) -> str:
+        return hashlib.sha256(self.data).hexdigest()
+
+
+def _docx_images(file_path: str) -> List[EmbeddedImage]:
+    """读取 .docx 压缩包中 word/media 下的图片"""
+    images = []
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            for name in archive.namelist():
+                mime_type = _MIME_TYPES.get(posixpath.splitext(name)[1].lower())
+                if name.startswith(DOCX_MEDIA_PREFIX) and mime_type:
+                    images.append(EmbeddedImage(name, archive.read(name), mime_type))
+    except (OSError, zipfile.BadZipFile) as e:
+        logger.debug("无法读取Word文档中的图片 %s: %s", file_path, e)
+    return images
+
+
+def _pdf_images(file_path: str) -> List[EmbeddedImage]:
+    """读取PDF各页资源中的图片XObject（只取JPEG/JPEG 2000编码的图片，其余需要转码的位图跳过）"""
+    if not HAS_PYPDF:
+        return []
+    images = []
+    skipped = 0
+    try:
+        reader = PdfReader(file_path)
+        for page_number, page in enumerate(reader.pages, start=1):
+            try:
+                xobjects = page["/Resources"].get_object().get("/XObject")
+            except (KeyError, AttributeError, TypeError):
+                continue
+            if xobjects is None:
+                continue
+            for xobject_name, ref in xobjects.get_object().items():
+                xobject = ref.get_object()
+                if xobject.get("/Subtype") != "/Image":
+                    continue
+                filters = xobject.get("/Filter")
+                filters = list(filters) if isinstance(filters, list) else [filters]
+                mime_type = _PDF_FILTER_MIME_TYPES.get(filters[-1]) if filters else None
+                if not mime_type:
+                    skipped += 1
+                    continue
+                images.append(EmbeddedImage(f"第{page_number}页/{xobject_name.lstrip('/')}", xobject.get_data(),
+                                            mime_type))
+    except (OSError, PdfReadError, ValueError) as e:
+        logger.debug("无法读取PDF中的图片 %s: %s", file_path, e)
+    if skipped:
+        logger.debug("跳过 %s 张需要转码的PDF位图", skipped)
+    return images
+
+
+def collect_images(file_path: str, file_type: str, min_bytes: int = DEFAULT_MIN_IMAGE_BYTES) -> List[EmbeddedImage]:
+    """
+    检测文档中实际嵌入的图片（只读本地文件，不发送任何请求）
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型 (pdf, docx, doc)
+        min_bytes: 小于该大小的图片视为图标或装饰，不返回
+
+    Returns:
+        按出现顺序排列、按内容去重后的图片列表（重复图片的位置记在 aliases 中）；.doc 等无法读取的格式返回空列表
+    """
+    if file_type == "pdf":
+        images = _pdf_images(file_path)
+    elif file_type == "docx" or zipfile.is_zipfile(file_path):
+        images = _docx_images(file_path)
+    else:
+        images = []
+
+    unique: Dict[str, EmbeddedImage] = {}
+    for image in images:
+        if len(image.data) < min_bytes:
+            continue
+        first = unique.setdefault(image.sha256, image)
+        if first is not image:
+            first.aliases.append(image.name)
+    return list(unique.values())
+
+
+def _image_cache_key(image: EmbeddedImage, prompt: str) -> str:
+    return ExtractionCache.make_key(image.sha256, text_sha256(prompt), VISION_MODEL, IMAGE_MAX_TOKENS)
+
+
+async def _describe_image_async(image: EmbeddedImage, prompt: str, api_key: str) -> str:
+    """调用视觉模型描述单张图片，失败返回空字符串"""
+    encoded = base64.b64encode(image.data).decode("ascii")
+    payload = {
+        "model": VISION_MODEL,
+        "messages": [{
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": f"data:{image.mime_type};base64,{encoded}"}},
+                {"type": "text", "text": prompt},
+            ],
+        }],
+        "max_tokens": IMAGE_MAX_TOKENS,
+        "temperature": 0.3,
+    }
+    image_data = await chat_completion_async(payload, api_key, label="图片分析API", stage=STAGE_IMAGE_ANALYSIS,
+                                             call_type=CALL_IMAGE)
+    return extract_message_content(image_data).strip() if image_data is not None else ""
+
+
+async def describe_images_async(images: List[EmbeddedImage], api_key: str,
+                                concurrency: int = DEFAULT_IMAGE_CONCURRENCY,
+                                use_cache: bool = True) -> Dict[str, str]:
+    """
+    并行调用视觉模型描述图片，相同内容的图片只分析一次
+
+    Args:
+        images: 待分析的图片
+        api_key: API密钥
+        concurrency: 同时发送的图片分析请求数量上限
+        use_cache: 是否使用图片描述缓存（同时受环境变量 DOC_EXTRACTION_NO_CACHE 控制）
+
+    Returns:
+        图片内容SHA-256到描述的映射，分析失败的图片不在其中
+    """
+    prompt = get_registry().get_prompt("image_analysis_prompt") or DEFAULT_IMAGE_PROMPT
+    use_cache = use_cache and not cache_disabled_by_env()
+    metrics = get_metrics()
+    descriptions: Dict[str, str] = {}
+    pending: List[EmbeddedImage] = []
+    for image in images:
+        cached = image_cache.get(_image_cache_key(image, prompt)) if use_cache else None
+        if cached:
+            descriptions[image.sha256] = cached
+        else:
+            pending.append(image)
+    if descriptions:
+        metrics.inc("image_cache_hits_total", len(descriptions))
+        logger.info("⚡ %s/%s 张图片命中图片描述缓存", len(descriptions), len(images))
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def describe(image: EmbeddedImage) -> None:
+        async with semaphore:
+            description = await _describe_image_async(image, prompt, api_key)
+        if not description:
+            logger.warning("⚠️ 图片分析失败: %s", image.name)
+            return
+        descriptions[image.sha256] = description
+        if use_cache:
+            try:
+                image_cache.put(_image_cache_key(image, prompt), description)
+            except OSError as e:
+                logger.warning("⚠️ 写入图片描述缓存失败: %s", e)
+
+    await asyncio.gather(*(describe(image) for image in pending))
+    return descriptions
+
+
+async def describe_document_images_async(file_path: str, file_type: str, api_key: str,
+                                         config: Optional[Dict[str, Any]] = None,
+                                         use_cache: bool = True) -> List[Tuple[EmbeddedImage, str]]:
+    """
+    检测并分析文档中嵌入的图片
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型 (pdf, docx, doc)
+        api_key: API密钥
+        config: 图片分析配置，默认读取配置中的 images 段
+        use_cache: 是否使用图片描述缓存
+
+    Returns:
+        (图片, 描述) 列表，按图片在文档中的顺序排列，分析失败的图片不在其中
+    """
+    config = get_registry().get_section("images") if config is None else config
+    if not config.get("enabled", True):
+        return []
+    images = await asyncio.to_thread(collect_images, file_path, file_type,
+                                     config.get("min_bytes", DEFAULT_MIN_IMAGE_BYTES))
+    if not images:
+        logger.debug("文档中没有需要分析的嵌入图片")
+        return []
+    max_images = config.get("max_images", DEFAULT_MAX_IMAGES)
+    if len(images) > max_images:
+        logger.warning("⚠️ 文档包含 %s 张图片，只分析前 %s 张", len(images), max_images)
+        images = images[:max_images]
+
+    logger.info("🖼️ 检测到 %s 张嵌入图片，并行分析", len(images))
+    descriptions = await describe_images_async(images, api_key, config.get("concurrency", DEFAULT_IMAGE_CONCURRENCY),
+                                               use_cache=use_cache)
+    described = [(image, descriptions[image.sha256]) for image in images if image.sha256 in descriptions]
+    if described:
+        logger.info("✅ 成功分析 %s/%s 张图片", len(described), len(images))
+    return described
+
+
+def format_image_section(described: List[Tuple[EmbeddedImage, str]]) -> str:
+    """生成"图片内容"章节，图片按列表顺序编号；列表为空时返回空字符串"""
+    if not described:
+        return ""
+    sections = [f"### 图片{index}（{image.name}）\n\n{description}"
+                for index, (image, description) in enumerate(described, start=1)]
+    return "## 图片内容\n\n" + "\n\n".join(sections)
+
+
+def link_image_descriptions(markdown: str, described: List[Tuple[EmbeddedImage, str]]) -> str:
+    """
+    把Markdown中指向文档内图片的链接（如 ![图片](word/media/image1.png)）替换为编号引用 [图片N]，
+    并在末尾追加对应编号的"图片内容"章节
+
+    未得到描述的 word/media 图片（图标、矢量图、分析失败等）的链接替换为 [图片]，不保留指向压缩包内部的失效链接。
+
+    Args:
+        markdown: 本地解析得到的Markdown
+        described: describe_document_images_async 的结果
+
+    Returns:
+        替换链接并追加图片章节后的Markdown
+    """
+    # 内容相同的图片只描述一次，文档中的每个位置都按内容哈希找到同一条描述
+    by_hash = {image.sha256: (image, description) for image, description in described}
+    hash_by_name = {name: image.sha256 for image, _ in described for name in (image.name, *image.aliases)}
+    ordered: List[Tuple[EmbeddedImage, str]] = []
+    numbers: Dict[str, int] = {}
+
+    def replace(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        content_hash = hash_by_name.get(name)
+        if content_hash is None:
+            return "[图片]" if name.startswith(DOCX_MEDIA_PREFIX) else match.group(0)
+        if content_hash not in numbers:
+            ordered.append(by_hash[content_hash])
+            numbers[content_hash] = len(ordered)
+        return f"[图片{numbers[content_hash]}]"
+
+    markdown = IMAGE_LINK_PATTERN.sub(replace, markdown)
+    # 正文中没有引用的图片（例如被模型整理时去掉了链接）排在最后
+    ordered.extend(item for item in described if item[0].sha256 not in numbers)
+    section = format_image_section(ordered)
+    return markdown + "\n\n---\n\n" + section if section else markdown
+
+
+async def analyze_document_images_async(file_path: str, file_type: str, api_key: str,
+                                        config: Optional[Dict[str, Any]] = None, use_cache: bool = True) -> str:
+    """
+    分析文档中嵌入的图片，生成追加到抽取结果末尾的"图片内容"章节
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型 (pdf, docx, doc)
+        api_key: API密钥
+        config: 图片分析配置，默认读取配置中的 images 段
+        use_cache: 是否使用图片描述缓存
+
+    Returns:
+        Markdown章节；没有可分析的图片或全部分析失败时返回空字符串
+    """
+    return format_image_section(await describe_document_images_async(file_path, file_type, api_key, config,
+                                                                      use_cache))
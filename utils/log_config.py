@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置 - 按级别输出日志，支持文本和JSON两种格式
+
+各模块通过 logging.getLogger(__name__) 获取日志器并使用 %s 占位符延迟格式化，
+大段的响应内容只在 DEBUG 级别输出；命令行入口调用 configure_logging 安装处理器。
+"""
+import os
+import sys
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, TextIO
+
+# 未指定时读取的环境变量
+LOG_LEVEL_ENV = "DOC_EXTRACTION_LOG_LEVEL"
+LOG_FORMAT_ENV = "DOC_EXTRACTION_LOG_FORMAT"
+
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_FORMAT_TEXT = "text"
+LOG_FORMAT_JSON = "json"
+LOG_FORMATS = (LOG_FORMAT_TEXT, LOG_FORMAT_JSON)
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+TEXT_DATE_FORMAT = "%H:%M:%S"
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class LoggingConfigError(ValueError):
+    """日志级别或格式不正确"""
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，便于日志采集系统解析"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None,
+                      stream: Optional[TextIO] = None) -> None:
+    """
+    为根日志器安装（或替换）处理器
+
+    Args:
+        level: 日志级别（DEBUG/INFO/WARNING/ERROR），默认读取 DOC_EXTRACTION_LOG_LEVEL，未设置时为INFO
+        log_format: 日志格式（text/json），默认读取 DOC_EXTRACTION_LOG_FORMAT，未设置时为text
+        stream: 输出流，默认标准错误
+    """
+    level_name = (level or os.getenv(LOG_LEVEL_ENV) or DEFAULT_LOG_LEVEL).upper()
+    numeric_level = logging.getLevelName(level_name)
+    if not isinstance(numeric_level, int):
+        raise LoggingConfigError(f"未知的日志级别: {level_name}")
+    log_format = (log_format or os.getenv(LOG_FORMAT_ENV) or LOG_FORMAT_TEXT).lower()
+    if log_format not in LOG_FORMATS:
+        raise LoggingConfigError(f"未知的日志格式: {log_format}，可选: {', '.join(LOG_FORMATS)}")
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == LOG_FORMAT_JSON:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, TEXT_DATE_FORMAT))
+    # 标记由本函数安装的处理器，重复调用时只替换它，不影响调用方自己添加的处理器
+    handler._doc_extraction = True
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, "_doc_extraction", False):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(numeric_level)
+    # httpx 在INFO级别会记录每个请求，只在DEBUG时保留
+    logging.getLogger("httpx").setLevel(numeric_level if numeric_level <= logging.DEBUG else logging.WARNING)
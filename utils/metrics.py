@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标 - 各阶段耗时直方图、重试次数、收发字节数和token用量，可导出为JSON Lines或Prometheus文本格式
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 指标名称前缀
+METRIC_PREFIX = "doc_extraction"
+
+# 阶段耗时直方图的桶上限（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# 阶段名称
+STAGE_UPLOAD = "upload"
+STAGE_FILE_CONTENT = "file_content"
+STAGE_CHAT_COMPLETION = "chat_completion"
+STAGE_IMAGE_ANALYSIS = "image_analysis"
+STAGE_FILE_SAVE = "file_save"
+STAGE_DOCUMENT = "document"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    """累计分桶直方图（只保存各桶计数、总和与次数，不保存样本）"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """各桶的累计计数（不含 +Inf 桶）"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """进程内的指标注册表，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """向直方图记录一个观测值"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """累加计数器"""
+        if not value:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        """获取计数器的值，不存在时为0"""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    @contextmanager
+    def timed(self, stage: str, **labels: Any) -> Iterator[None]:
+        """
+        记录代码块耗时到 stage_duration_seconds 直方图
+
+        代码块抛出异常时额外带上 outcome=error 标签，正常结束为 outcome=ok。
+        """
+        start = time.monotonic()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.observe("stage_duration_seconds", time.monotonic() - start, stage=stage, outcome=outcome, **labels)
+
+    def record_usage(self, usage: Optional[Dict[str, Any]], stage: str, model: str) -> None:
+        """记录API响应中usage字段的token用量"""
+        if not isinstance(usage, dict):
+            return
+        for token_type in ("prompt", "completion"):
+            tokens = usage.get(f"{token_type}_tokens")
+            if isinstance(tokens, (int, float)):
+                self.inc("tokens_total", tokens, stage=stage, model=model, type=token_type)
+
+    def reset(self) -> None:
+        """清空所有指标"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        获取当前所有指标
+
+        Returns:
+            指标记录列表，计数器为 {type, name, labels, value}，
+            直方图为 {type, name, labels, count, sum, buckets}（buckets为各上限的累计计数）
+        """
+        with self._lock:
+            records: List[Dict[str, Any]] = []
+            for (name, labels), value in sorted(self._counters.items()):
+                records.append({"type": "counter", "name": name, "labels": dict(labels), "value": value})
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                records.append({
+                    "type": "histogram", "name": name, "labels": dict(labels),
+                    "count": histogram.count, "sum": round(histogram.sum, 6),
+                    "buckets": {f"{bound:g}": count for bound, count in histogram.cumulative()},
+                })
+            return records
+
+    def write_jsonl(self, path: str) -> None:
+        """
+        以JSON Lines格式追加写出当前指标，每个指标一行
+
+        同一次导出的记录带有相同的时间戳ts，多次运行可以追加到同一个文件中。
+        """
+        timestamp = round(time.time(), 3)
+        lines = [json.dumps(dict(record, ts=timestamp), ensure_ascii=False) for record in self.snapshot()]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + "\n")
+
+    def render_prometheus(self) -> str:
+        """以Prometheus文本格式输出当前指标"""
+        lines: List[str] = []
+        declared = set()
+        for record in self.snapshot():
+            full_name = f"{METRIC_PREFIX}_{record['name']}"
+            if full_name not in declared:
+                declared.add(full_name)
+                lines.append(f"# TYPE {full_name} {record['type']}")
+            labels = record["labels"]
+            if record["type"] == "counter":
+                lines.append(f"{full_name}{_format_labels(labels)} {record['value']:g}")
+                continue
+            for bound, count in record["buckets"].items():
+                lines.append(f"{full_name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+            lines.append(f"{full_name}_bucket{_format_labels(dict(labels, le='+Inf'))} {record['count']}")
+            lines.append(f"{full_name}_sum{_format_labels(labels)} {record['sum']:g}")
+            lines.append(f"{full_name}_count{_format_labels(labels)} {record['count']}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write_prometheus(self, path: str) -> None:
+        """以Prometheus文本格式原子写出当前指标（可供node_exporter的textfile收集器读取）"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """获取进程内共享的指标注册表"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
@@ -4,31 +4,24 @@
 模型加载器
 """
 import os
-from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
-import yaml
+
+try:
+    from .config_registry import get_registry
+except ImportError:
+    from utils.config_registry import get_registry
 
 def get_glm_instance(model_type: str) -> ChatOpenAI:
     """根据配置文件和环境变量，以及指定的模型类型，创建并返回一个GLM实例"""
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    dotenv_path = os.path.join(base_dir, '.env')
-    load_dotenv(dotenv_path=dotenv_path)
-
-    config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config', 'model_config.yaml')
-    with open(config_path, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    model_config = config.get('models', {}).get(model_type)
-    
-    if model_config is None:
-        raise ValueError(f"错误: 在 model_config.yaml 中未找到 '{model_type}' 的配置。")
+    # 未找到模型配置时抛出 ConfigError（ValueError 的子类）
+    model_config = get_registry().get_model_config(model_type)
 
     provider = model_config.get("provider")
     
     llm = None
 
     if provider == "zhipu":
-        api_key = model_config.get("api_key", os.getenv("ZHIPUAI_API_KEY"))
+        api_key = get_registry().get_api_key(model_type) or os.getenv("ZHIPUAI_API_KEY")
         if not api_key:
             raise ValueError("错误: ZHIPUAI_API_KEY 环境变量未设置或api_key未在配置中提供。")
         
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF页码切分 - 将大PDF按页码范围切分为多个小文件，分别上传和抽取
+"""
+import os
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.errors import PdfReadError
+    HAS_PYPDF = True
+except ImportError:  # 未安装pypdf时不切分，整份文件上传
+    HAS_PYPDF = False
+
+DEFAULT_TARGET_RANGE_BYTES = 5 * 1024 * 1024  # 每个页码范围的目标大小 5MB
+DEFAULT_MAX_PAGES_PER_RANGE = 50
+
+
+class PdfSplitError(ValueError):
+    """PDF无法读取或切分"""
+
+
+@dataclass
+class PageRange:
+    """页码范围（从1开始，包含首尾）"""
+    index: int
+    start_page: int
+    end_page: int
+
+    @property
+    def label(self) -> str:
+        return f"p{self.start_page}-{self.end_page}"
+
+
+def count_pages(pdf_path: str) -> int:
+    """获取PDF页数"""
+    if not HAS_PYPDF:
+        raise PdfSplitError("未安装pypdf库，无法切分PDF")
+    try:
+        return len(PdfReader(pdf_path).pages)
+    except (OSError, PdfReadError) as e:
+        raise PdfSplitError(f"无法读取PDF {pdf_path}: {e}")
+
+
+def plan_page_ranges(page_count: int, file_size: int, target_range_bytes: int = DEFAULT_TARGET_RANGE_BYTES,
+                     max_pages_per_range: int = DEFAULT_MAX_PAGES_PER_RANGE) -> List[PageRange]:
+    """
+    按平均每页大小规划页码范围，使每个范围接近目标大小
+
+    Args:
+        page_count: 总页数
+        file_size: 文件大小（字节）
+        target_range_bytes: 每个范围的目标大小
+        max_pages_per_range: 每个范围的最大页数
+
+    Returns:
+        页码范围列表，按页码顺序
+    """
+    if page_count <= 0:
+        return []
+    bytes_per_page = max(1, file_size // page_count)
+    pages_per_range = max(1, min(max_pages_per_range, target_range_bytes // bytes_per_page))
+    range_count = math.ceil(page_count / pages_per_range)
+    # 平均分配页数，避免最后一个范围只有零星几页
+    pages_per_range = math.ceil(page_count / range_count)
+    return [
+        PageRange(index, start + 1, min(start + pages_per_range, page_count))
+        for index, start in enumerate(range(0, page_count, pages_per_range))
+    ]
+
+
+def write_page_ranges(pdf_path: str, ranges: List[PageRange], output_dir: str) -> List[Tuple[PageRange, str]]:
+    """
+    将指定页码范围写出为独立的PDF文件（源文件只读取一次）
+
+    Args:
+        pdf_path: 源PDF路径
+        ranges: 需要写出的页码范围
+        output_dir: 输出目录
+
+    Returns:
+        (页码范围, 子文件路径) 列表
+    """
+    if not HAS_PYPDF:
+        raise PdfSplitError("未安装pypdf库，无法切分PDF")
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    written = []
+    try:
+        reader = PdfReader(pdf_path)
+        for page_range in ranges:
+            writer = PdfWriter()
+            for page_number in range(page_range.start_page - 1, page_range.end_page):
+                writer.add_page(reader.pages[page_number])
+            range_path = os.path.join(output_dir, f"{stem}_{page_range.label}.pdf")
+            with open(range_path, 'wb') as f:
+                writer.write(f)
+            written.append((page_range, range_path))
+    except (OSError, PdfReadError, IndexError) as e:
+        raise PdfSplitError(f"切分PDF失败 {pdf_path}: {e}")
+    return written
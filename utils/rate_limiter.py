@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按模型的速率限制器 - 进程内共享的每分钟请求数/token数预算，遵守Retry-After，并按AIMD方式自动调整并发
+"""
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+try:
+    from .chunker import estimate_tokens
+    from .config_registry import get_registry
+    from .metrics import get_metrics
+except ImportError:
+    from utils.chunker import estimate_tokens
+    from utils.config_registry import get_registry
+    from utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MIN_CONCURRENCY = 1
+
+# 收到429但没有Retry-After时的暂停时间（秒），连续429时翻倍
+DEFAULT_THROTTLE_PAUSE = 1.0
+MAX_THROTTLE_PAUSE = 60.0
+
+# 并发减半后的冷却时间（秒）：同一波并发请求同时收到的429只减半一次
+DECREASE_COOLDOWN = 2.0
+
+# 等待并发名额时的轮询间隔（秒）；限制器在多个事件循环间共享，因此不使用绑定事件循环的同步原语
+CONCURRENCY_POLL_INTERVAL = 0.02
+
+# 请求中每张图片按该token数预估
+IMAGE_INPUT_TOKENS = 1000
+
+
+def estimate_request_tokens(payload: Dict[str, Any]) -> int:
+    """
+    预估一次聊天请求消耗的token数（输入估算 + max_tokens），用于预扣每分钟token预算
+
+    Args:
+        payload: 聊天完成请求体
+
+    Returns:
+        预估token数
+    """
+    tokens = 0
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += estimate_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    tokens += estimate_tokens(part.get("text") or "")
+                else:
+                    tokens += IMAGE_INPUT_TOKENS
+    return tokens + int(payload.get("max_tokens") or 0)
+
+
+class _Bucket:
+    """令牌桶，容量为每分钟预算，按秒匀速补充（调用方需持有锁）"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """取出amount还需要等待的秒数（超过容量的请求在桶满时放行）"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class RateLimitLease:
+    """一次请求占用的并发名额和预扣的token，请求结束后通过 record 登记结果"""
+    tokens: int
+    status: Optional[int] = None
+    retry_after: Optional[float] = None
+
+    def record(self, status: Optional[int], retry_after: Optional[float] = None) -> None:
+        """登记响应状态码（网络异常为None）和Retry-After秒数"""
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ModelRateLimiter:
+    """单个模型的速率限制器，线程安全，可在多个事件循环之间共享"""
+
+    def __init__(self, model: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, min_concurrency: int = DEFAULT_MIN_CONCURRENCY):
+        """
+        初始化速率限制器
+
+        Args:
+            model: 模型名称
+            rpm: 每分钟请求数上限，None表示不限制
+            tpm: 每分钟token数上限，None表示不限制
+            max_concurrency: 并发上限，成功的请求会让并发逐步恢复到该值
+            min_concurrency: 429/5xx后并发减半的下限
+        """
+        self.model = model
+        self._lock = threading.Lock()
+        self._requests: Optional[_Bucket] = None
+        self._tokens: Optional[_Bucket] = None
+        self.max_concurrency = self.min_concurrency = 1
+        self._limit = 1.0
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._decrease_until = 0.0
+        self._consecutive_throttles = 0
+        self._settings: Dict[str, Any] = {}
+        self.configure(rpm=rpm, tpm=tpm, max_concurrency=max_concurrency, min_concurrency=min_concurrency)
+
+    def configure(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                  max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                  min_concurrency: int = DEFAULT_MIN_CONCURRENCY) -> None:
+        """应用新的限制（配置未变化时不做任何事，已有的令牌桶和并发状态保留）"""
+        settings = {"rpm": rpm, "tpm": tpm, "max_concurrency": max_concurrency, "min_concurrency": min_concurrency}
+        with self._lock:
+            if settings == self._settings:
+                return
+            if rpm != self._settings.get("rpm"):
+                self._requests = _Bucket(rpm) if rpm else None
+            if tpm != self._settings.get("tpm"):
+                self._tokens = _Bucket(tpm) if tpm else None
+            self.max_concurrency = max(1, int(max_concurrency))
+            self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+            self._limit = float(self.max_concurrency) if not self._settings else \
+                min(max(self._limit, self.min_concurrency), self.max_concurrency)
+            self._settings = settings
+
+    @property
+    def concurrency_limit(self) -> int:
+        """当前允许的并发数"""
+        with self._lock:
+            return max(1, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        """正在进行的请求数"""
+        with self._lock:
+            return self._in_flight
+
+    def _try_acquire(self, tokens: int) -> float:
+        """尝试占用名额，成功返回0，否则返回建议的等待秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._resume_at:
+                return self._resume_at - now
+            if self._in_flight >= max(1, int(self._limit)):
+                return CONCURRENCY_POLL_INTERVAL
+            wait = max(self._requests.wait_time(1, now) if self._requests else 0.0,
+                       self._tokens.wait_time(tokens, now) if self._tokens else 0.0)
+            if wait > 0:
+                return wait
+            if self._requests:
+                self._requests.take(1, now)
+            if self._tokens:
+                self._tokens.take(tokens, now)
+            self._in_flight += 1
+            return 0.0
+
+    async def acquire(self, tokens: int = 0) -> RateLimitLease:
+        """
+        等待并发名额和每分钟预算，暂停期间（收到429后）一直等待
+
+        Args:
+            tokens: 预扣的token数
+
+        Returns:
+            请求结束后需要交给 release 的租约
+        """
+        start = time.monotonic()
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - start
+        if waited > CONCURRENCY_POLL_INTERVAL:
+            get_metrics().observe("rate_limit_wait_seconds", waited, model=self.model)
+            logger.debug("⏳ %s 等待速率限制 %.2f秒", self.model, waited)
+        return RateLimitLease(tokens)
+
+    def release(self, lease: RateLimitLease) -> None:
+        """
+        归还并发名额，并根据请求结果调整并发
+
+        200: 并发加 1/当前并发（约每一轮成功加1）；429: 并发减半，并按Retry-After暂停所有请求；
+        5xx: 并发减半；未成功的请求退还预扣的token。
+        """
+        status = lease.status
+        with self._lock:
+            now = time.monotonic()
+            self._in_flight = max(0, self._in_flight - 1)
+            if status != 200 and self._tokens:
+                self._tokens.give_back(lease.tokens)
+            if status == 200:
+                self._consecutive_throttles = 0
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / max(1.0, self._limit))
+                return
+            if status is None or (status != 429 and status < 500):
+                return
+            if status == 429:
+                self._consecutive_throttles += 1
+                pause = lease.retry_after
+                if pause is None:
+                    pause = min(MAX_THROTTLE_PAUSE, DEFAULT_THROTTLE_PAUSE * 2 ** (self._consecutive_throttles - 1))
+                self._resume_at = max(self._resume_at, now + pause)
+            if now >= self._decrease_until:
+                self._limit = max(float(self.min_concurrency), self._limit / 2)
+                self._decrease_until = now + DECREASE_COOLDOWN
+                limit = int(self._limit)
+            else:
+                return
+        get_metrics().inc("rate_limit_decreases_total", model=self.model, status=status)
+        logger.warning("⚠️ %s 收到 %s，并发降至 %s", self.model, status, limit)
+
+    def settle_tokens(self, reserved: int, usage: Optional[Dict[str, Any]]) -> None:
+        """按成功响应中的实际用量修正预扣的token（多退少补）"""
+        total = usage.get("total_tokens") if isinstance(usage, dict) else None
+        if not self._tokens or not isinstance(total, (int, float)):
+            return
+        with self._lock:
+            difference = reserved - total
+            if difference > 0:
+                self._tokens.give_back(difference)
+            else:
+                self._tokens.take(-difference, time.monotonic())
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0) -> AsyncIterator[RateLimitLease]:
+        """占用一个名额直到代码块结束，代码块内通过 lease.record 登记响应状态"""
+        lease = await self.acquire(tokens)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+
+_limiters: Dict[str, ModelRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limit_settings(model: str) -> Dict[str, Any]:
+    """读取配置中 rate_limits 段的模型限制，未单独配置的模型使用 default"""
+    section = get_registry().get_section("rate_limits")
+    settings = section.get(model) or section.get("default") or {}
+    return {
+        "rpm": settings.get("rpm"),
+        "tpm": settings.get("tpm"),
+        "max_concurrency": settings.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+        "min_concurrency": settings.get("min_concurrency", DEFAULT_MIN_CONCURRENCY),
+    }
+
+
+def get_rate_limiter(model: str) -> ModelRateLimiter:
+    """获取进程内共享的模型速率限制器（配置文件修改后自动应用新的限制）"""
+    settings = _limit_settings(model)
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = _limiters[model] = ModelRateLimiter(model, **settings)
+            return limiter
+    limiter.configure(**settings)
+    return limiter
+
+
+def reset_rate_limiters() -> None:
+    """丢弃所有速率限制器的状态（测试和压测在两轮之间调用）"""
+    with _limiters_lock:
+        _limiters.clear()
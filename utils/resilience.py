@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求弹性策略 - 按调用类型的超时与重试配置、带随机抖动的指数退避、可重试状态码分类和按主机的熔断器
+"""
+import time
+import random
+import logging
+import threading
+from dataclasses import dataclass, fields, replace
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    from .config_registry import ConfigError, get_registry
+except ImportError:
+    from utils.config_registry import ConfigError, get_registry
+
+logger = logging.getLogger(__name__)
+
+# 调用类型
+CALL_UPLOAD = "upload"
+CALL_FILE_CONTENT = "file_content"
+CALL_FILE_MANAGE = "file_manage"  # 文件信息、列表、删除
+CALL_CHAT = "chat"
+CALL_CHUNK = "chunk"
+CALL_STREAM = "stream"
+CALL_IMAGE = "image"
+
+# 可重试的状态码：超时、限流和临时性的服务端错误；其余4xx（参数错误、鉴权失败、文件不存在等）重试也不会成功
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+DEFAULT_CIRCUIT_FAILURE_THRESHOLD = 5
+DEFAULT_CIRCUIT_RESET_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class CallProfile:
+    """一类调用的超时和重试配置"""
+    max_attempts: int = 3
+    connect_timeout: float = 10.0
+    read_timeout: float = 60.0  # 流式调用为两次收到数据之间的最长等待时间
+    write_timeout: float = 60.0
+    base_delay: float = 1.0  # 第一次重试前的最长退避时间，之后每次翻倍
+    max_delay: float = 30.0
+
+    def timeout(self, budget: Optional[float] = None) -> httpx.Timeout:
+        """
+        转换为httpx超时配置（等待连接池空闲连接的时间与读取超时相同）
+
+        Args:
+            budget: 截止时间前的剩余时间（秒），提供时每项超时都不超过该值
+        """
+        def cap(value: float) -> float:
+            return value if budget is None else max(0.001, min(value, budget))
+
+        return httpx.Timeout(cap(self.read_timeout), connect=cap(self.connect_timeout),
+                             write=cap(self.write_timeout), pool=cap(self.read_timeout))
+
+
+DEFAULT_PROFILES: Dict[str, CallProfile] = {
+    CALL_UPLOAD: CallProfile(write_timeout=120.0, base_delay=2.0),
+    # 服务器解析大文件时返回内容较慢
+    CALL_FILE_CONTENT: CallProfile(read_timeout=300.0, base_delay=2.0),
+    # 调用方（上传复用检查、分页、清理）自行处理失败，只尝试一次
+    CALL_FILE_MANAGE: CallProfile(max_attempts=1, read_timeout=30.0),
+    CALL_CHAT: CallProfile(read_timeout=300.0, base_delay=2.0, max_delay=60.0),
+    CALL_CHUNK: CallProfile(read_timeout=120.0, base_delay=2.0, max_delay=60.0),
+    CALL_STREAM: CallProfile(read_timeout=120.0, base_delay=2.0, max_delay=60.0),
+    CALL_IMAGE: CallProfile(max_attempts=2, read_timeout=120.0, base_delay=2.0),
+}
+
+_PROFILE_FIELDS = {item.name for item in fields(CallProfile)}
+
+
+def get_profile(call_type: str, **overrides: Any) -> CallProfile:
+    """
+    获取调用类型的配置：内置默认值，叠加配置文件 transport.profiles 中的同名配置，再叠加调用方传入的参数
+
+    Args:
+        call_type: 调用类型
+        **overrides: CallProfile 的字段，值为None的字段忽略
+
+    Returns:
+        调用配置
+    """
+    profile = DEFAULT_PROFILES.get(call_type, CallProfile())
+    configured = (get_registry().get_section("transport").get("profiles") or {}).get(call_type) or {}
+    unknown = set(configured) - _PROFILE_FIELDS
+    if unknown:
+        raise ConfigError(f"transport.profiles.{call_type} 包含未知字段: {', '.join(sorted(unknown))}")
+    values = dict(configured)
+    values.update({name: value for name, value in overrides.items() if value is not None})
+    return replace(profile, **values) if values else profile
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """状态码对应的失败是否值得重试"""
+    return status_code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(profile: CallProfile, attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    计算第attempt次尝试（从0开始）失败后的等待时间
+
+    使用全抖动的指数退避，避免大量并发请求同时失败后又同时重试；服务器给出Retry-After时至少等待该时间。
+    """
+    delay = random.uniform(0, min(profile.max_delay, profile.base_delay * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CircuitBreaker:
+    """
+    按主机的熔断器，线程安全
+
+    连续失败（网络错误或5xx）达到阈值后熔断，熔断期间请求立即失败；经过恢复时间后放行一个探测请求，
+    探测成功则恢复，失败则继续熔断。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = DEFAULT_CIRCUIT_RESET_SECONDS):
+        """
+        初始化熔断器
+
+        Args:
+            name: 名称（主机地址），用于日志
+            failure_threshold: 触发熔断的连续失败次数
+            reset_seconds: 熔断后放行探测请求前的等待时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于熔断状态（含等待探测结果）"""
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """当前是否可以发送请求（恢复时间已过时放行一个探测请求）"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            # 探测请求未登记结果（例如被取消）时，超过恢复时间后再放行一个
+            if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+                return False
+            self._probe_started = now
+            return True
+
+    def record(self, success: bool) -> None:
+        """登记一次请求结果：收到非5xx响应为成功，网络错误或5xx为失败"""
+        with self._lock:
+            if success:
+                if self._opened_at is not None:
+                    logger.info("✅ %s 已恢复，解除熔断", self.name)
+                self._failures = 0
+                self._opened_at = None
+                self._probe_started = None
+                return
+            self._failures += 1
+            if self._opened_at is not None:
+                # 探测失败，重新计时
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+            elif self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                logger.error("❌ %s 连续失败 %s 次，熔断 %s 秒", self.name, self._failures, self.reset_seconds)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """获取URL所在主机的共享熔断器"""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            config = get_registry().get_section("transport")
+            breaker = _breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=config.get("circuit_failure_threshold", DEFAULT_CIRCUIT_FAILURE_THRESHOLD),
+                reset_seconds=config.get("circuit_reset_seconds", DEFAULT_CIRCUIT_RESET_SECONDS),
+            )
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    """丢弃所有熔断器的状态（测试和压测在两轮之间调用）"""
+    with _breakers_lock:
+        _breakers.clear()
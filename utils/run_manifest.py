@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量运行清单 - 记录每个输入文档的大小、修改时间、内容哈希、处理状态、输出路径和耗时，
+再次运行时只处理新增、修改过或上次失败的文档
+"""
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    from .extraction_cache import file_sha256
+except ImportError:
+    from utils.extraction_cache import file_sha256
+
+# 清单默认保存在输出目录下
+MANIFEST_FILENAME = ".run_manifest.json"
+
+# 选择待处理文档的模式
+MODE_INCREMENTAL = "incremental"  # 新增、修改过或上次失败（含部分成功）的文档
+MODE_FORCE = "force"  # 全部文档
+MODE_ONLY_FAILED = "only_failed"  # 仅上次失败（含部分成功）的文档
+
+
+class RunManifest:
+    """批量运行清单类，以JSON文件持久化，每处理完一个文档写回一次"""
+
+    def __init__(self, manifest_path: str):
+        """
+        初始化运行清单（存在旧清单时自动加载）
+
+        Args:
+            manifest_path: 清单JSON文件路径
+        """
+        self.manifest_path = manifest_path
+        self._lock = threading.Lock()
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get("documents", {})
+        except (OSError, ValueError, AttributeError):
+            entries = {}
+        self._entries: Dict[str, Dict[str, Any]] = entries if isinstance(entries, dict) else {}
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def _save(self) -> None:
+        """原子写回清单（调用方需持有锁）"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"updated_at": int(time.time()), "documents": self._entries}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def get(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """获取文档的清单记录，不存在返回None"""
+        with self._lock:
+            entry = self._entries.get(self._key(file_path))
+            return dict(entry) if entry else None
+
+    def needs_processing(self, file_path: str, mode: str = MODE_INCREMENTAL) -> bool:
+        """
+        判断文档本次是否需要处理
+
+        大小和修改时间都没变时直接视为未修改；任一变化时再比较内容哈希，
+        内容相同（例如只是被复制或touch过）仍视为未修改。
+
+        Args:
+            file_path: 文档路径
+            mode: 选择模式（incremental / force / only_failed）
+
+        Returns:
+            需要处理返回True
+        """
+        if mode == MODE_FORCE:
+            return True
+        entry = self.get(file_path)
+        if mode == MODE_ONLY_FAILED:
+            return entry is not None and entry.get("status") != "success"
+        if entry is None or entry.get("status") != "success":
+            return True
+        output_path = entry.get("output_path")
+        if not output_path or not os.path.exists(output_path):
+            return True
+
+        stat = os.stat(file_path)
+        if stat.st_size == entry.get("size") and stat.st_mtime == entry.get("mtime"):
+            return False
+        if stat.st_size != entry.get("size") or file_sha256(file_path) != entry.get("sha256"):
+            return True
+        # 内容未变，只更新修改时间，下次无需再计算哈希
+        with self._lock:
+            self._entries[self._key(file_path)]["mtime"] = stat.st_mtime
+            self._save()
+        return False
+
+    def record(self, file_path: str, result: Dict[str, Any]) -> None:
+        """
+        登记一个文档的处理结果
+
+        Args:
+            file_path: 文档路径
+            result: 处理结果摘要（包含status、output_path、elapsed、error）
+        """
+        stat = os.stat(file_path)
+        entry = {
+            "path": self._key(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(file_path),
+            "status": result.get("status"),
+            "output_path": result.get("output_path"),
+            "elapsed": result.get("elapsed"),
+            "error": result.get("error"),
+            "processed_at": int(time.time()),
+        }
+        with self._lock:
+            self._entries[entry["path"]] = entry
+            self._save()
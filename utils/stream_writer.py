@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量Markdown写入器 - 流式输出时边生成边写入文件
+"""
+import os
+from typing import Dict
+
+
+class IncrementalMarkdownWriter:
+    """
+    增量写入Markdown文件，每次追加后立即刷新，便于下游读取部分输出
+
+    内容先写入 `<path>.partial`，成功后才替换目标文件；失败时删除临时文件，已有的目标文件保持不变。
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化写入器（已有的目标文件在 close(commit=True) 之前不受影响）
+
+        Args:
+            path: 输出文件路径
+        """
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(self.partial_path, 'w', encoding='utf-8')
+        self._mark = 0
+
+    def append(self, text: str) -> None:
+        """追加内容并刷新到磁盘"""
+        self._file.write(text)
+        self._file.flush()
+
+    def mark(self) -> None:
+        """记录当前位置，之后的 reset 只丢弃该位置之后写入的内容（续写截断的输出前调用）"""
+        self._file.flush()
+        self._mark = self._file.tell()
+
+    def reset(self) -> None:
+        """丢弃上次 mark 之后写入的内容，未调用过 mark 时清空文件（流式输出中途失败重试前调用）"""
+        self._file.seek(self._mark)
+        self._file.truncate()
+        self._file.flush()
+
+    def close(self, commit: bool = False) -> None:
+        """
+        关闭文件（重复调用无效果）
+
+        Args:
+            commit: True时用写入的内容替换目标文件，False时丢弃写入的内容
+        """
+        if self._file.closed:
+            return
+        self._file.close()
+        if commit:
+            os.replace(self.partial_path, self.path)
+        else:
+            try:
+                os.remove(self.partial_path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self) -> "IncrementalMarkdownWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class OrderedChunkWriter:
+    """并发完成的分块按原始顺序写出：某块及其之前的块都完成后才写入"""
+
+    def __init__(self, writer: IncrementalMarkdownWriter, separator: str = "\n\n---\n\n"):
+        """
+        初始化分块写入器
+
+        Args:
+            writer: 底层增量写入器
+            separator: 块之间的分隔符
+        """
+        self.writer = writer
+        self.separator = separator
+        self._pending: Dict[int, str] = {}
+        self._next_index = 0
+
+    def complete(self, index: int, text: str) -> None:
+        """登记第index块的最终内容，并写出所有已连续完成的块"""
+        self._pending[index] = text
+        while self._next_index in self._pending:
+            if self._next_index > 0:
+                self.writer.append(self.separator)
+            self.writer.append(self._pending.pop(self._next_index))
+            self._next_index += 1
+
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传文件登记表 - 记录本地文件内容哈希与GLM服务器文件ID的对应关系
+"""
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
+
+try:
+    from .extraction_cache import cache_path
+except ImportError:
+    from utils.extraction_cache import cache_path
+
+# 默认登记表位于缓存根目录下的 uploads.json
+DEFAULT_REGISTRY_NAME = "uploads.json"
+
+
+class UploadRegistry:
+    """上传文件登记表类，以JSON文件持久化"""
+
+    def __init__(self, registry_path: Optional[str] = None):
+        """
+        初始化上传文件登记表
+
+        Args:
+            registry_path: 登记表JSON文件路径，None时使用缓存根目录下的 uploads.json
+        """
+        self.registry_path = registry_path or cache_path(DEFAULT_REGISTRY_NAME)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _entry_key(content_hash: str, purpose: str) -> str:
+        return f"{purpose}:{content_hash}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """首次访问时从磁盘加载登记表（调用方需持有锁）"""
+        if self._entries is None:
+            try:
+                with open(self.registry_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        """原子写回登记表（调用方需持有锁）"""
+        os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+        tmp_path = f"{self.registry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.registry_path)
+
+    def lookup(self, content_hash: str, purpose: str = "file-extract") -> Optional[Dict[str, Any]]:
+        """
+        查询内容哈希对应的上传记录
+
+        Args:
+            content_hash: 文件内容SHA-256
+            purpose: 文件用途
+
+        Returns:
+            上传记录（包含file_id、filename、bytes、uploaded_at），不存在返回None
+        """
+        with self._lock:
+            entry = self._load().get(self._entry_key(content_hash, purpose))
+            return dict(entry) if entry else None
+
+    def record(self, content_hash: str, file_id: str, filename: str, file_size: int,
+               purpose: str = "file-extract") -> None:
+        """登记一次成功的上传"""
+        with self._lock:
+            self._load()[self._entry_key(content_hash, purpose)] = {
+                "file_id": file_id,
+                "filename": filename,
+                "bytes": file_size,
+                "purpose": purpose,
+                "uploaded_at": int(time.time()),
+            }
+            self._save()
+
+    def forget(self, content_hash: str, purpose: str = "file-extract") -> bool:
+        """删除内容哈希对应的上传记录，返回是否删除了记录"""
+        with self._lock:
+            removed = self._load().pop(self._entry_key(content_hash, purpose), None)
+            if removed is not None:
+                self._save()
+            return removed is not None
+
+    def forget_file_id(self, file_id: str) -> int:
+        """删除指向指定文件ID的所有记录，返回删除的记录数量"""
+        with self._lock:
+            entries = self._load()
+            stale_keys = [key for key, entry in entries.items() if entry.get("file_id") == file_id]
+            for key in stale_keys:
+                del entries[key]
+            if stale_keys:
+                self._save()
+            return len(stale_keys)
+
+
+_registries: Dict[str, UploadRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_upload_registry() -> UploadRegistry:
+    """
+    获取进程内共享的上传文件登记表（按当前缓存根目录区分）
+
+    并发处理的文档共用同一份内存数据，避免各自加载的旧数据在写回时互相覆盖（例如恢复已删除文件的记录）。
+    """
+    registry_path = cache_path(DEFAULT_REGISTRY_NAME)
+    with _registries_lock:
+        registry = _registries.get(registry_path)
+        if registry is None:
+            registry = _registries[registry_path] = UploadRegistry(registry_path)
+        return registry